@@ -1,549 +1,4102 @@
-import mysql.connector
-import re
-from tabulate import tabulate
-from datetime import datetime, timedelta
-
-# Connect to MySQL Database
-databaseobj = mysql.connector.connect(
-    host='localhost',
-    user='root',
-    password='faith',
-    database='library_management_system'
-)
-cursor = databaseobj.cursor()
-
-# Create tables with improved error handling
-def create_tables():
-    try:
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            user_id INT AUTO_INCREMENT PRIMARY KEY,
-            username VARCHAR(255) UNIQUE NOT NULL,
-            password VARCHAR(255) NOT NULL,
-            email VARCHAR(255),
-            role VARCHAR(50) NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
-
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS authors (
-            author_id INT AUTO_INCREMENT PRIMARY KEY,
-            name VARCHAR(255) NOT NULL,
-            bio TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
-
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS books (
-            book_id INT AUTO_INCREMENT PRIMARY KEY,
-            title VARCHAR(255) NOT NULL,
-            author_id INT,
-            genre VARCHAR(100),
-            description TEXT,
-            status VARCHAR(50) DEFAULT 'Available',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (author_id) REFERENCES authors(author_id) ON DELETE SET NULL
-        )
-        ''')
-
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS payments (
-            payment_id INT AUTO_INCREMENT PRIMARY KEY,
-            user_id INT,
-            amount DECIMAL(10, 2) NOT NULL,
-            method VARCHAR(50),
-            date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            status VARCHAR(50),
-            FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
-        )
-        ''')
-
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS memberships (
-            membership_id INT AUTO_INCREMENT PRIMARY KEY,
-            user_id INT,
-            plan_name VARCHAR(255),
-            start_date TIMESTAMP,
-            end_date TIMESTAMP,
-            price DECIMAL(10, 2),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
-        )
-        ''')
-
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS feedback (
-            feedback_id INT AUTO_INCREMENT PRIMARY KEY,
-            user_id INT,
-            content TEXT,
-            date_submitted TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
-        )
-        ''')
-
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS transactions (
-            transaction_id INT AUTO_INCREMENT PRIMARY KEY,
-            user_id INT,
-            book_id INT,
-            book_title VARCHAR(50),
-            checkout_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            due_date TIMESTAMP,
-            return_date TIMESTAMP,
-            fine_amount DECIMAL(10, 2) DEFAULT 0.00,
-            FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
-            FOREIGN KEY (book_id) REFERENCES books(book_id) ON DELETE CASCADE
-        )
-        ''')
-        cursor.execute("CREATE TABLE IF NOT EXISTS Plans ("
-                      "membership_id INT AUTO_INCREMENT PRIMARY KEY,"
-                      "membership_plan VARCHAR(50),"
-                      "price varchar(50))")
-
-        databaseobj.commit()
-        print("Tables created successfully.")
-    except mysql.connector.Error as err:
-        print(f"Error: {err}")
-
-create_tables()
-
-# Function to validate password
-def validate_password(password):
-    if len(password) < 6 or len(password) > 24:
-        print("Password must be between 6 and 24 characters long.")
-        return False
-    if not re.search(r'[A-Z]', password):
-        print("Password must contain at least one capital letter.")
-        return False
-    if not re.search(r'[0-9]', password):
-        print("Password must contain at least one number.")
-        return False
-    if not re.search(r'[\W_]', password):  # Special character validation
-        print("Password must contain at least one special character.")
-        return False
-    return True
-
-# Register new user or admin
-def register():
-    while True:
-        try:
-            print("Register your details here.")
-
-            # Validate username
-            while True:
-                username = input("Create a username (alphanumeric): ")
-                if not username.isalnum():
-                    print("Username must be alphanumeric (letters and numbers only).")
-                else:
-                    cursor.execute("SELECT * FROM users WHERE username=%s", (username,))
-                    if cursor.fetchone():
-                        print("Username already exists, please choose another.")
-                    else:
-                        break
-
-            # Validate password
-            while True:
-                password = input("Enter the password: ")
-                if validate_password(password):
-                    break
-
-            while True:
-                email = input("Enter the e-mail id: ")
-                if re.fullmatch(r'^[\w\.-]+@[a-zA-Z\d\.-]+\.[a-zA-Z]{2,}$', email):
-                    break
-                else:
-                    print("Wrong Attempt! Use a valid email format.")
-
-            # Assign role based on username (for simplicity)
-            if username.lower().startswith('admin'):
-                role = 'admin'
-            else:
-                role = 'member'
-
-            # Insert validated data into the database
-            insert_query = "INSERT INTO users (username, password, email, role) VALUES (%s, %s, %s, %s)"
-            cursor.execute(insert_query, (username, password, email, role))
-            databaseobj.commit()
-            print(f"You have successfully registered as a {role}!")
-            break
-        except mysql.connector.Error as e:
-            print("Error:", e)
-
-# Add a new author (Admin only)
-def add_author():
-    while True:
-        try:
-            name = input("Enter author's name: ")
-            bio = input("Enter author's bio: ")
-
-            insert_query = "INSERT INTO authors (name, bio) VALUES (%s, %s)"
-            cursor.execute(insert_query, (name, bio))
-            databaseobj.commit()
-            print("Author added successfully!")
-            break
-        except mysql.connector.Error as err:
-            print(f"Error: {err}")
-
-# View all authors
-def view_authors():
-    try:
-        cursor.execute("SELECT * FROM authors ORDER BY name ASC")
-        result = cursor.fetchall()
-        if result:
-            print(tabulate(result, headers=["Author ID", "Name", "Bio", "Created At"]))
-        else:
-            print("No authors found.")
-    except mysql.connector.Error as err:
-        print(f"Error: {err}")
-
-# Add a new book (Admin only)
-def add_book():
-    while True:
-        try:
-            title = input("Enter book title: ")
-            author_id = int(input("Enter author ID: "))
-
-            # Check if the author exists
-            cursor.execute("SELECT * FROM authors WHERE author_id=%s", (author_id,))
-            author = cursor.fetchone()
-
-            if not author:
-                print("Author does not exist. Please add the author first.")
-                add_author()  # Option to add the author if they don't exist
-                continue
-
-            genre = input("Enter book genre: ")
-            description = input("Enter book description: ")
-            insert_query = "INSERT INTO books (title, author_id, genre, description, status) VALUES (%s, %s, %s, %s, 'Available')"
-            cursor.execute(insert_query, (title, author_id, genre, description))
-            databaseobj.commit()
-            print("Book added successfully!")
-            break
-        except mysql.connector.Error as err:
-            print(f"Error: {err}")
-
-# List all books
-def list_books():
-    try:
-        cursor.execute("SELECT * FROM books ORDER BY title ASC")
-        result = cursor.fetchall()
-        if result:
-            print(tabulate(result, headers=["Book ID", "Title", "Author ID", "Genre", "Description", "Status", "Created At"]))
-        else:
-            print("No books found.")
-    except mysql.connector.Error as err:
-        print(f"Error: {err}")
-
-# View genres
-def view_genres():
-    try:
-        cursor.execute("SELECT DISTINCT genre FROM books ORDER BY genre ASC")
-        result = cursor.fetchall()
-        if result:
-            print(tabulate(result, headers=["Genre"]))
-        else:
-            print("No genres found.")
-    except mysql.connector.Error as err:
-        print(f"Error: {err}")
-
-# View author information
-def view_author_info():
-    try:
-        query = "SELECT * FROM authors"
-        cursor.execute(query)
-        author = cursor.fetchall()
-        if author:
-            print(tabulate(author, headers=["Author ID", "Name", "Bio", "Created At"]))
-        else:
-            print("Author not found.")
-    except mysql.connector.Error as err:
-        print(f"Error: {err}")
-
-# Borrow a book
-def borrow_book():
-    try:
-        book_title = input("Enter book title to borrow: ")
-        cursor.execute("SELECT book_id, status FROM books WHERE title=%s", (book_title,))
-        book = cursor.fetchone()
-        if not book:
-            print("Book not found.")
-            return
-
-        book_id, status = book
-        if status.lower() != 'available':
-            print("Sorry, this book is currently unavailable.")
-            return
-
-        # Assuming user_id is retrieved from the session or passed as a parameter
-        user_id = int(input("Enter your user ID: "))  # Or retrieve it from the session
-        cursor.execute("SELECT * FROM transactions WHERE user_id=%s AND book_id=%s AND return_date IS NULL", (user_id, book_id))
-        ongoing_transaction = cursor.fetchone()
-        if ongoing_transaction:
-            print("You already have this book borrowed.")
-            return
-
-        due_date = datetime.now() + timedelta(days=14)  # Assuming 14 days borrow period
-        borrow_query = "INSERT INTO transactions (user_id, book_id, book_title, checkout_date, due_date) VALUES (%s, %s, %s, %s, %s)"
-        cursor.execute(borrow_query, (user_id, book_id, book_title, datetime.now(), due_date))
-
-        # Update book status to 'Borrowed'
-        cursor.execute("UPDATE books SET status='Borrowed' WHERE book_id=%s", (book_id,))
-        databaseobj.commit()
-        print(f"Book '{book_title}' has been borrowed successfully. Due date is {due_date.strftime('%Y-%m-%d')}.")
-
-        # Process Payment
-        process_payment(user_id, book_title)
-    except mysql.connector.Error as err:
-        print(f"Error: {err}")
-def process_payment(user_id, book_title):
-    try:
-        amount = 5.00  # Assuming a fixed charge for borrowing a book; adjust as needed
-        method = input("Enter payment method (e.g., Credit Card, PayPal): ")
-        status = 'Completed'
-
-        # Insert payment details into the payments table
-        payment_query = "INSERT INTO payments (user_id, amount, method, status) VALUES (%s, %s, %s, %s)"
-        cursor.execute(payment_query, (user_id, amount, method, status))
-        databaseobj.commit()
-        print(f"Payment of ${amount:.2f} for the book '{book_title}' has been processed successfully.")
-    except mysql.connector.Error as err:
-        print(f"Error: {err}")
-
-
-# Return a borrowed book
-def return_book():
-    try:
-        book_title = input("Enter book title to return: ")
-        user_id = int(input("Enter your user ID: "))  # Or retrieve it from the session
-
-        cursor.execute("SELECT transaction_id, due_date FROM transactions WHERE user_id=%s AND book_title=%s AND return_date IS NULL", (user_id, book_title))
-        transaction = cursor.fetchone()
-        if not transaction:
-            print("No such borrowed book found.")
-            return
-
-        transaction_id, due_date = transaction
-        return_date = datetime.now()
-
-        fine_amount = 0
-        if return_date > due_date:
-            days_late = (return_date - due_date).days
-            fine_amount = days_late * 2.00  # Assuming $2 per day late fee
-
-        return_query = "UPDATE transactions SET return_date=%s, fine_amount=%s WHERE transaction_id=%s"
-        cursor.execute(return_query, (return_date, fine_amount, transaction_id))
-        cursor.execute("UPDATE books SET status='Available' WHERE title=%s", (book_title,))
-        databaseobj.commit()
-        print(f"Book '{book_title}' returned successfully. Fine amount: ${fine_amount:.2f}")
-    except mysql.connector.Error as err:
-        print(f"Error: {err}")
-
-# View borrowing history
-def view_borrowing_history():
-    user_id = int(input("Enter your user ID: "))  # Or retrieve it from the session
-    try:
-        cursor.execute("SELECT * FROM transactions WHERE user_id=%s ORDER BY checkout_date DESC", (user_id,))
-        result = cursor.fetchall()
-        if result:
-            print(tabulate(result, headers=["Transaction ID", "User ID", "Book ID", "Book Title", "Checkout Date", "Due Date", "Return Date", "Fine Amount"]))
-        else:
-            print("No borrowing history found.")
-    except mysql.connector.Error as err:
-        print(f"Error: {err}")
-
-# Provide feedback
-def provide_feedback():
-    user_id = int(input("Enter your user ID: "))  # Or retrieve it from the session
-    feedback_content = input("Enter your feedback: ")
-
-    try:
-        insert_query = "INSERT INTO feedback (user_id, content) VALUES (%s, %s)"
-        cursor.execute(insert_query, (user_id, feedback_content))
-        databaseobj.commit()
-        print("Feedback submitted successfully!")
-    except mysql.connector.Error as err:
-        print(f"Error: {err}")
-
-# View feedback
-def view_feedback():
-    try:
-        cursor.execute("SELECT f.feedback_id, u.username, f.content, f.date_submitted FROM feedback f JOIN users u ON f.user_id = u.user_id ORDER BY f.date_submitted DESC")
-        feedbacks = cursor.fetchall()
-        if feedbacks:
-            print(tabulate(feedbacks, headers=["Feedback ID", "Username", "Content", "Date Submitted"]))
-        else:
-            print("No feedback available.")
-    except mysql.connector.Error as err:
-        print(f"Error: {err}")
-
-
-
-# Admin panel
-def admin_panel():
-    while True:
-        print("\nAdmin Panel")
-        print("1. Add Author")
-        print("2. View Authors")
-        print("3. Add Book")
-        print("4. List Books")
-        print("5. View Genres")
-        print("6. View Author Information")
-        print("7. View Feedback")  # New option to view feedback
-        print("8. Logout")
-
-        choice = input("Enter your choice: ")
-
-        if choice == '1':
-            add_author()
-        elif choice == '2':
-            view_authors()
-        elif choice == '3':
-            add_book()
-        elif choice == '4':
-            list_books()
-        elif choice == '5':
-            view_genres()
-        elif choice == '6':
-            view_author_info()
-        elif choice == '7':
-            view_feedback()  # Call the view feedback function
-        elif choice == '8':
-            break
-        else:
-            print("Invalid choice. Please try again.")
-
-
-# Member panel
-# Member panel
-def member_panel():
-    while True:
-        print("\n--- Member Panel ---")
-        print("1. View Membership Plans")
-        print("2. View Books")
-        print("3. View Genres")
-        print("4. View Author Information")
-        print("5. Borrow Book")
-        print("6. Return Book")
-        print("7. Provide Feedback")  # New option
-        print("8. Logout")
-
-        choice = input("Choose an option: ")
-
-        if choice == "1":
-            view_membership_plan()
-        elif choice == "2":
-            list_books()
-        elif choice == "3":
-            view_genres()
-        elif choice == "4":
-            view_author_info()
-        elif choice == "5":
-            borrow_book()
-        elif choice == "6":
-            return_book()
-        elif choice == "7":
-            provide_feedback()  # Call the feedback function
-        elif choice == "8":
-            break
-        else:
-            print("Invalid choice, please try again.")
-
-
-# Function to add a membership plan
-def add_membership_plan(user_id):
-    try:
-        # Check if the user already has an active membership plan
-        cursor.execute("SELECT * FROM memberships WHERE user_id=%s AND end_date > %s", (user_id, datetime.now()))
-        active_plan = cursor.fetchone()
-
-        if active_plan:
-            print("You already have an active membership plan.")
-            return
-
-        print("\nChoose a membership plan:")
-        print("1. Basic Plan - $10/month")
-        print("2. Premium Plan - $25/month")
-        print("3. VIP Plan - $50/month")
-
-        plan_choice = input("Enter your choice: ")
-
-        if plan_choice == '1':
-            plan_name = 'Basic Plan'
-            price = 10.00
-        elif plan_choice == '2':
-            plan_name = 'Premium Plan'
-            price = 25.00
-        elif plan_choice == '3':
-            plan_name = 'VIP Plan'
-            price = 50.00
-        else:
-            print("Invalid choice.")
-            return
-
-        start_date = datetime.now()
-        end_date = start_date + timedelta(days=30)
-
-        insert_query = "INSERT INTO memberships (user_id, plan_name, start_date, end_date, price) VALUES (%s, %s, %s, %s, %s)"
-        cursor.execute(insert_query, (user_id, plan_name, start_date, end_date, price))
-        databaseobj.commit()
-        print(f"{plan_name} added successfully for user ID {user_id}!")
-    except mysql.connector.Error as err:
-        print(f"Error: {err}")
-
-def view_membership_plan():
-    query = 'SELECT membership_id, membership_plan, price FROM plans'
-    cursor.execute(query)
-    query_result = cursor.fetchall()
-    print(tabulate(query_result, headers=["membership_id", "membership_plan","price"]))
-# Login function
-# Login function
-def login():
-    username = input("Enter username: ")
-    password = input("Enter password: ")
-
-    cursor.execute("SELECT user_id, username, password, email, role FROM users WHERE username=%s AND password=%s", (username, password))
-    user = cursor.fetchone()
-
-    if user:
-        user_id, username, password, email, role = user
-        print(f"Welcome {username}!")
-
-        if role == 'admin':
-            admin_panel()
-        else:
-            # Check if the user has an active membership plan
-            cursor.execute("SELECT * FROM memberships WHERE user_id=%s AND end_date > %s", (user_id, datetime.now()))
-            active_plan = cursor.fetchone()
-
-            if not active_plan:
-                add_membership_plan(user_id)  # Prompt for membership plan if none exists
-
-            member_panel()
-    else:
-        print("Invalid username or password.")
-
-
-# Main function
-def main():
-    while True:
-        print("\nLibrary Management System")
-        print("1. Register")
-        print("2. Login")
-        print("3. Exit")
-
-        choice = input("Enter your choice: ")
-
-        if choice == '1':
-            register()
-        elif choice == '2':
-            login()
-        elif choice == '3':
-            print("Goodbye! Thankyou For Using Library Management System")
-            break
-        else:
-            print("Invalid choice. Please try again.")
-
-if __name__ == "__main__":
-    main()
+import time
+
+STARTED_AT = time.perf_counter()  # For the time-to-first-menu measurement; Python itself has already started
+
+import atexit
+import bisect
+import contextvars
+import heapq
+import json
+import math
+import os
+import queue
+import random
+import re
+import struct
+import sys
+import threading
+from array import array
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+from functools import lru_cache, wraps
+from itertools import accumulate, islice
+from datetime import datetime, timedelta
+
+# Modules only some paths need (tabulate, the database drivers, argparse, csv, mmap, secrets,
+# decimal, asyncio, concurrent.futures, logging, NumPy) are imported where they are first
+# needed so that the menus come up fast.
+
+# Database settings (can be overridden with environment variables)
+DB_BACKEND = os.environ.get('LIBRARY_DB_BACKEND', 'mysql')
+MYSQL_CONFIG = {
+    'host': os.environ.get('LIBRARY_DB_HOST', 'localhost'),
+    'user': os.environ.get('LIBRARY_DB_USER', 'root'),
+    'password': os.environ.get('LIBRARY_DB_PASSWORD', 'faith'),
+    'database': os.environ.get('LIBRARY_DB_NAME', 'library_management_system'),
+}
+SQLITE_PATH = os.environ.get('LIBRARY_DB_PATH', 'library_management_system.db')
+POOL_SIZE = int(os.environ.get('LIBRARY_DB_POOL_SIZE', '5'))
+POOL_TIMEOUT = float(os.environ.get('LIBRARY_DB_POOL_TIMEOUT', '30'))
+PAGE_SIZE = int(os.environ.get('LIBRARY_PAGE_SIZE', '20'))
+FETCH_CHUNK_SIZE = 500
+CACHE_TTL = float(os.environ.get('LIBRARY_CACHE_TTL', '300'))
+CACHE_MAX_ENTRIES = 256
+WRITE_BUFFER_ENABLED = os.environ.get('LIBRARY_WRITE_BUFFER', '1') != '0'
+WRITE_BUFFER_BATCH = int(os.environ.get('LIBRARY_WRITE_BUFFER_BATCH', '500'))
+WRITE_BUFFER_DELAY = float(os.environ.get('LIBRARY_WRITE_BUFFER_DELAY_MS', '20')) / 1000
+WRITE_BUFFER_CAPACITY = int(os.environ.get('LIBRARY_WRITE_BUFFER_CAPACITY', '10000'))
+WRITE_BUFFER_IDLE = 0.001  # A gap this long between rows ends the batch before the window does
+ARCHIVE_AFTER_DAYS = int(os.environ.get('LIBRARY_ARCHIVE_AFTER_DAYS', '365'))
+ARCHIVE_BATCH_SIZE = int(os.environ.get('LIBRARY_ARCHIVE_BATCH_SIZE', '5000'))
+
+
+# Raised when the storage layer can't provide a working connection
+class StorageError(Exception):
+    pass
+
+
+# Raised when no pooled connection becomes free within the timeout
+class PoolTimeoutError(StorageError):
+    pass
+
+
+# Raised when a library operation can't be carried out (unknown book, nothing to return, ...)
+class LibraryError(Exception):
+    pass
+
+
+# Errors that every database operation should handle, whichever backend is in use.
+# The driver's error class is added when the driver is first loaded.
+DB_ERRORS = (StorageError,)
+
+
+# MySQL backend (the production database)
+class MySQLBackend:
+    name = 'mysql'
+    transactional_ddl = False  # Every DDL statement commits on its own
+
+    def __init__(self, **config):
+        self.config = config
+
+    def connect(self):
+        global DB_ERRORS
+        try:
+            import mysql.connector
+        except ImportError:
+            raise StorageError("mysql-connector-python is not installed. Set LIBRARY_DB_BACKEND=sqlite to use the embedded database.")
+        if mysql.connector.Error not in DB_ERRORS:
+            DB_ERRORS = DB_ERRORS + (mysql.connector.Error,)
+        return mysql.connector.connect(**self.config)
+
+    def translate(self, query):
+        return query
+
+    def begin_write(self, connection):
+        pass  # InnoDB takes row locks as the statements run
+
+    # Named lock so only one process migrates at a time; released when the connection closes
+    def lock_schema(self, cursor):
+        cursor.execute("SELECT GET_LOCK(CONCAT('library_schema.', DATABASE()), %s)", (POOL_TIMEOUT,))
+        if cursor.fetchone()[0] != 1:
+            raise StorageError("Timed out waiting for another process to finish migrating the schema.")
+
+    # Read the latest committed rows and lock them until the transaction ends
+    def for_update(self, query):
+        return query + " FOR UPDATE"
+
+    # INSERT that adds to the counters of an existing row instead of failing on its key
+    def increment_query(self, table, keys, counters):
+        columns = keys + counters
+        updates = ", ".join(f"{column} = {column} + VALUES({column})" for column in counters)
+        return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+                f"ON DUPLICATE KEY UPDATE {updates}")
+
+
+# SQL is written for MySQL and rewritten once per distinct statement for SQLite
+@lru_cache(maxsize=512)
+def mysql_to_sqlite(query):
+    query = query.replace('%s', '?')
+    return query.replace('INT AUTO_INCREMENT PRIMARY KEY', 'INTEGER PRIMARY KEY AUTOINCREMENT')
+
+
+# Embedded SQLite backend (local development and testing without a MySQL server)
+class SQLiteBackend:
+    name = 'sqlite'
+    transactional_ddl = True
+
+    def __init__(self, path):
+        self.path = path
+
+    def connect(self):
+        global DB_ERRORS
+        import sqlite3
+        if sqlite3.Error not in DB_ERRORS:
+            DB_ERRORS = DB_ERRORS + (sqlite3.Error,)
+            # Store datetimes as ISO text and read TIMESTAMP columns back as datetimes, like MySQL does
+            sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+            sqlite3.register_converter('TIMESTAMP', lambda value: datetime.fromisoformat(value.decode()))
+        connection = sqlite3.connect(self.path, timeout=POOL_TIMEOUT, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        connection.execute('PRAGMA foreign_keys = ON')
+        connection.execute('PRAGMA journal_mode = WAL')
+        return connection
+
+    def translate(self, query):
+        return mysql_to_sqlite(query)
+
+    # Take the write lock up front so a read-then-write transaction waits for other
+    # writers instead of failing with "database is locked" when it upgrades
+    def begin_write(self, connection):
+        connection.execute('BEGIN IMMEDIATE')
+
+    def for_update(self, query):
+        return query  # BEGIN IMMEDIATE already holds the database's write lock
+
+    def lock_schema(self, cursor):
+        pass  # The migration's BEGIN IMMEDIATE already shuts other writers out
+
+    def increment_query(self, table, keys, counters):
+        columns = keys + counters
+        updates = ", ".join(f"{column} = {column} + excluded.{column}" for column in counters)
+        return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+                f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {updates}")
+
+
+BACKENDS = {
+    'mysql': lambda: MySQLBackend(**MYSQL_CONFIG),
+    'sqlite': lambda: SQLiteBackend(SQLITE_PATH),
+}
+
+
+# Query instrumentation: every statement run through a StorageCursor is timed and
+# attributed to the library operation that issued it (the outermost function marked
+# with @instrumented). Per-operation latency histograms and per-statement totals are
+# kept in memory; statements slower than SLOW_QUERY_MS go to the slow query log.
+SLOW_QUERY_MS = float(os.environ.get('LIBRARY_SLOW_QUERY_MS', '100'))
+SLOW_QUERY_LOG = os.environ.get('LIBRARY_SLOW_QUERY_LOG', 'slow_queries.log')
+QUERY_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+MAX_TRACKED_STATEMENTS = 500
+
+current_operation = contextvars.ContextVar('current_operation', default=None)
+
+
+def instrumented(function):
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        if current_operation.get() is not None:
+            return function(*args, **kwargs)
+        token = current_operation.set(function.__name__)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            current_operation.reset(token)
+    return wrapper
+
+
+def compact_sql(statement, limit=500):
+    return " ".join(statement.split())[:limit]
+
+
+class QueryMetrics:
+    def __init__(self, slow_query_ms=SLOW_QUERY_MS, slow_query_log=SLOW_QUERY_LOG):
+        self.slow_query_ms = slow_query_ms
+        self.slow_query_log = slow_query_log
+        self.lock = threading.Lock()
+        self.operations = {}  # operation -> {'buckets': [...], 'count', 'seconds', 'rows'}
+        self.statements = {}  # statement -> [count, total seconds, max seconds, rows]
+        self.slow_logger = None
+
+    def record(self, statement, seconds, rows):
+        operation = current_operation.get() or 'unknown'
+        bucket = bisect.bisect_left(QUERY_LATENCY_BUCKETS, seconds)
+        with self.lock:
+            stats = self.operations.get(operation)
+            if stats is None:
+                stats = self.operations[operation] = {'buckets': [0] * (len(QUERY_LATENCY_BUCKETS) + 1), 'count': 0, 'seconds': 0.0, 'rows': 0}
+            stats['buckets'][bucket] += 1
+            stats['count'] += 1
+            stats['seconds'] += seconds
+            stats['rows'] += rows
+
+            totals = self.statements.get(statement)
+            if totals is None:
+                key = 'other' if len(self.statements) >= MAX_TRACKED_STATEMENTS else statement
+                totals = self.statements.setdefault(key, [0, 0.0, 0.0, 0])
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] = max(totals[2], seconds)
+            totals[3] += rows
+        if seconds * 1000 >= self.slow_query_ms:
+            self.log_slow_query(operation, statement, seconds, rows)
+
+    # Parameters are never logged, they can contain passwords
+    def log_slow_query(self, operation, statement, seconds, rows):
+        if self.slow_logger is None:
+            with self.lock:
+                if self.slow_logger is None:
+                    import logging
+                    logger = logging.getLogger('library.slow_queries')
+                    logger.propagate = False
+                    logger.setLevel(logging.INFO)
+                    handler = logging.FileHandler(self.slow_query_log, encoding='utf-8')
+                    handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+                    logger.addHandler(handler)
+                    self.slow_logger = logger
+        self.slow_logger.info("operation=%s duration_ms=%.1f rows=%d sql=%s", operation, seconds * 1000, rows, compact_sql(statement))
+
+    def snapshot(self):
+        with self.lock:
+            operations = {name: dict(stats, buckets=list(stats['buckets'])) for name, stats in self.operations.items()}
+            statements = {statement: list(totals) for statement, totals in self.statements.items()}
+        return operations, statements
+
+    def to_json(self, top_statements=20):
+        operations, statements = self.snapshot()
+        slowest = sorted(statements.items(), key=lambda item: item[1][1], reverse=True)[:top_statements]
+        return {
+            'operations': {
+                name: {
+                    'count': stats['count'],
+                    'total_ms': round(stats['seconds'] * 1000, 3),
+                    'mean_ms': round(stats['seconds'] * 1000 / stats['count'], 3),
+                    'rows': stats['rows'],
+                    'buckets_ms': dict(zip([str(bound * 1000) for bound in QUERY_LATENCY_BUCKETS] + ['+Inf'], accumulate(stats['buckets']))),
+                }
+                for name, stats in operations.items()
+            },
+            'statements': [
+                {'sql': compact_sql(statement), 'count': count, 'total_ms': round(total * 1000, 3), 'max_ms': round(longest * 1000, 3), 'rows': rows}
+                for statement, (count, total, longest, rows) in slowest
+            ],
+            'cache': reference_cache.stats(),
+            'write_buffer': write_buffer.stats(),
+            'sessions': session_store.stats(),
+            'recommendations': recommendation_updater.stats(),
+        }
+
+    # Prometheus text exposition format
+    def to_prometheus(self):
+        operations, _ = self.snapshot()
+        lines = ["# HELP library_query_duration_seconds Database statement latency by library operation.",
+                 "# TYPE library_query_duration_seconds histogram"]
+        for name, stats in sorted(operations.items()):
+            label = name.replace('\\', '\\\\').replace('"', '\\"')
+            for bound, cumulative in zip(QUERY_LATENCY_BUCKETS, accumulate(stats['buckets'])):
+                lines.append(f'library_query_duration_seconds_bucket{{operation="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'library_query_duration_seconds_bucket{{operation="{label}",le="+Inf"}} {stats["count"]}')
+            lines.append(f'library_query_duration_seconds_sum{{operation="{label}"}} {stats["seconds"]:.6f}')
+            lines.append(f'library_query_duration_seconds_count{{operation="{label}"}} {stats["count"]}')
+        lines += ["# HELP library_query_rows_total Rows returned to library operations.",
+                  "# TYPE library_query_rows_total counter"]
+        for name, stats in sorted(operations.items()):
+            label = name.replace('\\', '\\\\').replace('"', '\\"')
+            lines.append(f'library_query_rows_total{{operation="{label}"}} {stats["rows"]}')
+        cache = reference_cache.stats()
+        for counter in ('hits', 'misses', 'evictions'):
+            lines += [f"# TYPE library_cache_{counter}_total counter", f"library_cache_{counter}_total {cache[counter]}"]
+        lines += ["# TYPE library_cache_entries gauge", f"library_cache_entries {cache['entries']}"]
+        return "\n".join(lines) + "\n"
+
+
+query_metrics = QueryMetrics()
+
+
+# Cursor wrapper so the same MySQL-style SQL runs on every backend. Time spent in
+# execute() and in the fetches that follow is charged to the statement.
+class StorageCursor:
+    def __init__(self, backend, cursor):
+        self.backend = backend
+        self.raw = cursor
+        self.statement = None
+        self.elapsed = 0.0
+        self.rows = 0
+
+    def _begin(self, query):
+        self._finish()
+        self.statement = query
+        self.elapsed = 0.0
+        self.rows = 0
+
+    def _finish(self):
+        if self.statement is not None:
+            query_metrics.record(self.statement, self.elapsed, self.rows)
+            self.statement = None
+
+    def execute(self, query, params=()):
+        self._begin(query)
+        started = time.perf_counter()
+        try:
+            self.raw.execute(self.backend.translate(query), params)
+        finally:
+            self.elapsed += time.perf_counter() - started
+
+    def executemany(self, query, seq_of_params):
+        self._begin(query)
+        started = time.perf_counter()
+        try:
+            self.raw.executemany(self.backend.translate(query), seq_of_params)
+        finally:
+            self.elapsed += time.perf_counter() - started
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = self.raw.fetchone()
+        self.elapsed += time.perf_counter() - started
+        if row is not None:
+            self.rows += 1
+        return row
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = self.raw.fetchall()
+        self.elapsed += time.perf_counter() - started
+        self.rows += len(rows)
+        return rows
+
+    def fetchmany(self, size):
+        started = time.perf_counter()
+        rows = self.raw.fetchmany(size)
+        self.elapsed += time.perf_counter() - started
+        self.rows += len(rows)
+        return rows
+
+    @property
+    def rowcount(self):
+        return self.raw.rowcount
+
+    @property
+    def lastrowid(self):
+        return self.raw.lastrowid
+
+    def close(self):
+        self._finish()
+        self.raw.close()
+
+
+# Bounded pool of connections; connections are opened on demand up to the pool size
+class ConnectionPool:
+    def __init__(self, backend, size=POOL_SIZE, timeout=POOL_TIMEOUT):
+        self.backend = backend
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeoutError(f"No database connection became available within {self.timeout} seconds.")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return self.backend.connect()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, connection, discard=False):
+        if discard:
+            try:
+                connection.close()
+            except Exception:
+                pass
+        else:
+            self._idle.put(connection)
+        self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            connection.close()
+
+
+# tabulate is only imported the first time a table is printed
+def tabulate(*args, **kwargs):
+    from tabulate import tabulate as render_table
+    return render_table(*args, **kwargs)
+
+
+# Storage layer: each operation borrows a pooled connection for the length of one transaction
+class Storage:
+    def __init__(self, backend, pool_size=POOL_SIZE, setup=None):
+        self.backend = backend
+        self.pool = ConnectionPool(backend, pool_size)
+        self.setup = setup  # Runs once, before the first transaction (schema check)
+        self.ready = False
+        self.setting_up = False
+        self.setup_lock = threading.RLock()
+
+    # Other threads wait for the setup to finish; the setup's own transactions pass through
+    def ensure_ready(self):
+        if self.ready:
+            return
+        with self.setup_lock:
+            if self.ready or self.setting_up:
+                return
+            self.setting_up = True
+            try:
+                if self.setup:
+                    self.setup()
+                self.ready = True
+            finally:
+                self.setting_up = False
+
+    @contextmanager
+    def transaction(self, write=False):
+        self.ensure_ready()
+        connection = self.pool.acquire()
+        cursor = StorageCursor(self.backend, connection.cursor())
+        discard = False
+        try:
+            if write:
+                self.backend.begin_write(connection)
+            yield cursor
+            connection.commit()
+        except BaseException:
+            try:
+                connection.rollback()
+            except Exception:
+                discard = True  # The connection is broken, don't hand it out again
+            raise
+        finally:
+            try:
+                cursor.close()
+            except Exception:
+                discard = True
+            self.pool.release(connection, discard)
+
+    def close(self):
+        self.pool.close()
+
+
+def create_storage(backend_name=DB_BACKEND, pool_size=POOL_SIZE):
+    if backend_name not in BACKENDS:
+        raise ValueError(f"Unknown database backend '{backend_name}'. Choose one of: {', '.join(BACKENDS)}")
+    return Storage(BACKENDS[backend_name](), pool_size)
+
+
+storage = create_storage()
+
+
+# One page of a listing plus the keyset cursors of the pages around it
+Page = namedtuple('Page', ['rows', 'next_cursor', 'prev_cursor'])
+
+
+# Read rows from the (server-side) cursor in fixed-size chunks instead of fetchall()
+def stream_rows(cursor, chunk_size=FETCH_CHUNK_SIZE):
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield from rows
+
+
+# (a, b) > (x, y) written out as a > x OR (a = x AND b > y) so indexes on (a, b) are used
+def keyset_condition(key_columns, values, operator):
+    clauses = []
+    params = []
+    for i, column in enumerate(key_columns):
+        terms = [f"{key_columns[j]} = %s" for j in range(i)] + [f"{column} {operator} %s"]
+        clauses.append("(" + " AND ".join(terms) + ")")
+        params.extend(values[:i + 1])
+    return "(" + " OR ".join(clauses) + ")", params
+
+
+# Keyset (seek) pagination: each page starts right after (or before) the key of a row
+# the user has already seen, so page N costs the same as page 1
+def fetch_page(cursor, select, key_columns, key_indexes, filters=(), params=(), page_size=PAGE_SIZE, after=None, before=None, descending=False):
+    rows = seek_rows(cursor, select, key_columns, filters, params, page_size, after, before, descending)
+    return make_page(rows, key_indexes, page_size, after, before)
+
+
+# Up to page_size + 1 rows past the seek key, in scan order (reversed when paging backwards);
+# the extra row tells make_page() whether another page exists
+def seek_rows(cursor, select, key_columns, filters=(), params=(), page_size=PAGE_SIZE, after=None, before=None, descending=False):
+    backwards = before is not None
+    ascending = descending == backwards
+    where = list(filters)
+    params = list(params)
+    seek = before if backwards else after
+    if seek is not None:
+        condition, seek_params = keyset_condition(key_columns, seek, '>' if ascending else '<')
+        where.append(condition)
+        params.extend(seek_params)
+
+    direction = 'ASC' if ascending else 'DESC'
+    query = select
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    query += " ORDER BY " + ", ".join(f"{column} {direction}" for column in key_columns) + " LIMIT %s"
+    params.append(page_size + 1)
+    cursor.execute(query, params)
+    return list(stream_rows(cursor))
+
+
+def make_page(rows, key_indexes, page_size, after=None, before=None):
+    backwards = before is not None
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backwards:
+        rows.reverse()
+    if not rows:
+        return Page(rows, None, None)
+
+    def key(row):
+        return tuple(row[i] for i in key_indexes)
+
+    if backwards:
+        return Page(rows, key(rows[-1]), key(rows[0]) if has_more else None)
+    return Page(rows, key(rows[-1]) if has_more else None, key(rows[0]) if after is not None else None)
+
+
+# Show a listing one page at a time
+def browse_pages(fetch, headers, empty_message, **filters):
+    page = fetch(**filters)
+    if not page.rows:
+        print(empty_message)
+        return
+    while True:
+        print(tabulate(page.rows, headers=headers))
+        if page.next_cursor is None and page.prev_cursor is None:
+            break
+        choice = input("Enter 'n' for the next page, 'p' for the previous page or press Enter to go back: ").strip().lower()
+        if choice == 'n' and page.next_cursor is not None:
+            page = fetch(after=page.next_cursor, **filters)
+        elif choice == 'p' and page.prev_cursor is not None:
+            page = fetch(before=page.prev_cursor, **filters)
+        else:
+            break
+
+
+# Read-through cache for reference data that rarely changes (genres, authors, plans).
+# Entries expire after CACHE_TTL seconds, the least recently used entry is evicted when
+# the cache is full, and writers call invalidate() for the namespace they changed.
+class ReferenceCache:
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()  # (namespace, ...) -> (expires at, value)
+        self.generations = {}  # namespace -> number of invalidations
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, loader):
+        namespace = key[0]
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self.generations.get(namespace, 0)
+
+        value = loader()
+        with self.lock:
+            # Don't store a value loaded from before an invalidation that ran meanwhile
+            if self.generations.get(namespace, 0) == generation:
+                self.entries[key] = (time.monotonic() + self.ttl, value)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def invalidate(self, *namespaces):
+        with self.lock:
+            for namespace in namespaces:
+                self.generations[namespace] = self.generations.get(namespace, 0) + 1
+            for key in [key for key in self.entries if key[0] in namespaces]:
+                del self.entries[key]
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+reference_cache = ReferenceCache()
+
+
+# Completion of a buffered write; result() waits until it is committed
+class WriteAck:
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+
+    def finish(self, error=None):
+        self.error = error
+        self.done.set()
+
+    def result(self, timeout=None):
+        if not self.done.wait(timeout):
+            raise StorageError("Timed out waiting for the write to be committed.")
+        if self.error is not None:
+            raise self.error
+
+
+# Group commit for append-only rows (feedback, audit entries). append() queues an INSERT
+# and returns at once; a background thread writes whatever has queued up within
+# max_delay seconds (less if rows stop arriving), up to max_batch rows, with one executemany per statement and a
+# single commit. The queue is bounded: when it is full append() blocks, and fails after
+# POOL_TIMEOUT seconds, instead of letting memory grow; with block=False the row is
+# dropped and counted instead. Callers that need to know the
+# row is on disk wait on the returned WriteAck. close() writes out everything queued.
+class WriteBuffer:
+    def __init__(self, enabled=WRITE_BUFFER_ENABLED, max_batch=WRITE_BUFFER_BATCH, max_delay=WRITE_BUFFER_DELAY, capacity=WRITE_BUFFER_CAPACITY):
+        self.enabled = enabled
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue = queue.Queue(maxsize=capacity)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.closed = False
+        self.counts = {'appended': 0, 'committed': 0, 'failed': 0, 'dropped': 0, 'batches': 0}
+
+    def append(self, query, params, block=True):
+        ack = WriteAck()
+        if not self.enabled or self.closed:
+            try:
+                with storage.transaction() as cursor:
+                    cursor.execute(query, params)
+            except DB_ERRORS as err:
+                ack.finish(err)
+                self.count(failed=1)
+            else:
+                ack.finish()
+                self.count(committed=1)
+            return ack
+        self.start()
+        try:
+            self.queue.put((query, params, ack), block, POOL_TIMEOUT)
+        except queue.Full:
+            if block:
+                raise StorageError("The write buffer is full, try again later.") from None
+            ack.finish(StorageError("The write buffer is full."))
+            self.count(dropped=1)
+            return ack
+        self.count(appended=1)
+        return ack
+
+    def count(self, **increments):
+        with self.lock:
+            for name, amount in increments.items():
+                self.counts[name] += amount
+
+    def start(self):
+        if self.thread is not None:
+            return
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='write-buffer', daemon=True)
+                self.thread.start()
+                atexit.register(self.close)
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            stop = False
+            while len(batch) < self.max_batch:
+                # Stop early once rows stop arriving: callers waiting on acks add nothing until this batch commits
+                remaining = min(deadline - time.monotonic(), WRITE_BUFFER_IDLE)
+                try:
+                    item = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            try:
+                self.write(batch)
+            except Exception as err:  # Never leave a caller waiting on an ack
+                for _, _, ack in batch:
+                    if not ack.done.is_set():
+                        ack.finish(err)
+            if stop:
+                return
+
+    @instrumented
+    def write_batch(self, rows):
+        statements = {}
+        for query, params, _ in rows:
+            statements.setdefault(query, []).append(params)
+        with storage.transaction() as cursor:
+            for query, params in statements.items():
+                cursor.executemany(query, params)
+
+    def write(self, batch):
+        rows = [item for item in batch if item[0] is not None]
+        if rows:
+            try:
+                self.write_batch(rows)
+            except DB_ERRORS:
+                # Write the rows one by one so a single bad row doesn't take the others with it
+                for row in rows:
+                    try:
+                        self.write_batch([row])
+                    except DB_ERRORS as err:
+                        row[2].finish(err)
+                        self.count(failed=1)
+                    else:
+                        row[2].finish()
+                        self.count(committed=1)
+            else:
+                for _, _, ack in rows:
+                    ack.finish()
+                self.count(committed=len(rows))
+            self.count(batches=1)
+        for query, _, ack in batch:
+            if query is None:
+                ack.finish()  # flush() marker
+
+    # Wait until everything appended so far is committed
+    def flush(self):
+        if self.thread is None or self.closed:
+            return
+        marker = WriteAck()
+        self.queue.put((None, None, marker))
+        marker.result()
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            thread = self.thread
+        if thread is not None:
+            self.queue.put(None)
+            thread.join()
+        # Rows appended while the thread was stopping
+        leftovers = []
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                leftovers.append(item)
+        if leftovers:
+            self.write(leftovers)
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counts, pending=self.queue.qsize(), enabled=self.enabled)
+
+
+write_buffer = WriteBuffer()
+
+
+# Record who did what; written through the write buffer, never waited on. It runs after
+# the operation has committed, so it never raises: when the buffer is full the entry is
+# dropped and counted in the write buffer stats.
+def audit(user_id, action, details=None):
+    write_buffer.append("INSERT INTO audit_log (user_id, action, details, created_at) VALUES (%s, %s, %s, %s)",
+                        (user_id, action, details and str(details)[:255], datetime.now()), block=False)
+
+
+# Schema migrations, applied once each in order and recorded in schema_version.
+# Never change a migration that has been released; add a new one instead.
+MIGRATIONS = [
+    (1, "Create base tables", [
+        '''
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INT AUTO_INCREMENT PRIMARY KEY,
+            username VARCHAR(255) UNIQUE NOT NULL,
+            password VARCHAR(255) NOT NULL,
+            email VARCHAR(255),
+            role VARCHAR(50) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS authors (
+            author_id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            bio TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS books (
+            book_id INT AUTO_INCREMENT PRIMARY KEY,
+            title VARCHAR(255) NOT NULL,
+            author_id INT,
+            genre VARCHAR(100),
+            description TEXT,
+            status VARCHAR(50) DEFAULT 'Available',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (author_id) REFERENCES authors(author_id) ON DELETE SET NULL
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS payments (
+            payment_id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT,
+            amount DECIMAL(10, 2) NOT NULL,
+            method VARCHAR(50),
+            date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            status VARCHAR(50),
+            FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS memberships (
+            membership_id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT,
+            plan_name VARCHAR(255),
+            start_date TIMESTAMP,
+            end_date TIMESTAMP,
+            price DECIMAL(10, 2),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS feedback (
+            feedback_id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT,
+            content TEXT,
+            date_submitted TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS transactions (
+            transaction_id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT,
+            book_id INT,
+            book_title VARCHAR(50),
+            checkout_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            due_date TIMESTAMP,
+            return_date TIMESTAMP,
+            fine_amount DECIMAL(10, 2) DEFAULT 0.00,
+            FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
+            FOREIGN KEY (book_id) REFERENCES books(book_id) ON DELETE CASCADE
+        )
+        ''',
+        "CREATE TABLE IF NOT EXISTS Plans ("
+        "membership_id INT AUTO_INCREMENT PRIMARY KEY,"
+        "membership_plan VARCHAR(50),"
+        "price varchar(50))",
+    ]),
+    (2, "Add indexes for the hot lookups", [
+        "CREATE INDEX idx_books_title ON books (title, book_id)",
+        "CREATE INDEX idx_books_genre ON books (genre, title, book_id)",
+        "CREATE INDEX idx_books_status ON books (status, title, book_id)",
+        "CREATE INDEX idx_books_author ON books (author_id, title, book_id)",
+        "CREATE INDEX idx_authors_name ON authors (name, author_id)",
+        "CREATE INDEX idx_transactions_open ON transactions (user_id, book_title, return_date)",
+        "CREATE INDEX idx_transactions_book ON transactions (book_id, user_id, return_date)",
+        "CREATE INDEX idx_memberships_user ON memberships (user_id, end_date)",
+        "CREATE INDEX idx_users_login ON users (username, password)",
+        "CREATE INDEX idx_feedback_date ON feedback (date_submitted, feedback_id)",
+    ]),
+    (3, "Add index for overdue loans", [
+        "CREATE INDEX idx_transactions_overdue ON transactions (return_date, due_date)",
+    ]),
+    (4, "Add circulation and revenue summary tables", [
+        "CREATE TABLE IF NOT EXISTS stats_book_loans ("
+        "book_id INT PRIMARY KEY,"
+        "loans INT NOT NULL DEFAULT 0)",
+        "CREATE INDEX idx_stats_book_loans ON stats_book_loans (loans, book_id)",
+        "CREATE TABLE IF NOT EXISTS stats_genre_daily ("
+        "day CHAR(10) NOT NULL,"
+        "genre VARCHAR(100) NOT NULL,"
+        "loans INT NOT NULL DEFAULT 0,"
+        "PRIMARY KEY (day, genre))",
+        "CREATE TABLE IF NOT EXISTS stats_active_loans ("
+        "id INT PRIMARY KEY,"
+        "loans INT NOT NULL DEFAULT 0)",
+        "CREATE TABLE IF NOT EXISTS stats_revenue_daily ("
+        "day CHAR(10) PRIMARY KEY,"
+        "payments INT NOT NULL DEFAULT 0,"
+        "amount DECIMAL(12, 2) NOT NULL DEFAULT 0)",
+        "CREATE TABLE IF NOT EXISTS stats_membership_expiry ("
+        "end_day CHAR(10) NOT NULL,"
+        "plan_name VARCHAR(255) NOT NULL,"
+        "members INT NOT NULL DEFAULT 0,"
+        "PRIMARY KEY (end_day, plan_name))",
+    ]),
+    (5, "Add archive table for closed loans", [
+        # Same columns as transactions; rows keep their transaction_id when they move
+        '''
+        CREATE TABLE IF NOT EXISTS transactions_archive (
+            transaction_id INT PRIMARY KEY,
+            user_id INT,
+            book_id INT,
+            book_title VARCHAR(50),
+            checkout_date TIMESTAMP,
+            due_date TIMESTAMP,
+            return_date TIMESTAMP,
+            fine_amount DECIMAL(10, 2) DEFAULT 0.00
+        )
+        ''',
+        "CREATE INDEX idx_archive_history ON transactions_archive (user_id, checkout_date, transaction_id)",
+        "CREATE INDEX idx_transactions_history ON transactions (user_id, checkout_date, transaction_id)",
+    ]),
+    (6, "Track copies per title and add the holds queue", [
+        '''
+        CREATE TABLE IF NOT EXISTS book_copies (
+            copy_id INT AUTO_INCREMENT PRIMARY KEY,
+            book_id INT NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'Available',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (book_id) REFERENCES books(book_id) ON DELETE CASCADE
+        )
+        ''',
+        "CREATE INDEX idx_copies_book ON book_copies (book_id, status, copy_id)",
+        "ALTER TABLE books ADD COLUMN total_copies INT NOT NULL DEFAULT 1",
+        "ALTER TABLE books ADD COLUMN available_copies INT NOT NULL DEFAULT 1",
+        "ALTER TABLE transactions ADD COLUMN copy_id INT",
+        "ALTER TABLE transactions_archive ADD COLUMN copy_id INT",
+        # Every existing book row becomes a title with one copy
+        "INSERT INTO book_copies (book_id, status) "
+        "SELECT book_id, CASE WHEN status = 'Borrowed' THEN 'Borrowed' ELSE 'Available' END FROM books",
+        "UPDATE books SET available_copies = CASE WHEN status = 'Borrowed' THEN 0 ELSE 1 END",
+        # Only open loans need their copy, to return it
+        "UPDATE transactions SET copy_id = (SELECT c.copy_id FROM book_copies c WHERE c.book_id = transactions.book_id) "
+        "WHERE return_date IS NULL",
+        '''
+        CREATE TABLE IF NOT EXISTS holds (
+            hold_id INT AUTO_INCREMENT PRIMARY KEY,
+            book_id INT NOT NULL,
+            user_id INT NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'Waiting',
+            copy_id INT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            ready_at TIMESTAMP,
+            FOREIGN KEY (book_id) REFERENCES books(book_id) ON DELETE CASCADE,
+            FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+        )
+        ''',
+        "CREATE INDEX idx_holds_queue ON holds (book_id, status, hold_id)",
+        "CREATE INDEX idx_holds_user ON holds (user_id, status)",
+    ]),
+    (7, "Add audit log", [
+        # No foreign key: entries outlive the user, and failed logins have no user
+        '''
+        CREATE TABLE IF NOT EXISTS audit_log (
+            audit_id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT,
+            action VARCHAR(50) NOT NULL,
+            details VARCHAR(255),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        "CREATE INDEX idx_audit_user ON audit_log (user_id, created_at)",
+        "CREATE INDEX idx_audit_date ON audit_log (created_at, audit_id)",
+    ]),
+    (8, "Add co-borrowing recommendations", [
+        "CREATE TABLE IF NOT EXISTS book_recommendations ("
+        "book_id INT NOT NULL,"
+        "similar_book_id INT NOT NULL,"
+        "score INT NOT NULL DEFAULT 0,"
+        "PRIMARY KEY (book_id, similar_book_id))",
+        "CREATE INDEX idx_recommendations_score ON book_recommendations (book_id, score, similar_book_id)",
+    ]),
+    (9, "Add index for expiring memberships", [
+        "CREATE INDEX idx_memberships_end ON memberships (end_date, user_id)",
+    ]),
+    # Every loan and payment bumped the same day rows; a shard column spreads them out.
+    # stats_active_loans needs no change: its id column becomes the shard number.
+    (10, "Spread the daily summary counters over shards", [
+        "CREATE TABLE stats_genre_daily_sharded ("
+        "day CHAR(10) NOT NULL,"
+        "genre VARCHAR(100) NOT NULL,"
+        "shard INT NOT NULL DEFAULT 0,"
+        "loans INT NOT NULL DEFAULT 0,"
+        "PRIMARY KEY (day, genre, shard))",
+        "INSERT INTO stats_genre_daily_sharded (day, genre, loans) SELECT day, genre, loans FROM stats_genre_daily",
+        "DROP TABLE stats_genre_daily",
+        "ALTER TABLE stats_genre_daily_sharded RENAME TO stats_genre_daily",
+        "CREATE TABLE stats_revenue_daily_sharded ("
+        "day CHAR(10) NOT NULL,"
+        "shard INT NOT NULL DEFAULT 0,"
+        "payments INT NOT NULL DEFAULT 0,"
+        "amount DECIMAL(12, 2) NOT NULL DEFAULT 0,"
+        "PRIMARY KEY (day, shard))",
+        "INSERT INTO stats_revenue_daily_sharded (day, payments, amount) SELECT day, payments, amount FROM stats_revenue_daily",
+        "DROP TABLE stats_revenue_daily",
+        "ALTER TABLE stats_revenue_daily_sharded RENAME TO stats_revenue_daily",
+    ]),
+    # Subscriptions are driven by Plans; start it with the plans members could always choose
+    (11, "Seed the membership plans", [
+        "INSERT INTO Plans (membership_plan, price) SELECT plan_name, price FROM ("
+        "SELECT 'Basic Plan' AS plan_name, '10.00' AS price UNION ALL "
+        "SELECT 'Premium Plan', '25.00' UNION ALL "
+        "SELECT 'VIP Plan', '50.00') seed "
+        "WHERE NOT EXISTS (SELECT 1 FROM Plans)",
+    ]),
+    (12, "Add index for uncollected ready holds", [
+        "CREATE INDEX idx_holds_ready ON holds (status, ready_at)",
+    ]),
+]
+LATEST_SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+# Version of the schema in the database, 0 if it has never been migrated
+def current_schema_version(cursor):
+    try:
+        cursor.execute("SELECT MAX(version) FROM schema_version")
+    except DB_ERRORS:
+        return 0
+    version = cursor.fetchone()[0]
+    return version or 0
+
+
+# Apply the migrations the database hasn't seen yet; returns how many were applied.
+# Migrations run on a connection of their own that holds the schema lock, so two
+# processes starting at once don't both migrate. SQLite runs them all in one transaction.
+# On MySQL every DDL statement commits by itself, so each statement is recorded in
+# schema_migration_steps as it completes and a failed migration resumes where it stopped.
+@instrumented
+def migrate_schema():
+    with storage.transaction() as cursor:
+        version = current_schema_version(cursor)
+    if version >= LATEST_SCHEMA_VERSION:
+        return 0  # Schema is current, no DDL at all
+
+    backend = storage.backend
+    connection = backend.connect()
+    cursor = StorageCursor(backend, connection.cursor())
+    applied = []
+    try:
+        backend.begin_write(connection)
+        backend.lock_schema(cursor)
+        cursor.execute("CREATE TABLE IF NOT EXISTS schema_version ("
+                       "version INT PRIMARY KEY,"
+                       "description VARCHAR(255),"
+                       "applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+        cursor.execute("CREATE TABLE IF NOT EXISTS schema_migration_steps ("
+                       "version INT NOT NULL,"
+                       "step INT NOT NULL,"
+                       "PRIMARY KEY (version, step))")
+        version = current_schema_version(cursor)  # Another process may have migrated meanwhile
+        cursor.execute("SELECT version, step FROM schema_migration_steps")
+        done = set(cursor.fetchall())
+        for number, description, statements in MIGRATIONS:
+            if number <= version:
+                continue
+            for step, statement in enumerate(statements):
+                if (number, step) in done:
+                    continue
+                cursor.execute(statement)
+                cursor.execute("INSERT INTO schema_migration_steps (version, step) VALUES (%s, %s)", (number, step))
+                if not backend.transactional_ddl:
+                    connection.commit()
+            cursor.execute("INSERT INTO schema_version (version, description) VALUES (%s, %s)", (number, description))
+            cursor.execute("DELETE FROM schema_migration_steps WHERE version = %s", (number,))
+            if not backend.transactional_ddl:
+                connection.commit()
+            applied.append((number, description))
+        connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+        connection.close()
+    for number, description in applied:
+        print(f"Applied schema migration {number}: {description}")
+    return len(applied)
+
+# The schema is checked on the first transaction of the process, not at import time
+storage.setup = migrate_schema
+
+EMAIL_PATTERN = r'^[\w\.-]+@[a-zA-Z\d\.-]+\.[a-zA-Z]{2,}$'
+
+# What is wrong with a password, or None if it is acceptable
+def password_problem(password):
+    if len(password) < 6 or len(password) > 24:
+        return "Password must be between 6 and 24 characters long."
+    if not re.search(r'[A-Z]', password):
+        return "Password must contain at least one capital letter."
+    if not re.search(r'[0-9]', password):
+        return "Password must contain at least one number."
+    if not re.search(r'[\W_]', password):  # Special character validation
+        return "Password must contain at least one special character."
+    return None
+
+# Function to validate password
+def validate_password(password):
+    problem = password_problem(password)
+    if problem:
+        print(problem)
+        return False
+    return True
+
+def username_taken(username):
+    with storage.transaction() as cursor:
+        cursor.execute("SELECT 1 FROM users WHERE username=%s", (username,))
+        return cursor.fetchone() is not None
+
+# Create an account; returns the role it was given
+@instrumented
+def register_user(username, password, email, allow_admin=True):
+    if not username.isalnum():
+        raise LibraryError("Username must be alphanumeric (letters and numbers only).")
+    problem = password_problem(password)
+    if problem:
+        raise LibraryError(problem)
+    if not re.fullmatch(EMAIL_PATTERN, email):
+        raise LibraryError("Wrong Attempt! Use a valid email format.")
+
+    # Assign role based on username (for simplicity)
+    if username.lower().startswith('admin'):
+        if not allow_admin:
+            raise LibraryError("Admin accounts can only be registered from the console.")
+        role = 'admin'
+    else:
+        role = 'member'
+
+    with storage.transaction(write=True) as cursor:
+        cursor.execute("SELECT 1 FROM users WHERE username=%s", (username,))
+        if cursor.fetchone():
+            raise LibraryError("Username already exists, please choose another.")
+        insert_query = "INSERT INTO users (username, password, email, role) VALUES (%s, %s, %s, %s)"
+        cursor.execute(insert_query, (username, password, email, role))
+        user_id = cursor.lastrowid
+    audit(user_id, 'register', role)
+    return role
+
+# Check a username and password; returns (user_id, username, password, email, role)
+@instrumented
+def authenticate(username, password):
+    user = session_store.cached_user(username)
+    if user is None or user[2] != password:
+        with storage.transaction() as cursor:
+            cursor.execute("SELECT user_id, username, password, email, role FROM users WHERE username=%s AND password=%s", (username, password))
+            user = cursor.fetchone()
+        if user:
+            session_store.cache_user(user)
+    if not user:
+        audit(None, 'login_failed', username)
+        raise LibraryError("Invalid username or password.")
+    audit(user[0], 'login')
+    return user
+
+# Register new user or admin
+@instrumented
+def register():
+    while True:
+        try:
+            print("Register your details here.")
+
+            # Validate username
+            while True:
+                username = input("Create a username (alphanumeric): ")
+                if not username.isalnum():
+                    print("Username must be alphanumeric (letters and numbers only).")
+                elif username_taken(username):
+                    print("Username already exists, please choose another.")
+                else:
+                    break
+
+            # Validate password
+            while True:
+                password = input("Enter the password: ")
+                if validate_password(password):
+                    break
+
+            while True:
+                email = input("Enter the e-mail id: ")
+                if re.fullmatch(EMAIL_PATTERN, email):
+                    break
+                else:
+                    print("Wrong Attempt! Use a valid email format.")
+
+            role = register_user(username, password, email)
+            print(f"You have successfully registered as a {role}!")
+            break
+        except LibraryError as e:
+            print(e)
+        except DB_ERRORS as e:
+            print("Error:", e)
+
+# Add a new author (Admin only)
+@instrumented
+def add_author():
+    while True:
+        try:
+            name = input("Enter author's name: ")
+            bio = input("Enter author's bio: ")
+
+            insert_query = "INSERT INTO authors (name, bio) VALUES (%s, %s)"
+            with storage.transaction() as cursor:
+                cursor.execute(insert_query, (name, bio))
+                author_id = cursor.lastrowid
+            reference_cache.invalidate('authors')
+            search_index.add_author(author_id, name)
+            print("Author added successfully!")
+            break
+        except DB_ERRORS as err:
+            print(f"Error: {err}")
+
+# Fetch one page of authors ordered by name
+@instrumented
+def fetch_authors_page(page_size=PAGE_SIZE, after=None, before=None):
+    with storage.transaction() as cursor:
+        return fetch_page(cursor, "SELECT author_id, name, bio, created_at FROM authors", ['name', 'author_id'], (1, 0),
+                          page_size=page_size, after=after, before=before)
+
+# Author pages are served from the reference cache until an author is added
+def cached_authors_page(page_size=PAGE_SIZE, after=None, before=None):
+    return reference_cache.get(('authors', page_size, after, before), lambda: fetch_authors_page(page_size, after, before))
+
+# View all authors
+@instrumented
+def view_authors():
+    try:
+        browse_pages(cached_authors_page, ["Author ID", "Name", "Bio", "Created At"], "No authors found.")
+    except DB_ERRORS as err:
+        print(f"Error: {err}")
+
+# Add a new book (Admin only)
+@instrumented
+def add_book():
+    while True:
+        try:
+            title = input("Enter book title: ")
+            author_id = int(input("Enter author ID: "))
+
+            # Check if the author exists
+            with storage.transaction() as cursor:
+                cursor.execute("SELECT * FROM authors WHERE author_id=%s", (author_id,))
+                author = cursor.fetchone()
+
+            if not author:
+                print("Author does not exist. Please add the author first.")
+                add_author()  # Option to add the author if they don't exist
+                continue
+
+            genre = input("Enter book genre: ")
+            description = input("Enter book description: ")
+            copies = int(input("Enter number of copies (default 1): ") or 1)
+            if copies < 1:
+                print("A book needs at least one copy.")
+                continue
+            insert_query = ("INSERT INTO books (title, author_id, genre, description, status, total_copies, available_copies) "
+                            "VALUES (%s, %s, %s, %s, 'Available', %s, %s)")
+            with storage.transaction(write=True) as cursor:
+                cursor.execute(insert_query, (title, author_id, genre, description, copies, copies))
+                book_id = cursor.lastrowid
+                create_copies(cursor, [(book_id, copies)])
+            reference_cache.invalidate('genres')
+            search_index.add_book(book_id, title, author_id, genre, description)
+            print(f"Book added successfully with {copies} {'copy' if copies == 1 else 'copies'} (book ID {book_id})!")
+            break
+        except ValueError:
+            print("Please enter a number.")
+        except DB_ERRORS as err:
+            print(f"Error: {err}")
+
+# Insert the copy rows for (book_id, count) pairs
+def create_copies(cursor, counts):
+    cursor.executemany("INSERT INTO book_copies (book_id, status) VALUES (%s, 'Available')",
+                       [(book_id,) for book_id, count in counts for _ in range(count)])
+
+# Add copies of an existing title; waiting holds get the new copies first (Admin only)
+@instrumented
+def add_copies(book_id, count):
+    if count < 1:
+        raise LibraryError("Enter at least one copy.")
+    now = datetime.now()
+    assigned = 0
+    with storage.transaction(write=True) as cursor:
+        cursor.execute("UPDATE books SET total_copies = total_copies + %s WHERE book_id=%s", (count, book_id))
+        if cursor.rowcount != 1:
+            raise LibraryError("Book not found.")
+        for _ in range(count):
+            cursor.execute("INSERT INTO book_copies (book_id, status) VALUES (%s, 'Available')", (book_id,))
+            if release_copy(cursor, book_id, cursor.lastrowid, now):
+                assigned += 1
+    return assigned
+
+@instrumented
+def add_book_copies():
+    try:
+        book_id = int(input("Enter book ID: "))
+        count = int(input("Enter number of copies to add: "))
+        assigned = add_copies(book_id, count)
+        print(f"Added {count} {'copy' if count == 1 else 'copies'}." + (f" {assigned} went to members waiting on holds." if assigned else ""))
+    except ValueError:
+        print("Please enter a number.")
+    except LibraryError as err:
+        print(err)
+    except DB_ERRORS as err:
+        print(f"Error: {err}")
+
+# Fetch one page of books ordered by title, optionally filtered by genre, status or author
+@instrumented
+def fetch_books_page(page_size=PAGE_SIZE, after=None, before=None, genre=None, status=None, author_id=None):
+    filters = []
+    params = []
+    if genre:
+        filters.append("genre=%s")
+        params.append(genre)
+    if status:
+        filters.append("status=%s")
+        params.append(status)
+    if author_id:
+        filters.append("author_id=%s")
+        params.append(author_id)
+    with storage.transaction() as cursor:
+        return fetch_page(cursor, "SELECT book_id, title, author_id, genre, description, status, available_copies, total_copies, created_at FROM books", ['title', 'book_id'], (1, 0),
+                          filters, params, page_size, after, before)
+
+# List all books
+@instrumented
+def list_books():
+    try:
+        filters = {}
+        if input("Press Enter to list all books or type 'f' to filter them: ").strip().lower() == 'f':
+            filters['genre'] = input("Genre (leave blank for any): ").strip() or None
+            filters['status'] = input("Status, e.g. Available (leave blank for any): ").strip() or None
+            while True:
+                author_id = input("Author ID (leave blank for any): ").strip()
+                try:
+                    filters['author_id'] = int(author_id) if author_id else None
+                    break
+                except ValueError:
+                    print("Please enter a number.")
+        browse_pages(fetch_books_page, ["Book ID", "Title", "Author ID", "Genre", "Description", "Status", "Available", "Copies", "Created At"], "No books found.", **filters)
+    except DB_ERRORS as err:
+        print(f"Error: {err}")
+
+@instrumented
+def fetch_genres():
+    with storage.transaction() as cursor:
+        cursor.execute("SELECT DISTINCT genre FROM books ORDER BY genre ASC")
+        return cursor.fetchall()
+
+# View genres
+@instrumented
+def view_genres():
+    try:
+        result = reference_cache.get(('genres',), fetch_genres)
+        if result:
+            print(tabulate(result, headers=["Genre"]))
+        else:
+            print("No genres found.")
+    except DB_ERRORS as err:
+        print(f"Error: {err}")
+
+# View author information
+@instrumented
+def view_author_info():
+    try:
+        browse_pages(cached_authors_page, ["Author ID", "Name", "Bio", "Created At"], "Author not found.")
+    except DB_ERRORS as err:
+        print(f"Error: {err}")
+
+# Circulation rules
+LOAN_DAYS = 14  # Borrow period
+BORROW_FEE = 5.00  # Fixed charge for borrowing a book
+FINE_PER_DAY = 2.00  # Late fee per day
+CHECKOUT_CANDIDATES = 10  # Records of one title tried before giving up under contention
+HOLD_PICKUP_DAYS = int(os.environ.get('LIBRARY_HOLD_PICKUP_DAYS', '3'))  # A copy set aside waits this long for its member
+
+
+def calculate_fine(due_date, return_date):
+    if return_date > due_date:
+        return (return_date - due_date).days * FINE_PER_DAY
+    return 0.0
+
+# Take a copy off a title's shelf: the counter is decremented with a conditional UPDATE
+# that only matches while copies are left, so availability is one row read and two
+# members can never both get the last copy. Returns (book_id, copy_id, genre).
+def claim_available_copy(cursor, book_title):
+    cursor.execute("SELECT book_id, genre FROM books WHERE title=%s AND available_copies > 0 ORDER BY book_id LIMIT %s", (book_title, CHECKOUT_CANDIDATES))
+    candidates = cursor.fetchall()
+    for book_id, genre in candidates:
+        # status is set first: MySQL applies assignments left to right, SQLite all at once
+        cursor.execute("UPDATE books SET status = CASE WHEN available_copies > 1 THEN 'Available' ELSE 'Borrowed' END, "
+                       "available_copies = available_copies - 1 WHERE book_id=%s AND available_copies > 0", (book_id,))
+        if cursor.rowcount != 1:
+            continue
+        cursor.execute(storage.backend.for_update("SELECT copy_id FROM book_copies WHERE book_id=%s AND status='Available' ORDER BY copy_id LIMIT 1"), (book_id,))
+        copy = cursor.fetchone()
+        if copy is None:
+            raise LibraryError("Sorry, this book is currently unavailable.")  # Rolls the counter back too
+        cursor.execute("UPDATE book_copies SET status='Borrowed' WHERE copy_id=%s", (copy[0],))
+        return book_id, copy[0], genre
+
+    if not candidates:
+        cursor.execute("SELECT 1 FROM books WHERE title=%s LIMIT 1", (book_title,))
+        if not cursor.fetchone():
+            raise LibraryError("Book not found.")
+    raise LibraryError("Sorry, this book is currently unavailable. You can place a hold on it.")
+
+# The copy set aside for the member's hold on this title, if one is waiting for them
+def claim_ready_hold(cursor, user_id, book_title):
+    # The copy may belong to any record of the title, so the loan goes on the copy's record
+    cursor.execute("SELECT h.hold_id, c.book_id, h.copy_id, b.genre FROM holds h JOIN book_copies c ON c.copy_id = h.copy_id "
+                   "JOIN books b ON b.book_id = c.book_id WHERE h.user_id=%s AND h.status='Ready' AND b.title=%s ORDER BY h.hold_id LIMIT 1",
+                   (user_id, book_title))
+    hold = cursor.fetchone()
+    if not hold:
+        return None
+    hold_id, book_id, copy_id, genre = hold
+    cursor.execute("UPDATE holds SET status='Fulfilled' WHERE hold_id=%s AND status='Ready'", (hold_id,))
+    if cursor.rowcount != 1:
+        return None  # Cancelled meanwhile
+    cursor.execute("UPDATE book_copies SET status='Borrowed' WHERE copy_id=%s", (copy_id,))
+    return book_id, copy_id, genre
+
+# Holds on a title queue on its first book record (see place_hold()); maps each book
+# record to the record its title's holds queue on
+def hold_queues(cursor, book_ids):
+    return dict(select_in(cursor, "SELECT b.book_id, MIN(t.book_id) FROM books b JOIN books t ON t.title = b.title "
+                                  "WHERE b.book_id IN ({placeholders}) GROUP BY b.book_id", book_ids))
+
+# A copy came back (or was added): give it to the first member waiting on the title, or
+# put it back on its record's shelf. Returns the hold it was assigned to, or None.
+def release_copy(cursor, book_id, copy_id, now):
+    cursor.execute(storage.backend.for_update("SELECT hold_id FROM holds WHERE book_id=%s AND status='Waiting' ORDER BY hold_id LIMIT 1"),
+                   (hold_queues(cursor, [book_id])[book_id],))
+    hold = cursor.fetchone()
+    if hold:
+        cursor.execute("UPDATE holds SET status='Ready', copy_id=%s, ready_at=%s WHERE hold_id=%s", (copy_id, now, hold[0]))
+        cursor.execute("UPDATE book_copies SET status='On Hold' WHERE copy_id=%s", (copy_id,))
+        return hold[0]
+    cursor.execute("UPDATE book_copies SET status='Available' WHERE copy_id=%s", (copy_id,))
+    cursor.execute("UPDATE books SET status='Available', available_copies = available_copies + 1 WHERE book_id=%s", (book_id,))
+    return None
+
+# Borrow a copy of a title and take the borrowing fee in one transaction. A copy held
+# for the member is used first; otherwise one is taken off the shelf.
+@instrumented
+def checkout_book(user_id, book_title, payment_method):
+    checkout_date = datetime.now()
+    due_date = checkout_date + timedelta(days=LOAN_DAYS)
+    with storage.transaction(write=True) as cursor:
+        book_id, copy_id, genre = claim_ready_hold(cursor, user_id, book_title) or claim_available_copy(cursor, book_title)
+        # Read after the claim: its lock on the book row makes a concurrent borrow of the same book wait
+        cursor.execute(storage.backend.for_update("SELECT 1 FROM transactions WHERE book_id=%s AND user_id=%s AND return_date IS NULL"), (book_id, user_id))
+        if cursor.fetchone():
+            raise LibraryError("You already have this book borrowed.")  # Rolls the claim back too
+        cursor.execute("INSERT INTO transactions (user_id, book_id, copy_id, book_title, checkout_date, due_date) VALUES (%s, %s, %s, %s, %s, %s)",
+                       (user_id, book_id, copy_id, book_title, checkout_date, due_date))
+        transaction_id = cursor.lastrowid
+        cursor.execute("INSERT INTO payments (user_id, amount, method, date, status) VALUES (%s, %s, %s, %s, 'Completed')",
+                       (user_id, BORROW_FEE, payment_method, checkout_date))
+        record_checkout_stats(cursor, [(book_id, genre)], checkout_date)
+        record_payment_stats(cursor, BORROW_FEE, checkout_date)
+    audit(user_id, 'borrow', f"book {book_id} copy {copy_id}")
+    recommendation_updater.submit([(user_id, book_id, transaction_id)])
+    return book_id, due_date
+
+# Return one copy, identified by its book ID; returns the title and the fine charged
+@instrumented
+def checkin_book(user_id, book_id):
+    return_date = datetime.now()
+    with storage.transaction(write=True) as cursor:
+        cursor.execute("SELECT transaction_id, book_title, due_date, copy_id FROM transactions WHERE book_id=%s AND user_id=%s AND return_date IS NULL", (book_id, user_id))
+        transaction = cursor.fetchone()
+        if not transaction:
+            raise LibraryError("No such borrowed book found.")
+
+        transaction_id, book_title, due_date, copy_id = transaction
+        fine_amount = calculate_fine(due_date, return_date)
+        cursor.execute("UPDATE transactions SET return_date=%s, fine_amount=%s WHERE transaction_id=%s AND return_date IS NULL",
+                       (return_date, fine_amount, transaction_id))
+        if cursor.rowcount != 1:
+            raise LibraryError("This book has already been returned.")
+        release_copy(cursor, book_id, copy_id, return_date)
+        record_checkin_stats(cursor)
+    audit(user_id, 'return', f"book {book_id} copy {copy_id} fine {fine_amount:.2f}")
+    return book_title, fine_amount
+
+# Join the queue for a title with no copies left; returns the hold ID and queue position.
+# Holds wait on the title's first book record, and a copy of any of its records that
+# comes back goes to them in order.
+@instrumented
+def place_hold(user_id, book_title):
+    with storage.transaction(write=True) as cursor:
+        cursor.execute(storage.backend.for_update("SELECT book_id, available_copies FROM books WHERE title=%s ORDER BY book_id LIMIT %s"),
+                       (book_title, CHECKOUT_CANDIDATES))
+        records = cursor.fetchall()
+        if not records:
+            raise LibraryError("Book not found.")
+        if any(available > 0 for _, available in records):
+            raise LibraryError("A copy is available now, you can borrow it instead.")
+        book_id = records[0][0]
+        cursor.execute("SELECT 1 FROM holds WHERE user_id=%s AND book_id=%s AND status IN ('Waiting', 'Ready')", (user_id, book_id))
+        if cursor.fetchone():
+            raise LibraryError("You already have a hold on this book.")
+        cursor.execute("INSERT INTO holds (book_id, user_id, status, created_at) VALUES (%s, %s, 'Waiting', %s)", (book_id, user_id, datetime.now()))
+        hold_id = cursor.lastrowid
+        cursor.execute("SELECT COUNT(*) FROM holds WHERE book_id=%s AND status='Waiting' AND hold_id <= %s", (book_id, hold_id))
+        position = cursor.fetchone()[0]
+    return hold_id, position
+
+# Give up a hold; a copy that was set aside goes to the next member in the queue
+@instrumented
+def cancel_hold(user_id, hold_id):
+    with storage.transaction(write=True) as cursor:
+        cursor.execute(storage.backend.for_update("SELECT h.status, h.copy_id, c.book_id FROM holds h LEFT JOIN book_copies c ON c.copy_id = h.copy_id "
+                                                  "WHERE h.hold_id=%s AND h.user_id=%s"), (hold_id, user_id))
+        hold = cursor.fetchone()
+        if not hold or hold[0] not in ('Waiting', 'Ready'):
+            raise LibraryError("No such active hold found.")
+        status, copy_id, book_id = hold
+        cursor.execute("UPDATE holds SET status='Cancelled' WHERE hold_id=%s", (hold_id,))
+        if status == 'Ready':
+            release_copy(cursor, book_id, copy_id, datetime.now())
+
+# Ready holds not collected within pickup_days lapse, and their copies go to the next
+# member in the queue or back on the shelf
+@instrumented
+def expire_ready_holds(pickup_days=HOLD_PICKUP_DAYS, now=None):
+    now = now or datetime.now()
+    report = {'expired': 0, 'passed_on': 0}
+    with storage.transaction(write=True) as cursor:
+        cursor.execute(storage.backend.for_update("SELECT h.hold_id, c.book_id, h.copy_id FROM holds h JOIN book_copies c ON c.copy_id = h.copy_id "
+                                                  "WHERE h.status='Ready' AND h.ready_at < %s ORDER BY h.hold_id"), (now - timedelta(days=pickup_days),))
+        for hold_id, book_id, copy_id in cursor.fetchall():
+            cursor.execute("UPDATE holds SET status='Expired' WHERE hold_id=%s AND status='Ready'", (hold_id,))
+            report['expired'] += 1
+            if release_copy(cursor, book_id, copy_id, now):
+                report['passed_on'] += 1
+    return report
+
+# Expire uncollected holds (Admin only)
+def run_hold_expiry():
+    try:
+        report = expire_ready_holds()
+        print(f"Expired {report['expired']} uncollected holds; {report['passed_on']} copies went to the next member in the queue.")
+    except DB_ERRORS as err:
+        print(f"Error: {err}")
+
+@instrumented
+def fetch_holds(user_id):
+    with storage.transaction() as cursor:
+        cursor.execute("SELECT h.hold_id, b.title, h.status, h.created_at, h.ready_at FROM holds h JOIN books b ON b.book_id = h.book_id "
+                       "WHERE h.user_id=%s AND h.status IN ('Waiting', 'Ready') ORDER BY h.hold_id", (user_id,))
+        return cursor.fetchall()
+
+# Batch circulation for scanner-driven desks: a list of (user_id, book_id) items is
+# resolved with a few IN-list queries, written with executemany and committed once.
+# Every item gets a result of its own; a failed item doesn't stop the rest.
+CIRCULATION_BATCH_LIMIT = 1000
+
+
+# Run a SELECT whose last condition is "IN ({placeholders})" over any number of values
+def select_in(cursor, query, values, params=()):
+    values = list(values)
+    rows = []
+    for start in range(0, len(values), FETCH_CHUNK_SIZE):
+        chunk = values[start:start + FETCH_CHUNK_SIZE]
+        cursor.execute(query.format(placeholders=", ".join(['%s'] * len(chunk))), tuple(params) + tuple(chunk))
+        rows.extend(cursor.fetchall())
+    return rows
+
+
+def batch_items(items):
+    items = [(int(user_id), int(book_id)) for user_id, book_id in items]
+    if len(items) > CIRCULATION_BATCH_LIMIT:
+        raise LibraryError(f"A batch can have at most {CIRCULATION_BATCH_LIMIT} items.")
+    return items
+
+
+# release_copy() for many copies: waiting holds are served in queue order, the rest go
+# back on the shelf with one counter update per title
+def release_copies(cursor, copies, now):
+    queues = hold_queues(cursor, {book_id for book_id, _ in copies})
+    waiting = {}
+    for hold_id, book_id in select_in(cursor, storage.backend.for_update(
+            "SELECT hold_id, book_id FROM holds WHERE status='Waiting' AND book_id IN ({placeholders}) ORDER BY hold_id"),
+            set(queues.values())):
+        waiting.setdefault(book_id, []).append(hold_id)
+    ready, shelved, restocked = [], [], {}
+    for book_id, copy_id in copies:
+        if waiting.get(queues[book_id]):
+            ready.append((copy_id, now, waiting[queues[book_id]].pop(0)))
+        else:
+            shelved.append((copy_id,))
+            restocked[book_id] = restocked.get(book_id, 0) + 1
+    if ready:
+        cursor.executemany("UPDATE holds SET status='Ready', copy_id=%s, ready_at=%s WHERE hold_id=%s", ready)
+        cursor.executemany("UPDATE book_copies SET status='On Hold' WHERE copy_id=%s", [(copy_id,) for copy_id, _, _ in ready])
+    if shelved:
+        cursor.executemany("UPDATE book_copies SET status='Available' WHERE copy_id=%s", shelved)
+        cursor.executemany("UPDATE books SET status='Available', available_copies = available_copies + %s WHERE book_id=%s",
+                           [(count, book_id) for book_id, count in restocked.items()])
+
+
+@instrumented
+def checkout_batch(items, payment_method):
+    items = batch_items(items)
+    checkout_date = datetime.now()
+    due_date = checkout_date + timedelta(days=LOAN_DAYS)
+    book_ids = {book_id for _, book_id in items}
+    results = []
+    with storage.transaction(write=True) as cursor:
+        users = {row[0] for row in select_in(cursor, "SELECT user_id FROM users WHERE user_id IN ({placeholders})", {user_id for user_id, _ in items})}
+        books = {book_id: (title, genre, available) for book_id, title, genre, available in select_in(cursor, storage.backend.for_update(
+            "SELECT book_id, title, genre, available_copies FROM books WHERE book_id IN ({placeholders})"), book_ids)}
+        ready_holds = {}
+        for hold_id, user_id, book_id, copy_id in select_in(cursor, storage.backend.for_update(
+                "SELECT h.hold_id, h.user_id, c.book_id, h.copy_id FROM holds h JOIN book_copies c ON c.copy_id = h.copy_id "
+                "WHERE h.status='Ready' AND c.book_id IN ({placeholders}) ORDER BY h.hold_id"), book_ids):
+            ready_holds.setdefault((user_id, book_id), []).append((hold_id, copy_id))
+        shelf = {}
+        for copy_id, book_id in select_in(cursor, storage.backend.for_update(
+                "SELECT copy_id, book_id FROM book_copies WHERE status='Available' AND book_id IN ({placeholders}) ORDER BY copy_id"),
+                [book_id for book_id, (_, _, available) in books.items() if available > 0]):
+            if len(shelf.setdefault(book_id, [])) < books[book_id][2]:
+                shelf[book_id].append(copy_id)
+        borrowing = {(user_id, book_id) for user_id, book_id in select_in(cursor, storage.backend.for_update(
+            "SELECT user_id, book_id FROM transactions WHERE return_date IS NULL AND book_id IN ({placeholders})"), books)}
+
+        loans, fulfilled, taken = [], [], {}
+        for user_id, book_id in items:
+            result = {'user_id': user_id, 'book_id': book_id, 'ok': False}
+            results.append(result)
+            if user_id not in users:
+                result['error'] = "User not found."
+                continue
+            if book_id not in books:
+                result['error'] = "Book not found."
+                continue
+            if (user_id, book_id) in borrowing:
+                result['error'] = "You already have this book borrowed."
+                continue
+            if ready_holds.get((user_id, book_id)):
+                hold_id, copy_id = ready_holds[(user_id, book_id)].pop(0)
+                fulfilled.append((hold_id,))
+            elif shelf.get(book_id):
+                copy_id = shelf[book_id].pop(0)
+                taken[book_id] = taken.get(book_id, 0) + 1
+            else:
+                result['error'] = "Sorry, this book is currently unavailable."
+                continue
+            title, genre, _ = books[book_id]
+            borrowing.add((user_id, book_id))
+            loans.append((user_id, book_id, copy_id, title, genre))
+            result.update(ok=True, title=title, copy_id=copy_id, due_date=due_date)
+
+        if loans:
+            # status is set first: MySQL applies assignments left to right, SQLite all at once
+            cursor.executemany("UPDATE books SET status = CASE WHEN available_copies > %s THEN 'Available' ELSE 'Borrowed' END, "
+                               "available_copies = available_copies - %s WHERE book_id=%s",
+                               [(count, count, book_id) for book_id, count in taken.items()])
+            if fulfilled:
+                cursor.executemany("UPDATE holds SET status='Fulfilled' WHERE hold_id=%s", fulfilled)
+            cursor.executemany("UPDATE book_copies SET status='Borrowed' WHERE copy_id=%s", [(copy_id,) for _, _, copy_id, _, _ in loans])
+            cursor.executemany("INSERT INTO transactions (user_id, book_id, copy_id, book_title, checkout_date, due_date) VALUES (%s, %s, %s, %s, %s, %s)",
+                               [(user_id, book_id, copy_id, title, checkout_date, due_date) for user_id, book_id, copy_id, title, _ in loans])
+            cursor.executemany("INSERT INTO payments (user_id, amount, method, date, status) VALUES (%s, %s, %s, %s, 'Completed')",
+                               [(user_id, BORROW_FEE, payment_method, checkout_date) for user_id, _, _, _, _ in loans])
+            record_checkout_stats(cursor, [(book_id, genre) for _, book_id, _, _, genre in loans], checkout_date)
+            record_payment_stats(cursor, BORROW_FEE * len(loans), checkout_date, len(loans))
+            # A member has at most one open loan per book, so these are the loans just made
+            lent = {(user_id, book_id) for user_id, book_id, _, _, _ in loans}
+            new_loans = [(user_id, book_id, transaction_id) for transaction_id, user_id, book_id in select_in(cursor,
+                         "SELECT transaction_id, user_id, book_id FROM transactions WHERE return_date IS NULL AND book_id IN ({placeholders})",
+                         {book_id for _, book_id in lent}) if (user_id, book_id) in lent]
+    for user_id, book_id, copy_id, _, _ in loans:
+        audit(user_id, 'borrow', f"book {book_id} copy {copy_id}")
+    if loans:
+        recommendation_updater.submit(new_loans)
+    return results
+
+
+@instrumented
+def checkin_batch(items):
+    items = batch_items(items)
+    return_date = datetime.now()
+    results = []
+    with storage.transaction(write=True) as cursor:
+        open_loans = {}
+        for transaction_id, user_id, book_id, book_title, due_date, copy_id in select_in(cursor, storage.backend.for_update(
+                "SELECT transaction_id, user_id, book_id, book_title, due_date, copy_id FROM transactions "
+                "WHERE return_date IS NULL AND book_id IN ({placeholders}) ORDER BY transaction_id"), {book_id for _, book_id in items}):
+            open_loans.setdefault((user_id, book_id), []).append((transaction_id, book_title, due_date, copy_id))
+
+        returned = []
+        for user_id, book_id in items:
+            result = {'user_id': user_id, 'book_id': book_id, 'ok': False}
+            results.append(result)
+            if not open_loans.get((user_id, book_id)):
+                result['error'] = "No such borrowed book found."
+                continue
+            transaction_id, book_title, due_date, copy_id = open_loans[(user_id, book_id)].pop(0)
+            fine_amount = calculate_fine(due_date, return_date)
+            returned.append((transaction_id, book_id, copy_id, fine_amount))
+            result.update(ok=True, title=book_title, fine_amount=fine_amount)
+
+        if returned:
+            cursor.executemany("UPDATE transactions SET return_date=%s, fine_amount=%s WHERE transaction_id=%s AND return_date IS NULL",
+                               [(return_date, fine_amount, transaction_id) for transaction_id, _, _, fine_amount in returned])
+            release_copies(cursor, [(book_id, copy_id) for _, book_id, copy_id, _ in returned], return_date)
+            record_checkin_stats(cursor, len(returned))
+    for result in results:
+        if result['ok']:
+            audit(result['user_id'], 'return', f"book {result['book_id']} fine {result['fine_amount']:.2f}")
+    return results
+
+# Borrow a book
+@instrumented
+def borrow_book(session):
+    try:
+        book_title = input("Enter book title to borrow: ")
+        method = input("Enter payment method (e.g., Credit Card, PayPal): ")
+        book_id, due_date = checkout_book(session.user_id, book_title, method)
+        print(f"Book '{book_title}' (book ID {book_id}) has been borrowed successfully. Due date is {due_date.strftime('%Y-%m-%d')}.")
+        print(f"Payment of ${BORROW_FEE:.2f} for the book '{book_title}' has been processed successfully.")
+        suggestions = recommend_books(book_id)
+        if suggestions:
+            print("\nMembers who borrowed this also borrowed:")
+            print(tabulate([(title, status) for _, title, status, _ in suggestions], headers=["Title", "Status"]))
+    except LibraryError as err:
+        print(err)
+    except DB_ERRORS as err:
+        print(f"Error: {err}")
+
+
+# Return a borrowed book
+@instrumented
+def return_book(session):
+    try:
+        book_id = int(input("Enter the book ID to return: "))
+        book_title, fine_amount = checkin_book(session.user_id, book_id)
+        print(f"Book '{book_title}' returned successfully. Fine amount: ${fine_amount:.2f}")
+    except ValueError:
+        print("Please enter a number.")
+    except LibraryError as err:
+        print(err)
+    except DB_ERRORS as err:
+        print(f"Error: {err}")
+
+# Place a hold on a book that is out
+@instrumented
+def hold_book(session):
+    try:
+        book_title = input("Enter book title to place a hold on: ")
+        hold_id, position = place_hold(session.user_id, book_title)
+        print(f"Hold {hold_id} placed. You are number {position} in the queue for '{book_title}'.")
+    except LibraryError as err:
+        print(err)
+    except DB_ERRORS as err:
+        print(f"Error: {err}")
+
+# View and cancel holds
+@instrumented
+def view_holds(session):
+    try:
+        holds = fetch_holds(session.user_id)
+        if not holds:
+            print("You have no holds.")
+            return
+        print(tabulate(holds, headers=["Hold ID", "Title", "Status", "Placed", "Ready Since"]))
+        print("Holds marked Ready have a copy set aside for you; borrow the title to collect it.")
+        hold_id = input("Enter a hold ID to cancel it or press Enter to go back: ").strip()
+        if hold_id:
+            cancel_hold(session.user_id, int(hold_id))
+            print("Hold cancelled.")
+    except ValueError:
+        print("Please enter a number.")
+    except LibraryError as err:
+        print(err)
+    except DB_ERRORS as err:
+        print(f"Error: {err}")
+
+# Check a stack of books in or out at once (Admin only)
+@instrumented
+def circulation_desk():
+    mode = input("Enter 'o' to check books out or 'i' to check books in: ").strip().lower()
+    if mode not in ('o', 'i'):
+        print("Invalid choice.")
+        return
+    method = input("Enter payment method (e.g., Credit Card, PayPal): ") if mode == 'o' else None
+    print("Scan or type one 'user_id book_id' pair per line, then an empty line to process them.")
+    items = []
+    while True:
+        line = input().strip()
+        if not line:
+            break
+        parts = line.replace(',', ' ').split()
+        if len(parts) != 2 or not all(part.isdigit() for part in parts):
+            print(f"Ignored '{line}': expected a user ID and a book ID.")
+            continue
+        items.append((int(parts[0]), int(parts[1])))
+    if not items:
+        return
+    try:
+        started = time.perf_counter()
+        results = checkout_batch(items, method) if mode == 'o' else checkin_batch(items)
+        elapsed = time.perf_counter() - started
+    except LibraryError as err:
+        print(err)
+        return
+    except DB_ERRORS as err:
+        print(f"Error: {err}")
+        return
+    rows = []
+    for result in results:
+        if not result['ok']:
+            detail = result['error']
+        elif mode == 'o':
+            detail = f"'{result['title']}' due {result['due_date'].strftime('%Y-%m-%d')}"
+        else:
+            detail = f"'{result['title']}' fine ${result['fine_amount']:.2f}"
+        rows.append((result['user_id'], result['book_id'], 'OK' if result['ok'] else 'Failed', detail))
+    print(tabulate(rows, headers=["User ID", "Book ID", "Result", "Details"]))
+    succeeded = sum(1 for result in results if result['ok'])
+    print(f"{succeeded} of {len(results)} items processed in {elapsed:.2f}s.")
+    if mode == 'o' and succeeded:
+        print(f"Payments of ${BORROW_FEE * succeeded:.2f} in total have been processed.")
+
+# Fetch one page of a member's loans, newest first, from both the live and the archive
+# table. The live table is read first: a loan archived in between then shows up in both
+# reads and is dropped once, instead of being missed.
+@instrumented
+def fetch_borrowing_history(user_id, page_size=PAGE_SIZE, after=None, before=None):
+    columns = "transaction_id, book_id, book_title, checkout_date, due_date, return_date, fine_amount"
+    rows = {}
+    with storage.transaction() as cursor:
+        for table in ('transactions', 'transactions_archive'):
+            for row in seek_rows(cursor, f"SELECT {columns} FROM {table}", ['checkout_date', 'transaction_id'],
+                                 ['user_id = %s'], (user_id,), page_size, after, before, descending=True):
+                rows.setdefault(row[0], row)
+    # Scan order is newest first, or oldest first when paging backwards
+    merged = sorted(rows.values(), key=lambda row: (row[3], row[0]), reverse=before is None)
+    return make_page(merged[:page_size + 1], (3, 0), page_size, after, before)
+
+# View borrowing history
+@instrumented
+def view_borrowing_history(session):
+    try:
+        browse_pages(fetch_borrowing_history, ["Transaction ID", "Book ID", "Book Title", "Checkout Date", "Due Date", "Return Date", "Fine Amount"],
+                     "No borrowing history found.", user_id=session.user_id)
+    except DB_ERRORS as err:
+        print(f"Error: {err}")
+
+@instrumented
+def submit_feedback(user_id, content, wait=True):
+    if not content.strip():
+        raise LibraryError("Feedback can't be empty.")
+    insert_query = "INSERT INTO feedback (user_id, content, date_submitted) VALUES (%s, %s, %s)"
+    ack = write_buffer.append(insert_query, (user_id, content, datetime.now()))
+    if wait:
+        ack.result(POOL_TIMEOUT)
+
+# Provide feedback
+@instrumented
+def provide_feedback(session):
+    feedback_content = input("Enter your feedback: ")
+
+    try:
+        submit_feedback(session.user_id, feedback_content)
+        print("Feedback submitted successfully!")
+    except LibraryError as err:
+        print(err)
+    except DB_ERRORS as err:
+        print(f"Error: {err}")
+
+# Fetch one page of feedback, newest first
+@instrumented
+def fetch_feedback_page(page_size=PAGE_SIZE, after=None, before=None):
+    with storage.transaction() as cursor:
+        return fetch_page(cursor, "SELECT f.feedback_id, u.username, f.content, f.date_submitted FROM feedback f JOIN users u ON f.user_id = u.user_id",
+                          ['f.date_submitted', 'f.feedback_id'], (3, 0), page_size=page_size, after=after, before=before, descending=True)
+
+# View feedback
+@instrumented
+def view_feedback():
+    try:
+        browse_pages(fetch_feedback_page, ["Feedback ID", "Username", "Content", "Date Submitted"], "No feedback available.")
+    except DB_ERRORS as err:
+        print(f"Error: {err}")
+
+
+# Catalog search: an in-process inverted index over book titles, descriptions,
+# genres and author names, ranked with BM25
+SEARCH_INDEX_PATH = os.environ.get('LIBRARY_SEARCH_INDEX', 'catalog_search.index')
+SEARCH_FIELD_WEIGHTS = {'title': 3.0, 'author': 2.0, 'genre': 1.5, 'description': 1.0}
+SEARCH_STOPWORDS = frozenset(['a', 'an', 'and', 'at', 'by', 'for', 'in', 'of', 'on', 'or', 'the', 'to', 'with'])
+SEARCH_TYPO_ALPHABET = 'abcdefghijklmnopqrstuvwxyz0123456789'
+SEARCH_MAX_EXPANSIONS = 30
+SEARCH_JOURNAL_LIMIT = 10000
+SEARCH_SYNC_INTERVAL = float(os.environ.get('LIBRARY_SEARCH_SYNC_SECONDS', '1'))  # How stale a query may see the catalog
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def tokenize(text):
+    if not text:
+        return []
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in SEARCH_STOPWORDS]
+
+
+# All strings one edit (delete, swap, replace, insert) away from the token
+def one_edit_variants(token):
+    splits = [(token[:i], token[i:]) for i in range(len(token) + 1)]
+    variants = {left + right[1:] for left, right in splits if right}
+    variants |= {left + right[1] + right[0] + right[2:] for left, right in splits if len(right) > 1}
+    variants |= {left + c + right[1:] for left, right in splits if right for c in SEARCH_TYPO_ALPHABET}
+    variants |= {left + c + right for left, right in splits for c in SEARCH_TYPO_ALPHABET}
+    variants.discard(token)
+    return variants
+
+
+class SearchIndex:
+    BM25_K1 = 1.2
+    BM25_B = 0.75
+
+    def __init__(self, path=SEARCH_INDEX_PATH):
+        self.path = path
+        self.journal_path = path + '.journal'
+        self.lock = threading.RLock()
+        self.loaded = False
+        self.reset()
+
+    def reset(self):
+        self.postings = {}      # token -> {book_id: weighted term frequency}
+        self.doc_lengths = {}   # book_id -> weighted document length
+        self.total_length = 0.0
+        self.vocabulary = []    # sorted tokens, for prefix matching
+        self.authors = {}       # author_id -> name
+        # Highest ids read by sync(). add_book()/add_author() don't move them, so rows other
+        # processes inserted below an id this process added are still picked up.
+        self.synced_book_id = 0
+        self.synced_author_id = 0
+        self.synced_at = None
+        self.journal_entries = 0
+
+    # Load the saved index on first use, then catch up with rows other processes added
+    # at most every SEARCH_SYNC_INTERVAL seconds
+    def ensure_loaded(self):
+        with self.lock:
+            if not self.loaded:
+                self.load()
+                self.loaded = True
+            elif self.synced_at is not None and time.monotonic() - self.synced_at < SEARCH_SYNC_INTERVAL:
+                return
+        self.sync()
+
+    # The snapshot is plain JSON; each posting list is stored as [book_ids, frequencies]
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as index_file:
+                state = json.load(index_file)
+            self.postings = {token: dict(zip(book_ids, frequencies)) for token, (book_ids, frequencies) in state['postings'].items()}
+            self.doc_lengths = dict(zip(*state['doc_lengths']))
+            self.total_length = float(state['total_length'])
+            self.authors = dict(zip(*state['authors']))
+            self.synced_book_id = int(state['synced_book_id'])
+            self.synced_author_id = int(state['synced_author_id'])
+            self.vocabulary = sorted(self.postings)
+        except FileNotFoundError:
+            self.reset()
+        except (OSError, ValueError, KeyError, TypeError) as err:
+            print(f"Search index at {self.path} is unreadable ({err}), rebuilding it.")
+            self.reset()
+        try:
+            with open(self.journal_path, encoding='utf-8') as journal:
+                for line in journal:
+                    entry = json.loads(line)
+                    if entry['kind'] == 'author':
+                        self._add_author(*entry['row'])
+                    else:
+                        self._add_book(*entry['row'])
+                    self.journal_entries += 1
+        except FileNotFoundError:
+            pass
+
+    # Write a full snapshot atomically and start an empty journal
+    def save(self):
+        with self.lock:
+            state = {
+                'postings': {token: [list(postings), list(postings.values())] for token, postings in self.postings.items()},
+                'doc_lengths': [list(self.doc_lengths), list(self.doc_lengths.values())],
+                'total_length': self.total_length,
+                'authors': [list(self.authors), list(self.authors.values())],
+                'synced_book_id': self.synced_book_id,
+                'synced_author_id': self.synced_author_id,
+            }
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as index_file:
+                json.dump(state, index_file, separators=(',', ':'))
+            os.replace(temp_path, self.path)
+            try:
+                os.remove(self.journal_path)
+            except FileNotFoundError:
+                pass
+            self.journal_entries = 0
+
+    def _journal(self, kind, row):
+        with open(self.journal_path, 'a', encoding='utf-8') as journal:
+            journal.write(json.dumps({'kind': kind, 'row': row}) + '\n')
+        self.journal_entries += 1
+        if self.journal_entries >= SEARCH_JOURNAL_LIMIT:
+            self.save()
+
+    def _add_author(self, author_id, name):
+        self.authors[author_id] = name
+
+    def _add_book(self, book_id, title, author_id, genre, description):
+        if book_id in self.doc_lengths:
+            return
+        frequencies = {}
+        fields = {'title': title, 'author': self.authors.get(author_id), 'genre': genre, 'description': description}
+        for field, text in fields.items():
+            weight = SEARCH_FIELD_WEIGHTS[field]
+            for token in tokenize(text):
+                frequencies[token] = frequencies.get(token, 0.0) + weight
+        for token, frequency in frequencies.items():
+            postings = self.postings.get(token)
+            if postings is None:
+                postings = self.postings[token] = {}
+                bisect.insort(self.vocabulary, token)
+            postings[book_id] = frequency
+        length = sum(frequencies.values())
+        self.doc_lengths[book_id] = length
+        self.total_length += length
+
+    # Called by add_author/add_book so the index never needs a rebuild
+    def add_author(self, author_id, name):
+        with self.lock:
+            if not self.loaded:
+                return  # Picked up by sync() on first use
+            self._add_author(author_id, name)
+            self._journal('author', [author_id, name])
+
+    def add_book(self, book_id, title, author_id, genre, description):
+        with self.lock:
+            if not self.loaded:
+                return
+            self._add_book(book_id, title, author_id, genre, description)
+            self._journal('book', [book_id, title, author_id, genre, description])
+
+    # Index authors and books added to the database by other processes or bulk loads
+    def sync(self):
+        added = 0
+        self.synced_at = time.monotonic()
+        with storage.transaction() as cursor:
+            cursor.execute("SELECT author_id, name FROM authors WHERE author_id > %s ORDER BY author_id", (self.synced_author_id,))
+            with self.lock:
+                for author_id, name in stream_rows(cursor):
+                    self._add_author(author_id, name)
+                    self.synced_author_id = max(self.synced_author_id, author_id)
+            cursor.execute("SELECT book_id, title, author_id, genre, description FROM books WHERE book_id > %s ORDER BY book_id", (self.synced_book_id,))
+            for rows in iter(lambda: cursor.fetchmany(FETCH_CHUNK_SIZE), []):
+                with self.lock:
+                    for row in rows:
+                        self._add_book(*row)
+                    self.synced_book_id = max(self.synced_book_id, rows[-1][0])
+                added += len(rows)
+        if added:
+            self.save()
+        return added
+
+    # Throw the saved index away and index the whole catalog again
+    def rebuild(self):
+        with self.lock:
+            self.reset()
+            self.loaded = True
+        started = time.perf_counter()
+        books = self.sync()
+        self.save()
+        return {'books': books, 'terms': len(self.postings), 'seconds': round(time.perf_counter() - started, 2)}
+
+    # Query tokens mapped to index tokens: exact, then prefix, then one-typo matches
+    def expand(self, term):
+        matches = []
+        if term in self.postings:
+            matches.append((term, 1.0))
+        start = bisect.bisect_right(self.vocabulary, term)
+        for token in self.vocabulary[start:start + SEARCH_MAX_EXPANSIONS]:
+            if not token.startswith(term):
+                break
+            matches.append((token, 0.7))
+        if not matches and len(term) >= 4:
+            matches = [(token, 0.5) for token in one_edit_variants(term) if token in self.postings]
+        return matches
+
+    def search(self, query, limit=10):
+        self.ensure_loaded()
+        with self.lock:
+            document_count = len(self.doc_lengths)
+            if not document_count:
+                return []
+            average_length = self.total_length / document_count
+            # Posting lists are walked from the largest possible contribution (rarest term)
+            # down. A book can gain at most boost * idf * (k1 + 1) from a list, so once the
+            # k-th best partial score beats everything the remaining lists could add, no
+            # book not seen yet can reach the top k and those lists only rescore the books
+            # already found.
+            lists = []
+            for term in set(tokenize(query)):
+                for token, boost in self.expand(term):
+                    postings = self.postings[token]
+                    idf = math.log(1 + (document_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    lists.append((boost * idf * (self.BM25_K1 + 1), boost * idf, postings))
+            lists.sort(key=lambda entry: entry[0], reverse=True)
+            remaining = sum(bound for bound, _, _ in lists)
+            scores = {}
+            pruned = False
+            for bound, weight, postings in lists:
+                if not pruned and len(scores) >= limit:
+                    pruned = heapq.nlargest(limit, scores.values())[-1] > remaining
+                if not pruned:
+                    entries = postings.items()
+                elif len(postings) > len(scores):
+                    entries = [(book_id, postings[book_id]) for book_id in scores if book_id in postings]
+                else:
+                    entries = [(book_id, frequency) for book_id, frequency in postings.items() if book_id in scores]
+                remaining -= bound
+                for book_id, frequency in entries:
+                    norm = self.BM25_K1 * (1 - self.BM25_B + self.BM25_B * self.doc_lengths[book_id] / average_length)
+                    scores[book_id] = scores.get(book_id, 0.0) + weight * frequency * (self.BM25_K1 + 1) / (frequency + norm)
+            return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+
+search_index = SearchIndex()
+
+
+# Search the catalog; returns book rows in ranked order
+@instrumented
+def search_books(query, limit=10):
+    ranked = search_index.search(query, limit)
+    if not ranked:
+        return []
+    book_ids = [book_id for book_id, _ in ranked]
+    with storage.transaction() as cursor:
+        placeholders = ", ".join(["%s"] * len(book_ids))
+        cursor.execute(f"SELECT book_id, title, author_id, genre, status FROM books WHERE book_id IN ({placeholders})", book_ids)
+        rows = {row[0]: row for row in cursor.fetchall()}
+    return [rows[book_id] for book_id in book_ids if book_id in rows]
+
+# Search books by title, author, genre or description
+@instrumented
+def search_catalog():
+    query = input("Search for books: ")
+    try:
+        results = search_books(query)
+        if results:
+            print(tabulate(results, headers=["Book ID", "Title", "Author ID", "Genre", "Status"]))
+        else:
+            print("No matching books found.")
+    except DB_ERRORS as err:
+        print(f"Error: {err}")
+
+
+# Bulk catalog import: stream CSV or JSON Lines records into books in batches,
+# one transaction per batch, without prompting for every row
+IMPORT_BATCH_SIZE = int(os.environ.get('LIBRARY_IMPORT_BATCH_SIZE', '5000'))
+
+
+# Yield (line number, record) pairs; unreadable JSON lines come back as None
+def read_catalog_records(path, file_format=None):
+    if file_format is None:
+        file_format = 'jsonl' if path.lower().endswith(('.jsonl', '.json')) else 'csv'
+    with open(path, newline='', encoding='utf-8') as source:
+        if file_format == 'csv':
+            import csv
+            yield from enumerate(csv.DictReader(source), start=2)
+        else:
+            for line_number, line in enumerate(source, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_number, json.loads(line)
+                except json.JSONDecodeError:
+                    yield line_number, None
+
+
+# Name -> author_id for every author, read once so imports don't query per row
+def load_author_map():
+    author_ids = {}
+    with storage.transaction() as cursor:
+        cursor.execute("SELECT author_id, name FROM authors ORDER BY author_id")
+        for author_id, name in stream_rows(cursor):
+            author_ids.setdefault(name, author_id)
+    return author_ids
+
+
+# Create the authors that aren't in the map yet; returns their new ids. They are inserted
+# one at a time for lastrowid: reading ids back by name would fold "Smith" and "SMITH"
+# together under MySQL's case-insensitive collation and leave one of them without an id.
+def create_missing_authors(cursor, author_ids, names):
+    created = {}
+    for name in sorted(name for name in names if name and name not in author_ids):
+        cursor.execute("INSERT INTO authors (name) VALUES (%s)", (name,))
+        created[name] = cursor.lastrowid
+    return created
+
+
+def record_text(record, field):
+    value = record.get(field)
+    return str(value).strip() if value is not None else ''
+
+
+@instrumented
+def import_catalog(path, file_format=None, batch_size=IMPORT_BATCH_SIZE):
+    if batch_size < 1:
+        raise LibraryError("Rows per batch must be at least 1.")
+    started = time.perf_counter()
+    report = {'imported': 0, 'skipped': [], 'authors_created': 0, 'failed_batches': [], 'seconds': 0.0, 'rows_per_second': 0.0}
+    author_ids = load_author_map()
+    records = read_catalog_records(path, file_format)
+    batch_number = 0
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            break
+        batch_number += 1
+
+        books = []
+        for line_number, record in batch:
+            if not isinstance(record, dict) or not record_text(record, 'title'):
+                report['skipped'].append(line_number)
+                continue
+            try:
+                copies = int(record_text(record, 'copies') or 1)
+            except ValueError:
+                copies = 0
+            if copies < 1:
+                report['skipped'].append(line_number)
+                continue
+            books.append((record_text(record, 'title'), record_text(record, 'author'),
+                          record_text(record, 'genre') or None, record_text(record, 'description') or None, copies))
+        if not books:
+            continue
+
+        try:
+            with storage.transaction() as cursor:
+                created = create_missing_authors(cursor, author_ids, {author for _, author, _, _, _ in books})
+                cursor.execute("SELECT COALESCE(MAX(book_id), 0) FROM books")
+                last_book = cursor.fetchone()[0]
+                cursor.executemany("INSERT INTO books (title, author_id, genre, description, status, total_copies, available_copies) "
+                                   "VALUES (%s, %s, %s, %s, 'Available', %s, %s)",
+                                   [(title, created.get(author) or author_ids.get(author), genre, description, copies, copies)
+                                    for title, author, genre, description, copies in books])
+                # executemany doesn't report the new ids; the batch's books are the ones without copies yet
+                cursor.execute("SELECT book_id, total_copies FROM books b WHERE book_id > %s "
+                               "AND NOT EXISTS (SELECT 1 FROM book_copies c WHERE c.book_id = b.book_id)", (last_book,))
+                create_copies(cursor, cursor.fetchall())
+        except DB_ERRORS as err:
+            report['failed_batches'].append((batch_number, batch[0][0], batch[-1][0], str(err)))
+            continue
+        author_ids.update(created)  # Only once the batch is committed
+        report['imported'] += len(books)
+        report['authors_created'] += len(created)
+
+    if report['imported']:
+        reference_cache.invalidate('authors', 'genres')
+    if search_index.loaded:
+        search_index.sync()
+    report['seconds'] = time.perf_counter() - started
+    report['rows_per_second'] = report['imported'] / report['seconds'] if report['seconds'] else 0.0
+    return report
+
+
+def print_import_report(report):
+    print(f"Imported {report['imported']} books and created {report['authors_created']} authors "
+          f"in {report['seconds']:.1f}s ({report['rows_per_second']:.0f} rows/s).")
+    if report['skipped']:
+        shown = ", ".join(map(str, report['skipped'][:20]))
+        print(f"Skipped {len(report['skipped'])} unreadable, untitled or invalid records (lines {shown}{', ...' if len(report['skipped']) > 20 else ''}).")
+    if report['failed_batches']:
+        print(tabulate(report['failed_batches'], headers=["Batch", "First Line", "Last Line", "Error"]))
+
+# Import books from a file (Admin only)
+def import_catalog_file():
+    path = input("Enter the path of the CSV or JSONL file: ").strip()
+    while True:
+        batch_size = input(f"Rows per batch (press Enter for {IMPORT_BATCH_SIZE}): ").strip()
+        try:
+            batch_size = int(batch_size) if batch_size else IMPORT_BATCH_SIZE
+        except ValueError:
+            batch_size = 0
+        if batch_size >= 1:
+            break
+        print("Please enter a whole number of at least 1.")
+    try:
+        print_import_report(import_catalog(path, batch_size=batch_size))
+    except OSError as err:
+        print(f"Error: {err}")
+    except DB_ERRORS as err:
+        print(f"Error: {err}")
+
+
+# Overdue fines for all open loans, computed a chunk at a time with NumPy and written
+# back only where the amount changed, so re-running the job the same day is cheap
+FINE_BATCH_SIZE = int(os.environ.get('LIBRARY_FINE_BATCH_SIZE', '10000'))
+
+
+@instrumented
+def accrue_overdue_fines(now=None, batch_size=FINE_BATCH_SIZE):
+    import numpy as np
+
+    started = time.perf_counter()
+    now = now or datetime.now()
+    now64 = np.datetime64(now, 'us')
+    report = {'scanned': 0, 'updated': 0, 'open_fines': {}, 'seconds': 0.0}
+    open_fines = report['open_fines']
+    after = None
+    while True:
+        # A batch is read and its changes written in separate transactions, so the job
+        # never holds more than one pooled connection (a pool of one would deadlock)
+        with storage.transaction() as reader:
+            rows = seek_rows(reader, "SELECT transaction_id, user_id, due_date, fine_amount FROM transactions", ['due_date', 'transaction_id'],
+                             ["return_date IS NULL", "due_date < %s"], [now], batch_size, after)[:batch_size]
+        if not rows:
+            break
+        after = (rows[-1][2], rows[-1][0])
+        transaction_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        user_ids = np.array([row[1] for row in rows], dtype=np.int64)
+        due_dates = np.array([row[2] for row in rows], dtype='datetime64[us]')
+        current = np.array([float(row[3] or 0) for row in rows])
+
+        # Whole days late, the same rule calculate_fine() applies at return time
+        fines = ((now64 - due_dates) // np.timedelta64(1, 'D')) * FINE_PER_DAY
+        changed = np.flatnonzero(np.abs(fines - current) >= 0.005)
+        if changed.size:
+            with storage.transaction(write=True) as writer:
+                writer.executemany("UPDATE transactions SET fine_amount=%s WHERE transaction_id=%s AND return_date IS NULL",
+                                   [(float(fines[i]), int(transaction_ids[i])) for i in changed])
+
+        users, positions = np.unique(user_ids, return_inverse=True)
+        for user_id, amount in zip(users.tolist(), np.bincount(positions, weights=fines).tolist()):
+            open_fines[user_id] = open_fines.get(user_id, 0.0) + amount
+        report['scanned'] += len(rows)
+        report['updated'] += int(changed.size)
+    report['seconds'] = time.perf_counter() - started
+    return report
+
+
+def print_fine_report(report, top=20):
+    print(f"Checked {report['scanned']} overdue loans and updated {report['updated']} fines in {report['seconds']:.1f}s.")
+    # Only loans still out; the fine on a returned loan was charged at check-in
+    open_fines = sorted(report['open_fines'].items(), key=lambda item: item[1], reverse=True)
+    if open_fines:
+        print(f"Fines on overdue loans still out: ${sum(report['open_fines'].values()):.2f} across {len(open_fines)} members.")
+        print(tabulate(open_fines[:top], headers=["User ID", "Fines On Open Loans"], floatfmt=".2f"))
+
+# Recalculate fines on overdue loans (Admin only)
+def run_fine_accrual():
+    try:
+        print_fine_report(accrue_overdue_fines())
+    except ImportError:
+        print("The fine accrual job needs NumPy. Install it with 'pip install numpy'.")
+    except DB_ERRORS as err:
+        print(f"Error: {err}")
+
+
+# Loan archival: closed loans older than ARCHIVE_AFTER_DAYS move to transactions_archive
+# a batch at a time, copy and delete in the same transaction, so the live table only
+# holds open and recent loans and no loan is ever in both tables or in neither
+@instrumented
+def archive_closed_loans(older_than_days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE, now=None):
+    started = time.perf_counter()
+    cutoff = (now or datetime.now()) - timedelta(days=older_than_days)
+    report = {'archived': 0, 'batches': 0, 'cutoff': cutoff.isoformat(' ', 'seconds'), 'seconds': 0.0}
+    columns = "transaction_id, user_id, book_id, copy_id, book_title, checkout_date, due_date, return_date, fine_amount"
+    while True:
+        with storage.transaction(write=True) as cursor:
+            cursor.execute("SELECT transaction_id FROM transactions WHERE return_date < %s ORDER BY return_date LIMIT %s", (cutoff, batch_size))
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                break
+            placeholders = ", ".join(['%s'] * len(ids))
+            cursor.execute(f"INSERT INTO transactions_archive ({columns}) SELECT {columns} FROM transactions "
+                           f"WHERE transaction_id IN ({placeholders})", ids)
+            cursor.execute(f"DELETE FROM transactions WHERE transaction_id IN ({placeholders})", ids)
+        report['archived'] += len(ids)
+        report['batches'] += 1
+    report['seconds'] = round(time.perf_counter() - started, 2)
+    return report
+
+
+# Circulation and revenue analytics. Summary tables are kept current by the write paths
+# above, in the same transaction as the change they count, so reports read a few small
+# rows instead of scanning the whole history. rebuild_analytics() recomputes them from
+# scratch after bulk loads or if they are ever suspected to have drifted.
+ANALYTICS_TABLES = ['stats_book_loans', 'stats_genre_daily', 'stats_active_loans', 'stats_revenue_daily', 'stats_membership_expiry']
+REPORT_DAYS = 7
+REPORT_TOP_BOOKS = 10
+# Rows each shared counter (active loans, a day's genre loans, a day's revenue) is spread
+# over. Every increment lands on a random shard, so concurrent loans rarely wait on the
+# same row lock; readers add the shards up.
+STATS_SHARDS = 16
+
+
+def day_key(moment):
+    return moment.strftime('%Y-%m-%d')
+
+
+def increment(cursor, table, keys, counters):
+    cursor.execute(storage.backend.increment_query(table, tuple(keys), tuple(counters)),
+                   tuple(keys.values()) + tuple(counters.values()))
+
+
+# Many increments of one table: {key tuple: counter tuple}
+def increment_rows(cursor, table, key_names, counter_names, totals):
+    cursor.executemany(storage.backend.increment_query(table, key_names, counter_names),
+                       [key + counters for key, counters in totals.items()])
+
+
+# loans is a list of (book_id, genre) pairs checked out at the same moment
+def record_checkout_stats(cursor, loans, checkout_date):
+    day = day_key(checkout_date)
+    shard = random.randrange(STATS_SHARDS)
+    per_book, per_genre = {}, {}
+    for book_id, genre in loans:
+        per_book[(book_id,)] = (per_book.get((book_id,), (0,))[0] + 1,)
+        per_genre[(day, genre or '', shard)] = (per_genre.get((day, genre or '', shard), (0,))[0] + 1,)
+    # Sorted, so two batches lock the rows they share in the same order
+    increment_rows(cursor, 'stats_book_loans', ('book_id',), ('loans',), dict(sorted(per_book.items())))
+    increment_rows(cursor, 'stats_genre_daily', ('day', 'genre', 'shard'), ('loans',), dict(sorted(per_genre.items())))
+    increment(cursor, 'stats_active_loans', {'id': shard}, {'loans': len(loans)})
+
+
+def record_checkin_stats(cursor, returned=1):
+    increment(cursor, 'stats_active_loans', {'id': random.randrange(STATS_SHARDS)}, {'loans': -returned})
+
+
+def record_payment_stats(cursor, amount, paid_at, payments=1):
+    increment(cursor, 'stats_revenue_daily', {'day': day_key(paid_at), 'shard': random.randrange(STATS_SHARDS)},
+              {'payments': payments, 'amount': round(amount, 2)})
+
+
+# Memberships are counted under the day they end, so the active count is a sum over future days
+def record_membership_stats(cursor, plan_name, end_date):
+    increment(cursor, 'stats_membership_expiry', {'end_day': day_key(end_date), 'plan_name': plan_name or ''}, {'members': 1})
+
+
+# Recompute every summary table from the base tables in one transaction
+@instrumented
+def rebuild_analytics():
+    started = time.perf_counter()
+    today = day_key(datetime.now())
+    with storage.transaction(write=True) as cursor:
+        for table in ANALYTICS_TABLES:
+            cursor.execute(f"DELETE FROM {table}")
+        loans = ("(SELECT book_id, checkout_date FROM transactions UNION ALL "
+                 "SELECT book_id, checkout_date FROM transactions_archive) t")
+        cursor.execute("INSERT INTO stats_book_loans (book_id, loans) "
+                       f"SELECT book_id, COUNT(*) FROM {loans} WHERE book_id IS NOT NULL GROUP BY book_id")
+        cursor.execute("INSERT INTO stats_genre_daily (day, genre, loans) "
+                       f"SELECT DATE(t.checkout_date), COALESCE(b.genre, ''), COUNT(*) FROM {loans} "
+                       "JOIN books b ON b.book_id = t.book_id GROUP BY DATE(t.checkout_date), COALESCE(b.genre, '')")
+        cursor.execute("INSERT INTO stats_active_loans (id, loans) SELECT 1, COUNT(*) FROM transactions WHERE return_date IS NULL")
+        cursor.execute("INSERT INTO stats_revenue_daily (day, payments, amount) "
+                       "SELECT DATE(date), COUNT(*), SUM(amount) FROM payments WHERE date IS NOT NULL GROUP BY DATE(date)")
+        cursor.execute("INSERT INTO stats_membership_expiry (end_day, plan_name, members) "
+                       "SELECT DATE(end_date), COALESCE(plan_name, ''), COUNT(*) FROM memberships "
+                       "WHERE DATE(end_date) >= %s GROUP BY DATE(end_date), COALESCE(plan_name, '')", (today,))
+        counts = {}
+        for table in ANALYTICS_TABLES:
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            counts[table] = cursor.fetchone()[0]
+    return {'rows': counts, 'seconds': round(time.perf_counter() - started, 2)}
+
+
+# Everything the admin dashboard shows, read from the summary tables only
+@instrumented
+def analytics_report(days=REPORT_DAYS, top=REPORT_TOP_BOOKS):
+    today = datetime.now()
+    since = day_key(today - timedelta(days=days - 1))
+    with storage.transaction() as cursor:
+        cursor.execute("SELECT COALESCE(SUM(loans), 0) FROM stats_active_loans")
+        active_loans = int(cursor.fetchone()[0])
+        cursor.execute("SELECT s.book_id, b.title, s.loans FROM stats_book_loans s "
+                       "LEFT JOIN books b ON b.book_id = s.book_id ORDER BY s.loans DESC, s.book_id DESC LIMIT %s", (top,))
+        top_books = cursor.fetchall()
+        cursor.execute("SELECT genre, SUM(loans) FROM stats_genre_daily WHERE day >= %s GROUP BY genre ORDER BY SUM(loans) DESC", (since,))
+        genre_loans = cursor.fetchall()
+        cursor.execute("SELECT day, SUM(payments), SUM(amount) FROM stats_revenue_daily WHERE day >= %s GROUP BY day ORDER BY day", (since,))
+        revenue = [(day, payments, float(amount)) for day, payments, amount in cursor.fetchall()]
+        cursor.execute("SELECT plan_name, SUM(members) FROM stats_membership_expiry WHERE end_day >= %s GROUP BY plan_name ORDER BY plan_name", (day_key(today),))
+        memberships = cursor.fetchall()
+    return {'days': days, 'active_loans': active_loans, 'top_books': top_books, 'genre_loans': genre_loans,
+            'revenue': revenue, 'active_memberships': memberships}
+
+
+def print_analytics_report(report):
+    print(f"\nActive loans: {report['active_loans']}")
+    print("\nMost borrowed books:")
+    print(tabulate(report['top_books'], headers=["Book ID", "Title", "Loans"]) if report['top_books'] else "No loans recorded.")
+    print(f"\nLoans by genre, last {report['days']} days:")
+    print(tabulate(report['genre_loans'], headers=["Genre", "Loans"]) if report['genre_loans'] else "No loans recorded.")
+    print(f"\nRevenue, last {report['days']} days:")
+    if report['revenue']:
+        print(tabulate(report['revenue'], headers=["Day", "Payments", "Amount"], floatfmt=".2f"))
+        print(f"Total: ${sum(amount for _, _, amount in report['revenue']):.2f}")
+    else:
+        print("No payments recorded.")
+    print("\nActive memberships:")
+    print(tabulate(report['active_memberships'], headers=["Plan", "Members"]) if report['active_memberships'] else "No active memberships.")
+
+# View circulation and revenue reports (Admin only)
+def view_reports():
+    try:
+        print_analytics_report(analytics_report())
+    except DB_ERRORS as err:
+        print(f"Error: {err}")
+
+
+# Data export: stream a table to CSV or JSON Lines, optionally gzip-compressed, a chunk
+# of rows at a time from an unbuffered cursor, so memory use doesn't grow with the table.
+# Tables are exported in primary key order; loans include the archived ones.
+# table -> (sources, exportable columns, date column for --since/--until)
+EXPORT_TABLES = {
+    'transactions': (['transactions', 'transactions_archive'],
+                     ['transaction_id', 'user_id', 'book_id', 'copy_id', 'book_title', 'checkout_date', 'due_date', 'return_date', 'fine_amount'],
+                     'checkout_date'),
+    'payments': (['payments'], ['payment_id', 'user_id', 'amount', 'method', 'date', 'status'], 'date'),
+    'feedback': (['feedback'], ['feedback_id', 'user_id', 'content', 'date_submitted'], 'date_submitted'),
+    'books': (['books'], ['book_id', 'title', 'author_id', 'genre', 'description', 'status', 'available_copies', 'total_copies', 'created_at'], 'created_at'),
+    'users': (['users'], ['user_id', 'username', 'email', 'role', 'created_at'], 'created_at'),  # Never the password
+    'audit_log': (['audit_log'], ['audit_id', 'user_id', 'action', 'details', 'created_at'], 'created_at'),
+}
+EXPORT_FORMATS = ['csv', 'jsonl']
+
+
+def parse_day(text):
+    try:
+        return datetime.strptime(text, '%Y-%m-%d')
+    except ValueError:
+        raise LibraryError(f"'{text}' is not a date in YYYY-MM-DD form.") from None
+
+
+# Rows of every source of the table, one read transaction per source
+def export_rows(table, columns, since=None, until=None):
+    sources, _, date_column = EXPORT_TABLES[table]
+    filters, params = [], []
+    if since:
+        filters.append(f"{date_column} >= %s")
+        params.append(since)
+    if until:
+        filters.append(f"{date_column} < %s")
+        params.append(until + timedelta(days=1))  # The whole last day
+    where = " WHERE " + " AND ".join(filters) if filters else ""
+    for source in sources:
+        with storage.transaction() as cursor:
+            cursor.execute(f"SELECT {', '.join(columns)} FROM {source}{where} ORDER BY {EXPORT_TABLES[table][1][0]}", params)
+            yield from stream_rows(cursor)
+
+
+def export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat(' ')
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    from decimal import Decimal  # Only the MySQL driver hands these back
+    return float(value) if isinstance(value, Decimal) else value
+
+
+@instrumented
+def export_table(table, output, file_format=None, columns=None, since=None, until=None, compress=None):
+    if table not in EXPORT_TABLES:
+        raise LibraryError(f"Unknown table '{table}'. Choose from {', '.join(EXPORT_TABLES)}.")
+    allowed = EXPORT_TABLES[table][1]
+    columns = columns or allowed
+    unknown = [column for column in columns if column not in allowed]
+    if unknown:
+        raise LibraryError(f"Can't export {', '.join(unknown)} from {table}. Columns: {', '.join(allowed)}.")
+    if compress is None:
+        compress = output.endswith('.gz')
+    if file_format is None:
+        file_format = 'jsonl' if output.removesuffix('.gz').endswith(('.jsonl', '.json')) else 'csv'
+    if file_format not in EXPORT_FORMATS:
+        raise LibraryError(f"Unknown format '{file_format}'. Choose from {', '.join(EXPORT_FORMATS)}.")
+
+    started = time.perf_counter()
+    rows = (tuple(map(export_value, row)) for row in export_rows(table, columns, since and parse_day(since), until and parse_day(until)))
+    if compress:
+        import gzip
+        target = gzip.open(output, 'wt', compresslevel=6, encoding='utf-8', newline='')
+    else:
+        target = open(output, 'w', encoding='utf-8', newline='')
+    count = 0
+    with target:
+        if file_format == 'csv':
+            import csv
+            writer = csv.writer(target)
+            writer.writerow(columns)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in rows:
+                target.write(json.dumps(dict(zip(columns, row))) + '\n')
+                count += 1
+    return {'table': table, 'rows': count, 'output': output, 'format': file_format, 'compressed': compress,
+            'seconds': round(time.perf_counter() - started, 2)}
+
+# Export a table to a file (Admin only)
+def export_data():
+    try:
+        table = input(f"Table to export ({', '.join(EXPORT_TABLES)}): ").strip().lower()
+        output = input("Output file (.csv, .jsonl, add .gz to compress): ").strip()
+        if not output:
+            print("An output file is required.")
+            return
+        since = input("From date YYYY-MM-DD (leave blank for the beginning): ").strip() or None
+        until = input("To date YYYY-MM-DD (leave blank for today): ").strip() or None
+        columns = input("Columns, comma separated (leave blank for all): ").strip()
+        report = export_table(table, output, columns=[column.strip() for column in columns.split(',')] if columns else None,
+                              since=since, until=until)
+        print(f"Exported {report['rows']} rows of {table} to {output} in {report['seconds']:.1f}s.")
+    except LibraryError as err:
+        print(err)
+    except OSError as err:
+        print(f"Could not write the file: {err}")
+    except DB_ERRORS as err:
+        print(f"Error: {err}")
+
+
+# Offline catalog snapshot: books, authors and genres in one read-only columnar file for
+# browse-only kiosks. Strings are stored once each in a string table; every column is a
+# fixed-width array, and books and authors are stored in (title, book_id) and
+# (name, author_id) order, so a keyset page is a binary search plus a contiguous read.
+# The file is mapped with mmap, so opening it is instant and only the pages actually
+# browsed are read. Layout: magic, manifest offset and length, 8-byte aligned sections,
+# then a JSON manifest of {section: [offset, size, typecode]}.
+SNAPSHOT_PATH = os.environ.get('LIBRARY_SNAPSHOT', 'catalog.snapshot')
+SNAPSHOT_MAGIC = b'LIBSNAP1'
+SNAPSHOT_NULL_STRING = 0xFFFFFFFF
+SNAPSHOT_NULL_INT = -2 ** 63
+SNAPSHOT_EPOCH = datetime(1970, 1, 1)
+# table -> [(column, kind)]: 'i' integer, 's' string, 't' timestamp
+SNAPSHOT_TABLES = {
+    'books': [('book_id', 'i'), ('title', 's'), ('author_id', 'i'), ('genre', 's'), ('description', 's'),
+              ('status', 's'), ('available_copies', 'i'), ('total_copies', 'i'), ('created_at', 't')],
+    'authors': [('author_id', 'i'), ('name', 's'), ('bio', 's'), ('created_at', 't')],
+}
+SNAPSHOT_TYPECODES = {'i': 'q', 's': 'I', 't': 'q'}
+
+
+@instrumented
+def build_snapshot(path=SNAPSHOT_PATH):
+    started = time.perf_counter()
+    string_ids = {}
+    offsets = array('Q', [0])
+    blob = bytearray()
+
+    def intern(text):
+        if text is None:
+            return SNAPSHOT_NULL_STRING
+        string_id = string_ids.get(text)
+        if string_id is None:
+            string_id = string_ids[text] = len(offsets) - 1
+            blob.extend(str(text).encode('utf-8'))
+            offsets.append(len(blob))
+        return string_id
+
+    def encode(kind, value):
+        if kind == 's':
+            return intern(value)
+        if value is None:
+            return SNAPSHOT_NULL_INT
+        return (value - SNAPSHOT_EPOCH) // timedelta(microseconds=1) if kind == 't' else int(value)
+
+    sections = {}
+    with storage.transaction() as cursor:
+        for table, columns in SNAPSHOT_TABLES.items():
+            cursor.execute(f"SELECT {', '.join(name for name, _ in columns)} FROM {table}")
+            rows = list(stream_rows(cursor))
+            rows.sort(key=lambda row: (row[1], row[0]))  # Python's order, which the reader's binary search uses
+            for position, (name, kind) in enumerate(columns):
+                sections[f"{table}.{name}"] = array(SNAPSHOT_TYPECODES[kind], (encode(kind, row[position]) for row in rows))
+        cursor.execute("SELECT DISTINCT genre FROM books")
+        genres = sorted((row[0] for row in cursor.fetchall()), key=lambda genre: (genre is not None, genre or ''))
+    sections['genres'] = array('I', map(intern, genres))
+    sections['strings.offsets'] = offsets
+    sections['strings.blob'] = array('B', blob)
+
+    # Write beside the old file, then rename over it: readers see the old or the new snapshot, never half of one
+    temporary = path + '.tmp'
+    manifest = {'built_at': datetime.now().isoformat(' ', 'seconds'), 'sections': {},
+                'counts': {table: len(sections[f"{table}.{columns[0][0]}"]) for table, columns in SNAPSHOT_TABLES.items()}}
+    with open(temporary, 'wb') as file:
+        file.write(SNAPSHOT_MAGIC + struct.pack('<QQ', 0, 0))
+        for name, values in sections.items():
+            file.write(b'\0' * (-file.tell() % 8))
+            manifest['sections'][name] = [file.tell(), len(values) * values.itemsize, values.typecode]
+            values.tofile(file)
+        manifest_offset = file.tell()
+        encoded = json.dumps(manifest).encode('utf-8')
+        file.write(encoded)
+        file.seek(len(SNAPSHOT_MAGIC))
+        file.write(struct.pack('<QQ', manifest_offset, len(encoded)))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+    return {'path': path, 'books': manifest['counts']['books'], 'authors': manifest['counts']['authors'], 'genres': len(genres),
+            'bytes': os.path.getsize(path), 'seconds': round(time.perf_counter() - started, 2)}
+
+
+class CatalogSnapshot:
+    def __init__(self, path):
+        import mmap
+        with open(path, 'rb') as file:
+            stat = os.fstat(file.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns)  # Of the file actually mapped
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise StorageError(f"{path} is not a catalog snapshot.")
+        manifest_offset, manifest_length = struct.unpack_from('<QQ', self.map, len(SNAPSHOT_MAGIC))
+        manifest = json.loads(self.map[manifest_offset:manifest_offset + manifest_length])
+        view = memoryview(self.map)
+        self.columns = {name: view[offset:offset + size].cast(typecode) for name, (offset, size, typecode) in manifest['sections'].items()}
+        self.counts = manifest['counts']
+        self.built_at = manifest['built_at']
+        self.offsets = self.columns['strings.offsets']
+        self.blob = self.columns['strings.blob']
+
+    def string(self, string_id):
+        if string_id == SNAPSHOT_NULL_STRING:
+            return None
+        return str(self.blob[self.offsets[string_id]:self.offsets[string_id + 1]], 'utf-8')
+
+    def value(self, table, name, kind, position):
+        raw = self.columns[f"{table}.{name}"][position]
+        if kind == 's':
+            return self.string(raw)
+        if raw == SNAPSHOT_NULL_INT:
+            return None
+        return SNAPSHOT_EPOCH + timedelta(microseconds=raw) if kind == 't' else raw
+
+    def row(self, table, position):
+        return tuple(self.value(table, name, kind, position) for name, kind in SNAPSHOT_TABLES[table])
+
+    # (title, book_id) or (name, author_id) of the row at a position
+    def sort_key(self, table, position):
+        (id_name, _), (text_name, _) = SNAPSHOT_TABLES[table][:2]
+        return self.string(self.columns[f"{table}.{text_name}"][position]), self.columns[f"{table}.{id_name}"][position]
+
+    # First position whose key is greater than (or, unless strict, equal to) the given key
+    def bisect(self, table, key, strict):
+        low, high = 0, self.counts[table]
+        while low < high:
+            middle = (low + high) // 2
+            current = self.sort_key(table, middle)
+            if current < key or (strict and current == key):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    # One keyset page in sort order, like fetch_page(); match(position) filters rows
+    def page(self, table, page_size=PAGE_SIZE, after=None, before=None, match=None):
+        if before is not None:
+            position, step = self.bisect(table, tuple(before), False) - 1, -1
+        else:
+            position, step = (self.bisect(table, tuple(after), True) if after is not None else 0), 1
+        rows = []
+        while 0 <= position < self.counts[table] and len(rows) <= page_size:
+            if match is None or match(position):
+                rows.append(self.row(table, position))
+            position += step
+        return make_page(rows, (1, 0), page_size, after, before)
+
+    def books_page(self, page_size=PAGE_SIZE, after=None, before=None, genre=None, status=None, author_id=None):
+        tests = []
+        if genre:
+            tests.append(lambda position: self.value('books', 'genre', 's', position) == genre)
+        if status:
+            tests.append(lambda position: self.value('books', 'status', 's', position) == status)
+        if author_id:
+            tests.append(lambda position: self.columns['books.author_id'][position] == author_id)
+        match = (lambda position: all(test(position) for test in tests)) if tests else None
+        return self.page('books', page_size, after, before, match)
+
+    def authors_page(self, page_size=PAGE_SIZE, after=None, before=None):
+        return self.page('authors', page_size, after, before)
+
+    def genres(self):
+        return [(self.string(string_id),) for string_id in self.columns['genres']]
+
+
+# Hands out the newest snapshot: a rebuilt file is picked up on the next request, while
+# pages already being read keep using the mapping they started with
+class SnapshotReader:
+    def __init__(self, path):
+        self.path = path
+        self.snapshot = None
+
+    def current(self):
+        stat = os.stat(self.path)
+        if self.snapshot is None or self.snapshot.identity != (stat.st_ino, stat.st_mtime_ns):
+            self.snapshot = CatalogSnapshot(self.path)
+        return self.snapshot
+
+
+# With LIBRARY_STARTUP_TIMING set, report how long the script took to reach its first menu
+def print_startup_time():
+    if os.environ.get('LIBRARY_STARTUP_TIMING'):
+        print(f"Time to first menu: {(time.perf_counter() - STARTED_AT) * 1000:.1f} ms after the script started loading "
+              "(Python's own start-up is not included; time the whole command to see it)")
+
+
+# Browse-only menus served from a snapshot, without a database connection
+def kiosk(path=SNAPSHOT_PATH):
+    reader = SnapshotReader(path)
+    try:
+        reader.current()
+    except (OSError, StorageError) as err:
+        print(f"Can't open the catalog snapshot: {err}")
+        return
+    print_startup_time()
+    while True:
+        print(f"\nLibrary Catalog (read-only, as of {reader.snapshot.built_at})")
+        print("1. View Books")
+        print("2. View Genres")
+        print("3. View Author Information")
+        print("4. Exit")
+
+        choice = input("Enter your choice: ")
+
+        try:
+            if choice == '1':
+                filters = {}
+                if input("Press Enter to list all books or type 'f' to filter them: ").strip().lower() == 'f':
+                    filters['genre'] = input("Genre (leave blank for any): ").strip() or None
+                    filters['status'] = input("Status, e.g. Available (leave blank for any): ").strip() or None
+                    author_id = input("Author ID (leave blank for any): ").strip()
+                    filters['author_id'] = int(author_id) if author_id else None
+                browse_pages(lambda **page: reader.current().books_page(**page),
+                             ["Book ID", "Title", "Author ID", "Genre", "Description", "Status", "Available", "Copies", "Created At"], "No books found.", **filters)
+            elif choice == '2':
+                genres = reader.current().genres()
+                print(tabulate(genres, headers=["Genre"]) if genres else "No genres found.")
+            elif choice == '3':
+                browse_pages(lambda **page: reader.current().authors_page(**page), ["Author ID", "Name", "Bio", "Created At"], "Author not found.")
+            elif choice == '4':
+                break
+            else:
+                print("Invalid choice. Please try again.")
+        except ValueError:
+            print("Please enter a number.")
+        except (OSError, StorageError) as err:
+            print(f"Can't read the catalog snapshot: {err}")
+
+
+# "Members who borrowed this also borrowed": for every book, the books most often borrowed
+# by the same members, ranked by the number of members who borrowed both. The full
+# build multiplies the sparse member x book loan matrix by its transpose with SciPy, a
+# block of books at a time, and keeps the best RECOMMEND_KEEP per book. Each checkout
+# then adds the new co-borrowings to the stored lists. A pair that has dropped off a
+# full list is only counted again by the next build, so run it periodically.
+RECOMMEND_TOP_K = 5  # Shown to members
+RECOMMEND_KEEP = 20  # Stored per book, so pairs just below the top survive incremental updates
+RECOMMEND_HISTORY = 50  # Most recent books of a member paired with each new loan
+RECOMMEND_BLOCK = 2000  # Books per block of the matrix product
+
+
+@instrumented
+def build_recommendations(keep=RECOMMEND_KEEP, block=RECOMMEND_BLOCK):
+    import numpy as np
+    from scipy import sparse
+
+    started = time.perf_counter()
+    user_ids, book_ids = array('q'), array('q')
+    with storage.transaction() as cursor:
+        for table in ('transactions', 'transactions_archive'):
+            cursor.execute(f"SELECT user_id, book_id FROM {table} WHERE user_id IS NOT NULL AND book_id IS NOT NULL")
+            for user_id, book_id in stream_rows(cursor):
+                user_ids.append(user_id)
+                book_ids.append(book_id)
+    users, user_rows = np.unique(np.frombuffer(user_ids, dtype=np.int64), return_inverse=True)
+    books, book_columns = np.unique(np.frombuffer(book_ids, dtype=np.int64), return_inverse=True)
+    loans = sparse.csr_matrix((np.ones(len(user_rows), dtype=np.int32), (user_rows, book_columns)), shape=(len(users), len(books)))
+    loans.data[:] = 1  # A member who borrowed a book twice still counts once
+    by_book = loans.T.tocsr()
+
+    rows = []
+    for start in range(0, len(books), block):
+        counts = (by_book[start:start + block] @ loans).tocsr()
+        for offset in range(counts.shape[0]):
+            begin, end = counts.indptr[offset], counts.indptr[offset + 1]
+            others, scores = counts.indices[begin:end], counts.data[begin:end]
+            mask = others != start + offset  # Not the book itself
+            others, scores = others[mask], scores[mask]
+            if len(scores) > keep:
+                best = np.lexsort((others, -scores))[:keep]  # Ties go to the lower book id, as in update_recommendations()
+                others, scores = others[best], scores[best]
+            book_id = int(books[start + offset])
+            rows.extend((book_id, int(books[other]), int(score)) for other, score in zip(others, scores))
+
+    with storage.transaction(write=True) as cursor:
+        cursor.execute("DELETE FROM book_recommendations")
+        for begin in range(0, len(rows), SEED_BATCH_SIZE):
+            cursor.executemany("INSERT INTO book_recommendations (book_id, similar_book_id, score) VALUES (%s, %s, %s)", rows[begin:begin + SEED_BATCH_SIZE])
+    return {'books': len(books), 'members': len(users), 'pairs': len(rows), 'seconds': round(time.perf_counter() - started, 2)}
+
+
+# Count the co-borrowings of new (user_id, book_id, transaction_id) loans into the stored
+# lists. A pair of books is counted once per member, by the loan that made it a pair: the
+# first loan of whichever book the member borrowed second. The result therefore doesn't
+# depend on how loans are grouped or how late they are applied.
+@instrumented
+def update_recommendations(loans, keep=RECOMMEND_KEEP):
+    try:
+        with storage.transaction(write=True) as cursor:
+            # The members' history from both tables, live first: a loan archived in between
+            # is then seen twice, which changes neither the first nor the last loan
+            borrowed = {}  # (user_id, book_id) -> (first, last) as (checkout_date, transaction_id)
+            for table in ('transactions', 'transactions_archive'):
+                for transaction_id, user_id, book_id, checkout_date in select_in(cursor,
+                        f"SELECT transaction_id, user_id, book_id, checkout_date FROM {table} WHERE user_id IN ({{placeholders}})",
+                        {user_id for user_id, _, _ in loans}):
+                    loan = (checkout_date, transaction_id)
+                    first, last = borrowed.get((user_id, book_id), (loan, loan))
+                    borrowed[(user_id, book_id)] = (min(first, loan), max(last, loan))
+            history = {}
+            for (user_id, book_id), (first, last) in borrowed.items():
+                history.setdefault(user_id, []).append((last, book_id, first))
+            pairs = {}
+            for user_id, book_id, transaction_id in loans:
+                first = borrowed.get((user_id, book_id))
+                if first is None or first[0][1] != transaction_id:
+                    continue  # Borrowed before; the member already counts for this book
+                earlier = sorted((last, other) for last, other, other_first in history.get(user_id, []) if other_first < first[0])
+                for _, other in earlier[-RECOMMEND_HISTORY:]:
+                    pairs[(book_id, other)] = pairs.get((book_id, other), 0) + 1
+                    pairs[(other, book_id)] = pairs.get((other, book_id), 0) + 1
+            if not pairs:
+                return
+
+            stored = {}
+            for book_id, other, score in select_in(cursor, "SELECT book_id, similar_book_id, score FROM book_recommendations WHERE book_id IN ({placeholders})",
+                                                   {book_id for book_id, _ in pairs}):
+                stored.setdefault(book_id, {})[other] = score
+            for (book_id, other), added in pairs.items():
+                neighbours = stored.setdefault(book_id, {})
+                neighbours[other] = neighbours.get(other, 0) + added
+            kept, dropped = set(), []
+            for book_id, neighbours in stored.items():
+                ranked = sorted(neighbours, key=lambda other: (-neighbours[other], other))
+                kept.update((book_id, other) for other in ranked[:keep])
+                dropped.extend((book_id, other) for other in ranked[keep:])
+            increment_rows(cursor, 'book_recommendations', ('book_id', 'similar_book_id'), ('score',),
+                           {pair: (added,) for pair, added in pairs.items() if pair in kept})
+            if dropped:
+                cursor.executemany("DELETE FROM book_recommendations WHERE book_id=%s AND similar_book_id=%s", dropped)
+    except DB_ERRORS:
+        pass  # Recommendations are a nicety; the borrow has already committed and the next build catches up
+
+
+# Runs update_recommendations() off the borrow path: loans are queued and a background
+# thread folds whatever has queued up into the stored lists in one transaction. When the
+# queue is full new loans are dropped and counted; the next build picks them up.
+class RecommendationUpdater:
+    def __init__(self, capacity=WRITE_BUFFER_CAPACITY):
+        self.queue = queue.Queue(maxsize=capacity)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.closed = False
+        self.dropped = 0
+
+    def submit(self, loans):
+        if self.closed:
+            update_recommendations(loans)
+            return
+        self.start()
+        try:
+            self.queue.put_nowait(list(loans))
+        except queue.Full:
+            with self.lock:
+                self.dropped += len(loans)
+
+    def start(self):
+        if self.thread is not None:
+            return
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='recommendations', daemon=True)
+                self.thread.start()
+                atexit.register(self.close)
+
+    def run(self):
+        while True:
+            items = [self.queue.get()]
+            while True:
+                try:
+                    items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            loans = [loan for item in items if isinstance(item, list) for loan in item]
+            if loans:
+                try:
+                    update_recommendations(loans)
+                except Exception:
+                    pass  # Keep the thread alive; the next build catches up
+            for item in items:
+                if isinstance(item, WriteAck):
+                    item.finish()  # flush() marker
+            if None in items:
+                return
+
+    # Wait until everything submitted so far is applied
+    def flush(self):
+        if self.thread is None or self.closed:
+            return
+        marker = WriteAck()
+        self.queue.put(marker)
+        marker.result()
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            thread = self.thread
+        if thread is not None:
+            self.queue.put(None)
+            thread.join()
+        leftovers = []
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, list):
+                leftovers.extend(item)
+        if leftovers:
+            update_recommendations(leftovers)
+
+    def stats(self):
+        with self.lock:
+            return {'pending': self.queue.qsize(), 'dropped': self.dropped}
+
+
+recommendation_updater = RecommendationUpdater()
+
+
+# The books most often borrowed together with this one: (book_id, title, status, score)
+@instrumented
+def recommend_books(book_id, limit=RECOMMEND_TOP_K):
+    try:
+        with storage.transaction() as cursor:
+            cursor.execute("SELECT r.similar_book_id, b.title, b.status, r.score FROM book_recommendations r "
+                           "JOIN books b ON b.book_id = r.similar_book_id WHERE r.book_id=%s "
+                           "ORDER BY r.score DESC, r.similar_book_id LIMIT %s", (book_id, limit))
+            return cursor.fetchall()
+    except DB_ERRORS:
+        return []
+
+
+def print_recommendation_report(report):
+    print(f"Found {report['pairs']} co-borrowed pairs for {report['books']} books from {report['members']} members in {report['seconds']:.1f}s.")
+
+# Rebuild the recommendations from the full loan history (Admin only)
+def run_recommendation_build():
+    try:
+        print_recommendation_report(build_recommendations())
+    except ImportError:
+        print("Building recommendations needs NumPy and SciPy. Install them with 'pip install numpy scipy'.")
+    except DB_ERRORS as err:
+        print(f"Error: {err}")
+
+
+# Library service: the operations above as JSON over HTTP, so one process can serve
+# many kiosk and web clients. Every request is "POST /<operation>" with a JSON object
+# body. Database work runs on a thread pool no larger than the connection pool.
+SERVICE_HOST = os.environ.get('LIBRARY_SERVICE_HOST', '127.0.0.1')
+SERVICE_PORT = int(os.environ.get('LIBRARY_SERVICE_PORT', '8080'))
+SERVICE_MAX_BODY = 64 * 1024
+SERVICE_MAX_PAGE_SIZE = 100
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+BOOK_FIELDS = ['book_id', 'title', 'author_id', 'genre', 'description', 'status', 'available_copies', 'total_copies', 'created_at']
+
+
+# The caller's session; circulation desk routes act for any member, so only admins may use them
+def admin_session(token):
+    session = session_store.get(token)
+    if session.role != 'admin':
+        raise LibraryError("Only admins can use the circulation desk.")
+    return session
+
+# Field checks: a value of the wrong type is the client's mistake and gets a 400, not a
+# database error or a crash deep inside an operation
+def text_value(name, value, optional=False):
+    if value is None and optional:
+        return None
+    if not isinstance(value, str):
+        raise LibraryError(f"{name} must be a string.")
+    return value
+
+def whole_number(name, value, minimum=None):
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise LibraryError(f"{name} must be a whole number.")
+    if minimum is not None and value < minimum:
+        raise LibraryError(f"{name} must be at least {minimum}.")
+    return value
+
+# A books page cursor as handed out in 'next'/'prev': [title, book_id]
+def page_cursor(name, value):
+    if not value:
+        return None
+    if (not isinstance(value, list) or len(value) != 2 or not isinstance(value[0], str)
+            or not isinstance(value[1], int) or isinstance(value[1], bool)):
+        raise LibraryError(f"{name} must be the [title, book_id] pair from a previous page.")
+    return tuple(value)
+
+@instrumented
+def service_register(params):
+    return {'role': register_user(text_value('username', params['username']), text_value('password', params['password']),
+                                  text_value('email', params['email']), allow_admin=False)}
+
+@instrumented
+def service_login(params):
+    session = session_store.open(authenticate(text_value('username', params['username']), text_value('password', params['password'])))
+    return {'token': session.token, 'user_id': session.user_id, 'username': session.username, 'email': session.email, 'role': session.role,
+            'membership_end': session.membership_end() if session.role == 'member' else None}
+
+@instrumented
+def service_logout(params):
+    session_store.close_session(params['token'])
+    return {'logged_out': True}
+
+@instrumented
+def service_borrow(params):
+    session = session_store.get(params['token'])
+    book_id, due_date = checkout_book(session.user_id, text_value('title', params['title']), text_value('payment_method', params['payment_method']))
+    return {'book_id': book_id, 'due_date': due_date, 'fee': BORROW_FEE}
+
+@instrumented
+def service_return(params):
+    session = session_store.get(params['token'])
+    book_title, fine_amount = checkin_book(session.user_id, whole_number('book_id', params['book_id']))
+    return {'title': book_title, 'fine_amount': fine_amount}
+
+@instrumented
+def service_borrow_batch(params):
+    admin_session(params['token'])
+    return {'results': checkout_batch(params['items'], text_value('payment_method', params['payment_method']))}
+
+@instrumented
+def service_return_batch(params):
+    admin_session(params['token'])
+    return {'results': checkin_batch(params['items'])}
+
+@instrumented
+def service_recommendations(params):
+    limit = min(whole_number('limit', params.get('limit', RECOMMEND_TOP_K), 1), RECOMMEND_KEEP)
+    return {'books': [dict(zip(['book_id', 'title', 'status', 'score'], row)) for row in recommend_books(whole_number('book_id', params['book_id']), limit)]}
+
+@instrumented
+def service_hold(params):
+    session = session_store.get(params['token'])
+    hold_id, position = place_hold(session.user_id, text_value('title', params['title']))
+    return {'hold_id': hold_id, 'position': position}
+
+@instrumented
+def service_cancel_hold(params):
+    session = session_store.get(params['token'])
+    cancel_hold(session.user_id, whole_number('hold_id', params['hold_id']))
+    return {'cancelled': True}
+
+@instrumented
+def service_holds(params):
+    session = session_store.get(params['token'])
+    return {'holds': [dict(zip(['hold_id', 'title', 'status', 'created_at', 'ready_at'], row)) for row in fetch_holds(session.user_id)]}
+
+@instrumented
+def service_books(params):
+    page_size = min(whole_number('page_size', params.get('page_size', PAGE_SIZE), 1), SERVICE_MAX_PAGE_SIZE)
+    after = page_cursor('after', params.get('after'))
+    before = page_cursor('before', params.get('before'))
+    author_id = whole_number('author_id', params['author_id']) if params.get('author_id') is not None else None
+    page = fetch_books_page(page_size, after, before, text_value('genre', params.get('genre'), optional=True),
+                            text_value('status', params.get('status'), optional=True), author_id)
+    return {'books': [dict(zip(BOOK_FIELDS, row)) for row in page.rows], 'next': page.next_cursor, 'prev': page.prev_cursor}
+
+@instrumented
+def service_search(params):
+    limit = min(whole_number('limit', params.get('limit', 10), 1), SERVICE_MAX_PAGE_SIZE)
+    return {'books': [dict(zip(['book_id', 'title', 'author_id', 'genre', 'status'], row)) for row in search_books(text_value('query', params['query']), limit)]}
+
+@instrumented
+def service_feedback(params):
+    session = session_store.get(params['token'])
+    wait = params.get('wait', True)  # False: answer before the row is committed
+    if not isinstance(wait, bool):
+        raise LibraryError("wait must be true or false.")
+    submit_feedback(session.user_id, text_value('content', params['content']), wait)
+    return {'submitted': True, 'committed': wait}
+
+@instrumented
+def service_membership(params):
+    session = session_store.get(params['token'])
+    plan_name, end_date = subscribe_membership(session.user_id, str(params['plan']))
+    return {'plan_name': plan_name, 'end_date': end_date}
+
+@instrumented
+def service_plans(params):
+    return {'plans': [{'choice': choice, 'plan_name': name, 'price': float(price)} for choice, name, price in reference_cache.get(('plans',), fetch_membership_plans)]}
+
+@instrumented
+def service_genres(params):
+    return {'genres': [row[0] for row in reference_cache.get(('genres',), fetch_genres)]}
+
+
+SERVICE_ROUTES = {
+    'register': service_register,
+    'login': service_login,
+    'logout': service_logout,
+    'borrow': service_borrow,
+    'return': service_return,
+    'borrow_batch': service_borrow_batch,
+    'return_batch': service_return_batch,
+    'hold': service_hold,
+    'cancel_hold': service_cancel_hold,
+    'holds': service_holds,
+    'books': service_books,
+    'search': service_search,
+    'recommendations': service_recommendations,
+    'feedback': service_feedback,
+    'membership': service_membership,
+    'plans': service_plans,
+    'genres': service_genres,
+}
+
+
+class LibraryService:
+    def __init__(self, executor):
+        self.executor = executor
+
+    async def dispatch(self, method, path, body):
+        import asyncio
+        route = SERVICE_ROUTES.get(path.split('?', 1)[0].strip('/'))
+        if route is None:
+            return 404, {'error': "Unknown operation."}
+        if method != 'POST':
+            return 405, {'error': "Use POST with a JSON body."}
+        try:
+            params = json.loads(body) if body else {}
+        except ValueError:
+            return 400, {'error': "The request body is not valid JSON."}
+        if not isinstance(params, dict):
+            return 400, {'error': "The request body must be a JSON object."}
+
+        loop = asyncio.get_running_loop()
+        try:
+            return 200, await loop.run_in_executor(self.executor, route, params)
+        except LibraryError as err:
+            return 400, {'error': str(err)}
+        except KeyError as err:
+            return 400, {'error': f"Missing field {err}."}
+        except (TypeError, ValueError) as err:
+            return 400, {'error': f"Invalid field value: {err}"}
+        except DB_ERRORS as err:
+            return 503, {'error': f"Database error: {err}"}
+        except Exception:
+            import logging
+            logging.getLogger('library.service').exception("Unhandled error in %s", path)
+            return 500, {'error': "Internal server error."}
+
+    # One HTTP/1.1 connection; keep-alive requests are answered in order
+    async def handle_connection(self, reader, writer):
+        import asyncio
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                content_type = 'application/json'
+                if length > SERVICE_MAX_BODY:
+                    status, payload = 413, {'error': "Request body too large."}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                    if method.upper() == 'GET' and path == '/metrics':
+                        status, payload, content_type = 200, query_metrics.to_prometheus(), 'text/plain; version=0.0.4'
+                    else:
+                        status, payload = await self.dispatch(method.upper(), path, body)
+
+                data = payload.encode('utf-8') if isinstance(payload, str) else json.dumps(payload, default=str).encode('utf-8')
+                writer.write(f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+                             f"Content-Type: {content_type}\r\n"
+                             f"Content-Length: {len(data)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass  # Client went away or sent something that isn't HTTP
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        import asyncio
+        server = await asyncio.start_server(self.handle_connection, host, port, backlog=1024)
+        print(f"Library service listening on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+def run_service(host=SERVICE_HOST, port=SERVICE_PORT):
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=storage.pool.size, thread_name_prefix='library-db') as executor:
+        try:
+            asyncio.run(LibraryService(executor).serve(host, port))
+        except KeyboardInterrupt:
+            print("Library service stopped.")
+
+
+# Show database time per operation (Admin only)
+def view_query_metrics():
+    metrics = query_metrics.to_json()
+    rows = [(name, stats['count'], stats['total_ms'], stats['mean_ms'], stats['rows'])
+            for name, stats in sorted(metrics['operations'].items(), key=lambda item: item[1]['total_ms'], reverse=True)]
+    if rows:
+        print(tabulate(rows, headers=["Operation", "Queries", "Total ms", "Mean ms", "Rows"]))
+    else:
+        print("No queries recorded yet.")
+    cache = metrics['cache']
+    print(f"Reference cache: {cache['hits']} hits, {cache['misses']} misses, {cache['evictions']} evictions, {cache['entries']} entries.")
+    buffered = metrics['write_buffer']
+    print(f"Write buffer: {buffered['committed']} rows committed in {buffered['batches']} batches, {buffered['failed']} failed, {buffered['dropped']} dropped, {buffered['pending']} pending.")
+    sessions = metrics['sessions']
+    print(f"Sessions: {sessions['sessions']} open, membership cache {sessions['hits']} hits, {sessions['misses']} misses, {sessions['memberships']} entries.")
+    print(f"Statements slower than {query_metrics.slow_query_ms:.0f} ms are logged to {query_metrics.slow_query_log}.")
+
+
+# Admin panel
+def admin_panel():
+    while True:
+        print("\nAdmin Panel")
+        print("1. Add Author")
+        print("2. View Authors")
+        print("3. Add Book")
+        print("4. List Books")
+        print("5. View Genres")
+        print("6. View Author Information")
+        print("7. View Feedback")  # New option to view feedback
+        print("8. Search Books")
+        print("9. Import Catalog")
+        print("10. Accrue Overdue Fines")
+        print("11. Add Membership Plan")
+        print("12. View Query Metrics")
+        print("13. View Reports")
+        print("14. Add Copies")
+        print("15. Circulation Desk")
+        print("16. Export Data")
+        print("17. Rebuild Recommendations")
+        print("18. Expire Uncollected Holds")
+        print("19. Logout")
+
+        choice = input("Enter your choice: ")
+
+        if choice == '1':
+            add_author()
+        elif choice == '2':
+            view_authors()
+        elif choice == '3':
+            add_book()
+        elif choice == '4':
+            list_books()
+        elif choice == '5':
+            view_genres()
+        elif choice == '6':
+            view_author_info()
+        elif choice == '7':
+            view_feedback()  # Call the view feedback function
+        elif choice == '8':
+            search_catalog()
+        elif choice == '9':
+            import_catalog_file()
+        elif choice == '10':
+            run_fine_accrual()
+        elif choice == '11':
+            add_plan()
+        elif choice == '12':
+            view_query_metrics()
+        elif choice == '13':
+            view_reports()
+        elif choice == '14':
+            add_book_copies()
+        elif choice == '15':
+            circulation_desk()
+        elif choice == '16':
+            export_data()
+        elif choice == '17':
+            run_recommendation_build()
+        elif choice == '18':
+            run_hold_expiry()
+        elif choice == '19':
+            break
+        else:
+            print("Invalid choice. Please try again.")
+
+
+# Member panel
+# Member panel
+def member_panel(session):
+    while True:
+        print("\n--- Member Panel ---")
+        print("1. View Membership Plans")
+        print("2. View Books")
+        print("3. View Genres")
+        print("4. View Author Information")
+        print("5. Borrow Book")
+        print("6. Return Book")
+        print("7. Provide Feedback")  # New option
+        print("8. Search Books")
+        print("9. View Borrowing History")
+        print("10. Place Hold")
+        print("11. My Holds")
+        print("12. Logout")
+
+        choice = input("Choose an option: ")
+
+        if choice == "1":
+            view_membership_plan()
+        elif choice == "2":
+            list_books()
+        elif choice == "3":
+            view_genres()
+        elif choice == "4":
+            view_author_info()
+        elif choice == "5":
+            borrow_book(session)
+        elif choice == "6":
+            return_book(session)
+        elif choice == "7":
+            provide_feedback(session)  # Call the feedback function
+        elif choice == "8":
+            search_catalog()
+        elif choice == "9":
+            view_borrowing_history(session)
+        elif choice == "10":
+            hold_book(session)
+        elif choice == "11":
+            view_holds(session)
+        elif choice == "12":
+            break
+        else:
+            print("Invalid choice, please try again.")
+
+
+# Members choose from the Plans table, which admins add to
+MEMBERSHIP_DAYS = 30
+
+# End date of the user's active membership, or None; sessions cache the answer
+@instrumented
+def active_membership_end(user_id):
+    with storage.transaction() as cursor:
+        cursor.execute("SELECT end_date FROM memberships WHERE user_id=%s AND end_date > %s ORDER BY end_date DESC LIMIT 1", (user_id, datetime.now()))
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+# Start a membership on the plan with this membership_id; returns the plan name and end date
+@instrumented
+def subscribe_membership(user_id, plan_choice):
+    if not str(plan_choice).strip().isdigit():
+        raise LibraryError("Invalid choice.")
+    start_date = datetime.now()
+    end_date = start_date + timedelta(days=MEMBERSHIP_DAYS)
+    with storage.transaction(write=True) as cursor:
+        cursor.execute("SELECT membership_plan, price FROM Plans WHERE membership_id=%s", (int(plan_choice),))
+        plan = cursor.fetchone()
+        if not plan:
+            raise LibraryError("Invalid choice.")
+        plan_name, price = plan[0], float(plan[1])
+        cursor.execute("SELECT 1 FROM memberships WHERE user_id=%s AND end_date > %s", (user_id, start_date))
+        if cursor.fetchone():
+            raise LibraryError("You already have an active membership plan.")
+        insert_query = "INSERT INTO memberships (user_id, plan_name, start_date, end_date, price) VALUES (%s, %s, %s, %s, %s)"
+        cursor.execute(insert_query, (user_id, plan_name, start_date, end_date, price))
+        record_membership_stats(cursor, plan_name, end_date)
+    session_store.store_membership(user_id, end_date, start_date)
+    audit(user_id, 'membership', plan_name)
+    return plan_name, end_date
+
+# Function to add a membership plan
+@instrumented
+def add_membership_plan(session):
+    try:
+        # Check if the user already has an active membership plan
+        if session.membership_end():
+            print("You already have an active membership plan.")
+            return
+
+        print("\nChoose a membership plan:")
+        for choice, plan_name, price in reference_cache.get(('plans',), fetch_membership_plans):
+            print(f"{choice}. {plan_name} - ${float(price):.2f}/month")
+
+        plan_choice = input("Enter your choice: ")
+        plan_name, end_date = subscribe_membership(session.user_id, plan_choice)
+        print(f"{plan_name} added successfully for user ID {session.user_id}!")
+    except LibraryError as err:
+        print(err)
+    except DB_ERRORS as err:
+        print(f"Error: {err}")
+
+def fetch_membership_plans():
+    with storage.transaction() as cursor:
+        cursor.execute('SELECT membership_id, membership_plan, price FROM Plans ORDER BY membership_id')
+        return cursor.fetchall()
+
+@instrumented
+def view_membership_plan():
+    try:
+        query_result = reference_cache.get(('plans',), fetch_membership_plans)
+        print(tabulate(query_result, headers=["membership_id", "membership_plan","price"]))
+    except DB_ERRORS as err:
+        print(f"Error: {err}")
+
+# Add a plan to the list members see (Admin only)
+@instrumented
+def add_plan():
+    try:
+        plan_name = input("Enter plan name: ").strip()
+        price = input("Enter plan price: ").strip()
+        if not plan_name:
+            print("Plan name can't be empty.")
+            return
+        from decimal import Decimal
+        try:
+            price = Decimal(price)
+        except ArithmeticError:
+            price = None
+        if price is None or not price.is_finite() or price <= 0:
+            print("Enter a price greater than zero, e.g. 15.00.")
+            return
+        price = f"{price:.2f}"
+        with storage.transaction() as cursor:
+            cursor.execute("INSERT INTO Plans (membership_plan, price) VALUES (%s, %s)", (plan_name, price))
+        reference_cache.invalidate('plans')
+        print("Plan added successfully!")
+    except DB_ERRORS as err:
+        print(f"Error: {err}")
+# Sessions: a user logs in once and every later operation reuses the session instead of
+# asking for a user ID again. User rows and membership end dates are cached in memory.
+# A cached end date is good until it passes, and for SESSION_CACHE_TTL seconds after:
+# a new membership can't start while one is active, so until then nothing can change it.
+# "No membership" is cached for SESSION_CACHE_TTL seconds, so a plan bought through
+# another process shows up. A background job preloads the memberships that end within
+# the next MEMBERSHIP_REFRESH_WINDOW, so logins around their expiry find them cached.
+SESSION_IDLE_TIMEOUT = float(os.environ.get('LIBRARY_SESSION_IDLE_MINUTES', '30')) * 60
+SESSION_CACHE_TTL = float(os.environ.get('LIBRARY_SESSION_CACHE_TTL', '300'))
+SESSION_CACHE_MAX_ENTRIES = 10000
+MEMBERSHIP_REFRESH_INTERVAL = float(os.environ.get('LIBRARY_MEMBERSHIP_REFRESH_MINUTES', '15')) * 60
+MEMBERSHIP_REFRESH_WINDOW = timedelta(hours=float(os.environ.get('LIBRARY_MEMBERSHIP_REFRESH_HOURS', '24')))
+
+
+class Session:
+    def __init__(self, token, user_id, username, email, role):
+        self.token = token
+        self.user_id = user_id
+        self.username = username
+        self.email = email
+        self.role = role
+        self.last_seen = time.monotonic()
+
+    def membership_end(self):
+        return session_store.membership_end(self.user_id)
+
+
+class SessionStore:
+    def __init__(self, idle_timeout=SESSION_IDLE_TIMEOUT, ttl=SESSION_CACHE_TTL, max_entries=SESSION_CACHE_MAX_ENTRIES,
+                 refresh_interval=MEMBERSHIP_REFRESH_INTERVAL, refresh_window=MEMBERSHIP_REFRESH_WINDOW):
+        self.idle_timeout = idle_timeout
+        self.ttl = timedelta(seconds=ttl)
+        self.max_entries = max_entries
+        self.refresh_interval = refresh_interval
+        self.refresh_window = refresh_window
+        self.sessions = {}  # token -> Session
+        self.users = OrderedDict()  # username -> (good until, user row)
+        self.memberships = OrderedDict()  # user_id -> (good until, end date or None)
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.thread = None
+        self.hits = 0
+        self.misses = 0
+        self.refreshed = 0
+
+    def open(self, user):
+        user_id, username, _, email, role = user
+        import secrets
+        session = Session(secrets.token_urlsafe(24), user_id, username, email, role)
+        with self.lock:
+            self.sessions[session.token] = session
+        self.start()
+        return session
+
+    def get(self, token):
+        now = time.monotonic()
+        with self.lock:
+            session = self.sessions.get(token)
+            if session is None or now - session.last_seen > self.idle_timeout:
+                self.sessions.pop(token, None)
+                raise LibraryError("Your session has expired. Please log in again.")
+            session.last_seen = now
+            return session
+
+    def close_session(self, token):
+        with self.lock:
+            self.sessions.pop(token, None)
+
+    def remember(self, entries, key, value):
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def cached_user(self, username):
+        with self.lock:
+            entry = self.users.get(username)
+            if entry is not None and entry[0] > datetime.now():
+                return entry[1]
+        return None
+
+    def cache_user(self, user):
+        with self.lock:
+            self.remember(self.users, user[1], (datetime.now() + self.ttl, user))
+
+    def membership_end(self, user_id):
+        now = datetime.now()
+        with self.lock:
+            entry = self.memberships.get(user_id)
+            if entry is not None and entry[0] > now:
+                self.memberships.move_to_end(user_id)
+                self.hits += 1
+                end_date = entry[1]
+                return end_date if end_date is not None and end_date > now else None
+            self.misses += 1
+        end_date = active_membership_end(user_id)
+        self.store_membership(user_id, end_date, now)
+        return end_date
+
+    def store_membership(self, user_id, end_date, loaded_at):
+        with self.lock:
+            entry = self.memberships.get(user_id)
+            # Memberships only ever end later, so a slower reader can't overwrite a newer plan
+            if entry is not None and entry[1] is not None and (end_date is None or entry[1] > end_date):
+                end_date = entry[1]
+            good_until = max(end_date, loaded_at) if end_date is not None else loaded_at
+            self.remember(self.memberships, user_id, (good_until + self.ttl, end_date))
+
+    # The scheduled job: cache the memberships about to expire, drop idle sessions and stale entries
+    @instrumented
+    def refresh(self, window=None):
+        now = datetime.now()
+        window = window or self.refresh_window
+        with storage.transaction() as cursor:
+            cursor.execute("SELECT user_id, end_date FROM memberships WHERE end_date > %s AND end_date <= %s ORDER BY end_date",
+                           (now, now + window))
+            expiring = cursor.fetchall()
+        for user_id, end_date in expiring:
+            self.store_membership(user_id, end_date, now)
+        idle_since = time.monotonic() - self.idle_timeout
+        with self.lock:
+            for token in [token for token, session in self.sessions.items() if session.last_seen < idle_since]:
+                del self.sessions[token]
+            for entries in (self.users, self.memberships):
+                for key in [key for key, entry in entries.items() if entry[0] <= now]:
+                    del entries[key]
+            self.refreshed += 1
+        return len(expiring)
+
+    def start(self):
+        if self.thread is not None:
+            return
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='session-refresh', daemon=True)
+                self.thread.start()
+                atexit.register(self.close)
+
+    def run(self):
+        while True:
+            try:
+                self.refresh()
+            except DB_ERRORS:
+                pass  # Lookups fall back to the database; try again next time
+            if self.stopping.wait(self.refresh_interval):
+                return
+
+    def close(self):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def stats(self):
+        with self.lock:
+            return {'sessions': len(self.sessions), 'users': len(self.users), 'memberships': len(self.memberships),
+                    'hits': self.hits, 'misses': self.misses, 'refreshes': self.refreshed}
+
+
+session_store = SessionStore()
+
+
+# Login function
+def login():
+    username = input("Enter username: ")
+    password = input("Enter password: ")
+
+    try:
+        session = session_store.open(authenticate(username, password))
+    except LibraryError as err:
+        print(err)
+        return
+    except DB_ERRORS as err:
+        print(f"Error: {err}")
+        return
+
+    print(f"Welcome {session.username}!")
+    if session.role == 'admin':
+        admin_panel()
+    else:
+        # Check if the user has an active membership plan
+        try:
+            active_plan = session.membership_end()
+        except DB_ERRORS as err:
+            print(f"Error: {err}")
+            session_store.close_session(session.token)
+            return
+
+        if not active_plan:
+            add_membership_plan(session)  # Prompt for membership plan if none exists
+
+        member_panel(session)
+    session_store.close_session(session.token)
+
+
+# Main function
+def main():
+    print_startup_time()
+    while True:
+        print("\nLibrary Management System")
+        print("1. Register")
+        print("2. Login")
+        print("3. Exit")
+
+        choice = input("Enter your choice: ")
+
+        if choice == '1':
+            register()
+        elif choice == '2':
+            login()
+        elif choice == '3':
+            print("Goodbye! Thankyou For Using Library Management System")
+            break
+        else:
+            print("Invalid choice. Please try again.")
+
+# Benchmarks: seed the schema with synthetic data at a chosen scale, then time the core
+# operations from many threads and report latency percentiles and throughput as JSON
+BENCH_PASSWORD = 'Bench123!'
+BENCH_GENRES = ['Fantasy', 'Science Fiction', 'Mystery', 'Romance', 'History', 'Biography', 'Poetry', 'Horror', 'Travel', 'Science']
+BENCH_WORDS = ['silent', 'river', 'empire', 'garden', 'shadow', 'glass', 'winter', 'ocean', 'machine', 'letters',
+               'journey', 'forest', 'clock', 'night', 'crown', 'storm', 'bridge', 'island', 'mirror', 'harvest']
+SEED_BATCH_SIZE = 10000
+BENCH_BATCH_ITEMS = 50  # Items per batch in the batch circulation benchmark
+
+
+def seed_batches(total, make_row):
+    for start in range(0, total, SEED_BATCH_SIZE):
+        yield [make_row(i) for i in range(start, min(start + SEED_BATCH_SIZE, total))]
+
+
+@instrumented
+def seed_database(books=100000, users=10000, transactions=1000000, authors=None, open_loan_ratio=0.02, seed=42):
+    rng = random.Random(seed)
+    authors = authors or max(1, books // 20)
+    now = datetime.now()
+    started = time.perf_counter()
+    with storage.transaction() as cursor:
+        cursor.execute("SELECT COALESCE(MAX(author_id), 0) FROM authors")
+        first_author = cursor.fetchone()[0] + 1
+        cursor.execute("SELECT COALESCE(MAX(book_id), 0) FROM books")
+        first_book = cursor.fetchone()[0] + 1
+        cursor.execute("SELECT COALESCE(MAX(user_id), 0) FROM users")
+        first_user = cursor.fetchone()[0] + 1
+
+    def insert(query, batches):
+        for rows in batches:
+            with storage.transaction(write=True) as cursor:
+                cursor.executemany(query, rows)
+
+    insert("INSERT INTO authors (name, bio) VALUES (%s, %s)",
+           seed_batches(authors, lambda i: (f"Author {first_author + i}", "Synthetic author")))
+    insert("INSERT INTO books (title, author_id, genre, description, status) VALUES (%s, %s, %s, %s, 'Available')",
+           seed_batches(books, lambda i: (" ".join(rng.sample(BENCH_WORDS, 3)).title() + f" {first_book + i}",
+                                          first_author + rng.randrange(authors), rng.choice(BENCH_GENRES),
+                                          " ".join(rng.choices(BENCH_WORDS, k=12)))))
+    insert("INSERT INTO users (username, password, email, role) VALUES (%s, %s, %s, 'member')",
+           seed_batches(users, lambda i: (f"bench{first_user + i}", BENCH_PASSWORD, f"bench{first_user + i}@example.com")))
+    insert("INSERT INTO memberships (user_id, plan_name, start_date, end_date, price) VALUES (%s, 'Basic Plan', %s, %s, 10.00)",
+           seed_batches(users, lambda i: (first_user + i, now - timedelta(days=1), now + timedelta(days=MEMBERSHIP_DAYS - 1))))
+
+    # Closed loans spread over the last two years, plus open loans on distinct books
+    open_loans = min(int(transactions * open_loan_ratio), books)
+    open_books = rng.sample(range(first_book, first_book + books), open_loans)
+
+    def loan(i):
+        user_id = first_user + rng.randrange(users)
+        if i < open_loans:
+            book_id = open_books[i]
+            checkout_date = now - timedelta(days=rng.randrange(30), seconds=rng.randrange(86400))
+            return_date = None
+        else:
+            book_id = first_book + rng.randrange(books)
+            checkout_date = now - timedelta(days=30 + rng.randrange(700), seconds=rng.randrange(86400))
+            return_date = checkout_date + timedelta(days=rng.randrange(1, 20))
+        due_date = checkout_date + timedelta(days=LOAN_DAYS)
+        fine = calculate_fine(due_date, return_date) if return_date else 0.0
+        return (user_id, book_id, f"Seeded book {book_id}", checkout_date, due_date, return_date, fine)
+
+    insert("INSERT INTO transactions (user_id, book_id, book_title, checkout_date, due_date, return_date, fine_amount) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+           seed_batches(transactions, loan))
+    with storage.transaction(write=True) as cursor:
+        cursor.execute("INSERT INTO book_copies (book_id, status) SELECT book_id, 'Available' FROM books WHERE book_id >= %s", (first_book,))
+    insert("UPDATE books SET status='Borrowed', available_copies=0 WHERE book_id=%s", seed_batches(open_loans, lambda i: (open_books[i],)))
+    insert("UPDATE book_copies SET status='Borrowed' WHERE book_id=%s", seed_batches(open_loans, lambda i: (open_books[i],)))
+    with storage.transaction(write=True) as cursor:
+        cursor.execute("UPDATE transactions SET copy_id = (SELECT c.copy_id FROM book_copies c WHERE c.book_id = transactions.book_id) "
+                       "WHERE return_date IS NULL AND book_id >= %s", (first_book,))
+    reference_cache.invalidate('authors', 'genres')
+    rebuild_analytics()
+    return {'authors': authors, 'books': books, 'users': users, 'transactions': transactions,
+            'open_loans': open_loans, 'seconds': round(time.perf_counter() - started, 2)}
+
+
+# Nearest-rank percentile of an already sorted list
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))]
+
+
+# Run operation(rng) `iterations` times on each of `concurrency` threads
+def measure(operation, concurrency, iterations, seed):
+    latencies = []
+    outcomes = {'rejected': 0, 'errors': 0}
+    lock = threading.Lock()
+
+    def worker(worker_number):
+        rng = random.Random(seed * 1000 + worker_number)
+        local = []
+        rejected = failed = 0
+        for _ in range(iterations):
+            started = time.perf_counter()
+            try:
+                operation(rng)
+            except LibraryError:
+                rejected += 1  # e.g. the random title was already on loan
+            except DB_ERRORS:
+                failed += 1
+            local.append((time.perf_counter() - started) * 1000)
+        with lock:
+            latencies.extend(local)
+            outcomes['rejected'] += rejected
+            outcomes['errors'] += failed
+
+    from concurrent.futures import ThreadPoolExecutor
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'operations': len(latencies),
+        'rejected': outcomes['rejected'],
+        'errors': outcomes['errors'],
+        'throughput_per_s': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'mean_ms': round(sum(latencies) / len(latencies), 3) if latencies else None,
+        'p50_ms': round(percentile(latencies, 0.50), 3) if latencies else None,
+        'p95_ms': round(percentile(latencies, 0.95), 3) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99), 3) if latencies else None,
+    }
+
+
+def run_benchmarks(concurrency=8, iterations=200, seed=7):
+    with storage.transaction() as cursor:
+        cursor.execute("SELECT user_id, username FROM users WHERE username LIKE 'bench%' ORDER BY user_id LIMIT 10000")
+        users = cursor.fetchall()
+        cursor.execute("SELECT COALESCE(MIN(book_id), 0), COALESCE(MAX(book_id), 0) FROM books")
+        first_book, last_book = cursor.fetchone()
+        cursor.execute("SELECT COUNT(*) FROM books")
+        book_count = cursor.fetchone()[0]
+        cursor.execute("SELECT COUNT(*) FROM transactions")
+        transaction_count = cursor.fetchone()[0]
+        schema_version = current_schema_version(cursor)
+    if not users or not book_count:
+        raise LibraryError("No benchmark data found. Run the 'seed' command first.")
+
+    def random_title(rng):
+        with storage.transaction() as cursor:
+            cursor.execute("SELECT title FROM books WHERE book_id >= %s ORDER BY book_id LIMIT 1", (rng.randint(first_book, last_book),))
+            row = cursor.fetchone()
+        return row[0] if row else ''
+
+    def list_books_page(rng):
+        fetch_books_page(after=(random_title(rng), 0) if rng.random() < 0.8 else None)
+
+    def borrow_and_return(rng):
+        user_id = rng.choice(users)[0]
+        book_id, _ = checkout_book(user_id, random_title(rng), 'Benchmark')
+        checkin_book(user_id, book_id)
+
+    def borrow_and_return_batch(rng):
+        items = [(rng.choice(users)[0], rng.randint(first_book, last_book)) for _ in range(BENCH_BATCH_ITEMS)]
+        results = checkout_batch(items, 'Benchmark')
+        checkin_batch([(result['user_id'], result['book_id']) for result in results if result['ok']])
+
+    def login(rng):
+        _, username = rng.choice(users)
+        session = session_store.open(authenticate(username, BENCH_PASSWORD))
+        session.membership_end()
+        session_store.close_session(session.token)
+
+    operations = {
+        'list_books': list_books_page,
+        'view_genres': lambda rng: fetch_genres(),
+        'borrow_return': borrow_and_return,
+        f'borrow_return_batch_{BENCH_BATCH_ITEMS}': borrow_and_return_batch,
+        'borrowing_history': lambda rng: fetch_borrowing_history(rng.choice(users)[0]),
+        'login': login,
+    }
+    results = {name: measure(operation, concurrency, iterations, seed) for name, operation in operations.items()}
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'backend': storage.backend.name,
+        'schema_version': schema_version,
+        'pool_size': storage.pool.size,
+        'concurrency': concurrency,
+        'iterations_per_thread': iterations,
+        'dataset': {'books': book_count, 'benchmark_users': len(users), 'transactions': transaction_count},
+        'results': results,
+    }
+
+
+def write_benchmark_report(report, output=None):
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, 'w', encoding='utf-8') as report_file:
+            report_file.write(text + '\n')
+        print(f"Benchmark results written to {output}")
+    else:
+        print(text)
+
+
+# Command line: no arguments starts the menus, subcommands run maintenance jobs
+def build_parser():
+    import argparse
+    parser = argparse.ArgumentParser(description="Library Management System")
+    commands = parser.add_subparsers(dest='command')
+
+    migrate_parser = commands.add_parser('migrate', help="create or upgrade the database schema")
+    migrate_parser.set_defaults(handler=lambda args: print(f"Schema is at version {LATEST_SCHEMA_VERSION} ({migrate_schema()} migrations applied)."))
+
+    import_parser = commands.add_parser('import-catalog', help="bulk load books from a CSV or JSONL file")
+    import_parser.add_argument('path')
+    import_parser.add_argument('--format', choices=['csv', 'jsonl'], dest='file_format')
+    import_parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+    import_parser.set_defaults(handler=lambda args: print_import_report(import_catalog(args.path, args.file_format, args.batch_size)))
+
+    fines_parser = commands.add_parser('accrue-fines', help="recalculate fines on every overdue loan")
+    fines_parser.add_argument('--batch-size', type=int, default=FINE_BATCH_SIZE)
+    fines_parser.set_defaults(handler=lambda args: print_fine_report(accrue_overdue_fines(batch_size=args.batch_size)))
+
+    holds_parser = commands.add_parser('expire-holds', help="release copies set aside for holds that were not collected in time")
+    holds_parser.add_argument('--pickup-days', type=int, default=HOLD_PICKUP_DAYS)
+    holds_parser.set_defaults(handler=lambda args: print(json.dumps(expire_ready_holds(args.pickup_days))))
+
+    archive_parser = commands.add_parser('archive-loans', help="move old closed loans to the archive table")
+    archive_parser.add_argument('--older-than-days', type=int, default=ARCHIVE_AFTER_DAYS)
+    archive_parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE)
+    archive_parser.set_defaults(handler=lambda args: print(json.dumps(archive_closed_loans(args.older_than_days, args.batch_size))))
+
+    export_parser = commands.add_parser('export', help="stream a table to a CSV or JSONL file, gzip-compressed if it ends in .gz")
+    export_parser.add_argument('table', choices=list(EXPORT_TABLES))
+    export_parser.add_argument('output')
+    export_parser.add_argument('--format', choices=EXPORT_FORMATS, dest='file_format')
+    export_parser.add_argument('--columns', help="comma-separated columns to include (default: all)")
+    export_parser.add_argument('--since', help="first day to include, YYYY-MM-DD")
+    export_parser.add_argument('--until', help="last day to include, YYYY-MM-DD")
+    export_parser.add_argument('--gzip', action='store_true', default=None, help="compress even without a .gz suffix")
+    export_parser.set_defaults(handler=lambda args: print(json.dumps(export_table(
+        args.table, args.output, args.file_format, args.columns.split(',') if args.columns else None, args.since, args.until, args.gzip))))
+
+    snapshot_parser = commands.add_parser('build-snapshot', help="write the read-only catalog snapshot used by kiosks")
+    snapshot_parser.add_argument('--output', default=SNAPSHOT_PATH)
+    snapshot_parser.set_defaults(handler=lambda args: print(json.dumps(build_snapshot(args.output))))
+
+    kiosk_parser = commands.add_parser('kiosk', help="browse the catalog from a snapshot, without a database")
+    kiosk_parser.add_argument('--snapshot', default=SNAPSHOT_PATH)
+    kiosk_parser.set_defaults(handler=lambda args: kiosk(args.snapshot))
+
+    recommend_parser = commands.add_parser('build-recommendations', help="recompute co-borrowing recommendations from the loan history")
+    recommend_parser.add_argument('--keep', type=int, default=RECOMMEND_KEEP, help="neighbours stored per book")
+    recommend_parser.set_defaults(handler=lambda args: print_recommendation_report(build_recommendations(args.keep)))
+
+    search_parser = commands.add_parser('rebuild-search-index', help="index the whole catalog again for search")
+    search_parser.set_defaults(handler=lambda args: print(json.dumps(search_index.rebuild())))
+
+    rebuild_parser = commands.add_parser('rebuild-analytics', help="recompute the report summary tables from the full history")
+    rebuild_parser.set_defaults(handler=lambda args: print(json.dumps(rebuild_analytics())))
+
+    report_parser = commands.add_parser('report', help="print the circulation and revenue reports")
+    report_parser.add_argument('--days', type=int, default=REPORT_DAYS)
+    report_parser.set_defaults(handler=lambda args: print_analytics_report(analytics_report(args.days)))
+
+    serve_parser = commands.add_parser('serve', help="run the JSON-over-HTTP service for kiosks and web clients")
+    serve_parser.add_argument('--host', default=SERVICE_HOST)
+    serve_parser.add_argument('--port', type=int, default=SERVICE_PORT)
+    serve_parser.set_defaults(handler=lambda args: run_service(args.host, args.port))
+
+    seed_parser = commands.add_parser('seed', help="fill the database with synthetic benchmark data")
+    seed_parser.add_argument('--books', type=int, default=100000)
+    seed_parser.add_argument('--users', type=int, default=10000)
+    seed_parser.add_argument('--transactions', type=int, default=1000000)
+    seed_parser.add_argument('--authors', type=int)
+    seed_parser.add_argument('--seed', type=int, default=42)
+    seed_parser.set_defaults(handler=lambda args: print(json.dumps(seed_database(args.books, args.users, args.transactions, args.authors, seed=args.seed))))
+
+    bench_parser = commands.add_parser('bench', help="benchmark the core operations and report latency as JSON")
+    bench_parser.add_argument('--concurrency', type=int, default=8)
+    bench_parser.add_argument('--iterations', type=int, default=200, help="operations per thread for each benchmark")
+    bench_parser.add_argument('--seed', type=int, default=7)
+    bench_parser.add_argument('--output', help="write the JSON report to this file instead of stdout")
+    bench_parser.set_defaults(handler=lambda args: write_benchmark_report(run_benchmarks(args.concurrency, args.iterations, args.seed), args.output))
+    return parser
+
+if __name__ == "__main__":
+    args = build_parser().parse_args() if sys.argv[1:] else None  # The plain menus don't need argparse
+    try:
+        if args and args.command:
+            args.handler(args)
+        else:
+            main()
+    except LibraryError as err:
+        raise SystemExit(str(err))
+    finally:
+        session_store.close()
+        recommendation_updater.close()
+        write_buffer.close()
+        storage.close()
+        if os.environ.get('LIBRARY_METRICS_FILE'):
+            with open(os.environ['LIBRARY_METRICS_FILE'], 'w', encoding='utf-8') as metrics_file:
+                json.dump(query_metrics.to_json(), metrics_file, indent=2)
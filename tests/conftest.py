@@ -0,0 +1,88 @@
+import importlib.util
+import os
+import pathlib
+
+import pytest
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture(scope='session')
+def module(tmp_path_factory):
+    base = tmp_path_factory.mktemp('library')
+    os.environ.update({
+        'LIBRARY_DB_BACKEND': 'sqlite',
+        'LIBRARY_DB_PATH': str(base / 'unused.db'),
+        'LIBRARY_SEARCH_INDEX': str(base / 'catalog_search.index'),
+        'LIBRARY_SNAPSHOT': str(base / 'catalog.snapshot'),
+        'LIBRARY_SLOW_QUERY_LOG': str(base / 'slow_queries.log'),
+    })
+    spec = importlib.util.spec_from_file_location('library_management_system', ROOT / 'library management system.py')
+    library = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(library)
+    return library
+
+
+# The module with a fresh SQLite database and fresh process-wide singletons
+@pytest.fixture
+def lms(module, tmp_path):
+    module.SQLITE_PATH = str(tmp_path / 'library.db')
+    module.storage = module.create_storage('sqlite')
+    module.storage.setup = module.migrate_schema
+    module.reference_cache = module.ReferenceCache()
+    module.write_buffer = module.WriteBuffer()
+    module.session_store = module.SessionStore()
+    module.recommendation_updater = module.RecommendationUpdater()
+    module.search_index = module.SearchIndex(str(tmp_path / 'catalog_search.index'))
+    yield module
+    module.session_store.close()
+    module.recommendation_updater.close()
+    module.write_buffer.close()
+    module.storage.close()
+
+
+@pytest.fixture
+def add_member(lms):
+    def add(username, role='member'):
+        if role == 'admin':
+            username = 'admin' + username
+        lms.register_user(username, 'Secret123!', f'{username}@example.com')
+        with lms.storage.transaction() as cursor:
+            cursor.execute("SELECT user_id FROM users WHERE username=%s", (username,))
+            return cursor.fetchone()[0]
+    return add
+
+
+@pytest.fixture
+def add_book(lms):
+    def add(title, copies=1, genre=None, author=None, description=None):
+        with lms.storage.transaction(write=True) as cursor:
+            author_id = None
+            if author:
+                cursor.execute("INSERT INTO authors (name) VALUES (%s)", (author,))
+                author_id = cursor.lastrowid
+            cursor.execute("INSERT INTO books (title, author_id, genre, description, status, total_copies, available_copies) "
+                           "VALUES (%s, %s, %s, %s, 'Available', %s, %s)", (title, author_id, genre, description, copies, copies))
+            book_id = cursor.lastrowid
+            lms.create_copies(cursor, [(book_id, copies)])
+        return book_id
+    return add
+
+
+def query(lms, sql, params=()):
+    with lms.storage.transaction() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+# Answer the menus' input() prompts in order
+@pytest.fixture
+def typed(monkeypatch):
+    def answer(*lines):
+        replies = iter(lines)
+        monkeypatch.setattr('builtins.input', lambda prompt='': next(replies))
+    return answer
+
+
+def available(lms, book_id):
+    return query(lms, "SELECT available_copies, status FROM books WHERE book_id=%s", (book_id,))[0]
@@ -0,0 +1,30 @@
+def test_summary_counters_match_a_rebuild(lms, add_member, add_book):
+    members = [add_member(f'reader{number}') for number in range(3)]
+    books = [add_book(f"Book {number}", copies=2, genre=('Fantasy', 'Poetry')[number % 2]) for number in range(4)]
+    for member in members:
+        lms.checkout_batch([(member, book_id) for book_id in books[:3]], "Card")
+    lms.checkin_batch([(members[0], books[0]), (members[1], books[1])])
+    lms.subscribe_membership(members[2], '2')
+
+    incremental = lms.analytics_report()
+    lms.rebuild_analytics()
+    assert lms.analytics_report() == incremental
+    assert incremental['active_loans'] == 4  # Two copies each, the third member is refused, two returned
+
+
+def test_report_counts_loans_revenue_and_memberships(lms, add_member, add_book):
+    first, second = add_member('first'), add_member('second')
+    dune = add_book("Dune", copies=2, genre='Science Fiction')
+    add_book("Emma", genre='Romance')
+    lms.checkout_book(first, "Dune", "Card")
+    lms.checkout_book(second, "Dune", "Card")
+    lms.checkout_book(first, "Emma", "Card")
+    lms.checkin_book(second, dune)
+    lms.subscribe_membership(second, '1')
+
+    report = lms.analytics_report()
+    assert report['active_loans'] == 2
+    assert report['top_books'][0] == (dune, "Dune", 2)
+    assert dict(report['genre_loans']) == {'Science Fiction': 2, 'Romance': 1}
+    assert [(payments, amount) for _, payments, amount in report['revenue']] == [(3, 3 * lms.BORROW_FEE)]  # Borrow fees; memberships aren't payments
+    assert report['active_memberships'] == [('Basic Plan', 1)]
\ No newline at end of file
@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+
+from conftest import query
+
+
+def test_archived_loans_stay_in_the_borrowing_history(lms, add_member, add_book):
+    member = add_member('reader')
+    books = [add_book(f"Book {number}") for number in range(3)]
+    for number, book_id in enumerate(books):
+        lms.checkout_book(member, f"Book {number}", "Card")
+    lms.checkin_book(member, books[0])
+    lms.checkin_book(member, books[1])
+
+    report = lms.archive_closed_loans(older_than_days=0, now=datetime.now() + timedelta(days=1))
+    assert report['archived'] == 2
+    assert query(lms, "SELECT COUNT(*) FROM transactions") == [(1,)]
+    history = lms.fetch_borrowing_history(member, page_size=2)
+    rest = lms.fetch_borrowing_history(member, page_size=2, after=history.next_cursor)
+    assert sorted(row[1] for row in history.rows + rest.rows) == sorted(books)
+
+
+def test_archival_moves_only_old_closed_loans_in_batches(lms, add_member, add_book):
+    member = add_member('reader')
+    books = [add_book(f"Book {number}") for number in range(5)]
+    for number in range(5):
+        lms.checkout_book(member, f"Book {number}", "Card")
+    for book_id in books[:4]:
+        lms.checkin_book(member, book_id)
+    with lms.storage.transaction() as cursor:
+        cursor.execute("UPDATE transactions SET return_date=%s WHERE book_id=%s", (datetime.now() - timedelta(days=400), books[0]))
+        cursor.execute("UPDATE transactions SET return_date=%s WHERE book_id IN (%s, %s)", (datetime.now() - timedelta(days=380), books[1], books[2]))
+
+    report = lms.archive_closed_loans(older_than_days=365, batch_size=2)
+    assert (report['archived'], report['batches']) == (3, 2)
+    assert query(lms, "SELECT book_id FROM transactions ORDER BY book_id") == [(books[3],), (books[4],)]
+    assert query(lms, "SELECT COUNT(*) FROM transactions_archive") == [(3,)]
+    assert lms.archive_closed_loans(older_than_days=365)['archived'] == 0
+
+    first = lms.fetch_borrowing_history(member, page_size=3)
+    second = lms.fetch_borrowing_history(member, page_size=3, after=first.next_cursor)
+    assert sorted(row[1] for row in first.rows + second.rows) == sorted(books)
+    assert second.next_cursor is None
+    assert lms.fetch_borrowing_history(member, page_size=3, before=second.prev_cursor).rows == first.rows
\ No newline at end of file
@@ -0,0 +1,17 @@
+from conftest import available
+
+
+def test_batch_checkout_and_checkin_report_each_item(lms, add_member, add_book):
+    first, second = add_member('first'), add_member('second')
+    dune, emma = add_book("Dune", copies=1), add_book("Emma", copies=2)
+    results = lms.checkout_batch([(first, dune), (second, dune), (second, emma), (999, emma), (first, 999)], "Card")
+    assert [(result['ok'], result.get('error')) for result in results] == [
+        (True, None), (False, "Sorry, this book is currently unavailable."), (True, None),
+        (False, "User not found."), (False, "Book not found.")]
+    assert available(lms, dune) == (0, 'Borrowed')
+    assert available(lms, emma) == (1, 'Available')
+
+    returned = lms.checkin_batch([(first, dune), (second, emma), (second, dune)])
+    assert [result['ok'] for result in returned] == [True, True, False]
+    assert available(lms, dune) == (1, 'Available')
+    assert available(lms, emma) == (2, 'Available')
@@ -0,0 +1,22 @@
+import json
+
+from conftest import query
+
+
+def test_seed_and_bench_smoke(lms, tmp_path):
+    report = lms.seed_database(books=40, users=12, transactions=300, seed=1)
+    assert query(lms, "SELECT COUNT(*) FROM books") == [(40,)]
+    assert query(lms, "SELECT COUNT(*) FROM users WHERE username LIKE 'bench%'") == [(12,)]
+    assert query(lms, "SELECT COUNT(*) FROM transactions") == [(300,)]
+    # Counters agree with the copy rows and the open loans
+    assert query(lms, "SELECT COUNT(*) FROM books b WHERE available_copies != "
+                      "(SELECT COUNT(*) FROM book_copies c WHERE c.book_id = b.book_id AND c.status = 'Available')") == [(0,)]
+    assert report['transactions'] == 300
+
+    output = tmp_path / 'bench.json'
+    lms.write_benchmark_report(lms.run_benchmarks(concurrency=2, iterations=3, seed=1), str(output))
+    results = json.loads(output.read_text())
+    assert results['backend'] == 'sqlite'
+    assert results['dataset']['books'] == 40
+    assert set(results['results']) >= {'list_books', 'borrow_return', 'login', 'borrowing_history'}
+    assert all(result['operations'] == 6 and result['errors'] == 0 for result in results['results'].values())
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import available, query
+
+
+def test_checkout_takes_a_copy_and_charges_the_fee(lms, add_member, add_book):
+    member = add_member('reader')
+    book_id = add_book("Dune", copies=2)
+    borrowed_id, due_date = lms.checkout_book(member, "Dune", "Card")
+    assert borrowed_id == book_id
+    assert due_date.date() == (datetime.now() + timedelta(days=lms.LOAN_DAYS)).date()
+    assert available(lms, book_id) == (1, 'Available')
+    assert query(lms, "SELECT user_id, amount FROM payments") == [(member, lms.BORROW_FEE)]
+
+
+def test_last_copy_marks_the_book_borrowed_and_then_it_is_unavailable(lms, add_member, add_book):
+    first, second = add_member('first'), add_member('second')
+    book_id = add_book("Dune")
+    lms.checkout_book(first, "Dune", "Card")
+    assert available(lms, book_id) == (0, 'Borrowed')
+    with pytest.raises(lms.LibraryError, match="unavailable"):
+        lms.checkout_book(second, "Dune", "Card")
+    with pytest.raises(lms.LibraryError, match="not found"):
+        lms.checkout_book(second, "No Such Book", "Card")
+
+
+def test_checkin_returns_the_copy_and_charges_late_fines(lms, add_member, add_book):
+    member = add_member('reader')
+    book_id = add_book("Dune")
+    lms.checkout_book(member, "Dune", "Card")
+    with lms.storage.transaction() as cursor:
+        cursor.execute("UPDATE transactions SET due_date=%s", (datetime.now() - timedelta(days=3, hours=1),))
+    title, fine = lms.checkin_book(member, book_id)
+    assert (title, fine) == ("Dune", 3 * lms.FINE_PER_DAY)
+    assert available(lms, book_id) == (1, 'Available')
+    with pytest.raises(lms.LibraryError):
+        lms.checkin_book(member, book_id)
+
+
+def test_return_menu_survives_a_non_numeric_book_id(lms, add_member, typed, capsys):
+    member = add_member('reader')
+    session = lms.session_store.open(lms.authenticate('reader', 'Secret123!'))
+    typed('abc')
+    lms.return_book(session)
+    assert "Please enter a number." in capsys.readouterr().out
+    assert session.user_id == member
\ No newline at end of file
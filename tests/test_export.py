@@ -0,0 +1,54 @@
+import csv
+import gzip
+import json
+
+import pytest
+
+
+def test_csv_export_writes_a_header_and_the_chosen_columns(lms, add_book, tmp_path):
+    dune, emma = add_book("Dune", genre='Science Fiction'), add_book("Emma", copies=2)
+    output = str(tmp_path / 'books.csv')
+    report = lms.export_table('books', output, columns=['book_id', 'title', 'genre'])
+    assert (report['rows'], report['format'], report['compressed']) == (2, 'csv', False)
+    with open(output, newline='', encoding='utf-8') as exported:
+        assert list(csv.reader(exported)) == [['book_id', 'title', 'genre'], [str(dune), "Dune", 'Science Fiction'], [str(emma), "Emma", '']]
+
+
+def test_gzip_is_chosen_by_suffix_or_asked_for(lms, add_member, tmp_path):
+    add_member('reader')
+    by_suffix = str(tmp_path / 'users.jsonl.gz')
+    report = lms.export_table('users', by_suffix)
+    assert (report['format'], report['compressed']) == ('jsonl', True)
+    with gzip.open(by_suffix, 'rt', encoding='utf-8') as exported:
+        user = json.loads(exported.readline())
+    assert user['username'] == 'reader' and 'password' not in user
+
+    asked_for = str(tmp_path / 'users.export')
+    assert lms.export_table('users', asked_for, compress=True)['format'] == 'csv'
+    with gzip.open(asked_for, 'rt', encoding='utf-8', newline='') as exported:
+        assert next(csv.reader(exported)) == lms.EXPORT_TABLES['users'][1]
+
+
+def test_date_filters_include_the_whole_last_day(lms, add_book, tmp_path):
+    for title, created_at in [("Dune", '2024-01-31 23:59:00'), ("Emma", '2024-02-01 00:00:00'), ("Kindred", '2024-02-29 18:30:00'),
+                              ("Beloved", '2024-03-01 00:00:00')]:
+        book_id = add_book(title)
+        with lms.storage.transaction(write=True) as cursor:
+            cursor.execute("UPDATE books SET created_at=%s WHERE book_id=%s", (created_at, book_id))
+    output = str(tmp_path / 'books.jsonl')
+    assert lms.export_table('books', output, columns=['title'], since='2024-02-01', until='2024-02-29')['rows'] == 2
+    with open(output, encoding='utf-8') as exported:
+        assert [json.loads(line) for line in exported] == [{'title': "Emma"}, {'title': "Kindred"}]
+
+
+def test_bad_requests_are_refused_before_writing(lms, tmp_path):
+    output = tmp_path / 'out.csv'
+    with pytest.raises(lms.LibraryError, match="Unknown table"):
+        lms.export_table('passwords', str(output))
+    with pytest.raises(lms.LibraryError, match="Can't export password"):
+        lms.export_table('users', str(output), columns=['username', 'password'])
+    with pytest.raises(lms.LibraryError, match="Unknown format"):
+        lms.export_table('users', str(output), file_format='xml')
+    with pytest.raises(lms.LibraryError, match="not a date"):
+        lms.export_table('users', str(output), since='01/02/2024')
+    assert not output.exists()
@@ -0,0 +1,28 @@
+from datetime import datetime, timedelta
+
+from conftest import query
+
+
+def test_overdue_fines_accrue_on_open_loans(lms, add_member, add_book):
+    member = add_member('reader')
+    add_book("Dune")
+    lms.checkout_book(member, "Dune", "Card")
+    report = lms.accrue_overdue_fines(now=datetime.now() + timedelta(days=lms.LOAN_DAYS + 2, hours=1))
+    assert report['updated'] == 1
+    assert query(lms, "SELECT fine_amount FROM transactions") == [(2 * lms.FINE_PER_DAY,)]
+
+
+def test_fine_job_runs_on_a_single_connection_in_several_batches(lms, add_member, add_book):
+    members = [add_member(f'reader{number}') for number in range(3)]
+    for number in range(5):
+        add_book(f"Book {number}")
+    for number in range(5):
+        lms.checkout_book(members[number % 3], f"Book {number}", "Card")
+    lms.storage.close()
+    lms.storage = lms.create_storage('sqlite', pool_size=1)
+    lms.storage.setup = lms.migrate_schema
+    report = lms.accrue_overdue_fines(now=datetime.now() + timedelta(days=lms.LOAN_DAYS + 3, hours=1), batch_size=2)
+    assert (report['scanned'], report['updated']) == (5, 5)
+    assert report['open_fines'] == {members[0]: 6 * lms.FINE_PER_DAY, members[1]: 6 * lms.FINE_PER_DAY, members[2]: 3 * lms.FINE_PER_DAY}
+    again = lms.accrue_overdue_fines(now=datetime.now() + timedelta(days=lms.LOAN_DAYS + 3, hours=1), batch_size=2)
+    assert (again['scanned'], again['updated']) == (5, 0)
\ No newline at end of file
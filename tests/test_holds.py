@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import available, query
+
+
+def test_member_cannot_borrow_a_second_copy_of_the_same_book(lms, add_member, add_book):
+    member = add_member('reader')
+    book_id = add_book("Dune", copies=3)
+    lms.checkout_book(member, "Dune", "Card")
+    with pytest.raises(lms.LibraryError, match="already have this book"):
+        lms.checkout_book(member, "Dune", "Card")
+    assert available(lms, book_id) == (2, 'Available')
+    results = lms.checkout_batch([(member, book_id)], "Card")
+    assert results[0]['error'] == "You already have this book borrowed."
+
+
+def test_returned_copy_goes_to_the_first_hold(lms, add_member, add_book):
+    borrower, holder, other = add_member('borrower'), add_member('holder'), add_member('other')
+    book_id = add_book("Dune")
+    lms.checkout_book(borrower, "Dune", "Card")
+    hold_id, position = lms.place_hold(holder, "Dune")
+    assert position == 1
+    assert lms.place_hold(other, "Dune")[1] == 2
+    with pytest.raises(lms.LibraryError, match="already have a hold"):
+        lms.place_hold(holder, "Dune")
+
+    lms.checkin_book(borrower, book_id)
+    assert available(lms, book_id) == (0, 'Borrowed')  # Set aside, not back on the shelf
+    assert [row[2] for row in lms.fetch_holds(holder)] == ['Ready']
+    with pytest.raises(lms.LibraryError, match="unavailable"):
+        lms.checkout_book(borrower, "Dune", "Card")
+    assert lms.checkout_book(holder, "Dune", "Card")[0] == book_id
+    assert lms.fetch_holds(holder) == []
+
+
+def test_cancelling_a_ready_hold_passes_the_copy_on(lms, add_member, add_book):
+    borrower, first, second = add_member('borrower'), add_member('first'), add_member('second')
+    book_id = add_book("Dune")
+    lms.checkout_book(borrower, "Dune", "Card")
+    first_hold, _ = lms.place_hold(first, "Dune")
+    lms.place_hold(second, "Dune")
+    lms.checkin_book(borrower, book_id)
+    lms.cancel_hold(first, first_hold)
+    assert [row[2] for row in lms.fetch_holds(second)] == ['Ready']
+    with pytest.raises(lms.LibraryError):
+        lms.cancel_hold(first, first_hold)
+
+
+def test_hold_is_refused_while_a_copy_is_on_the_shelf(lms, add_member, add_book):
+    member = add_member('reader')
+    add_book("Dune")
+    with pytest.raises(lms.LibraryError, match="available now"):
+        lms.place_hold(member, "Dune")
+
+
+def test_copy_returned_on_another_record_goes_to_the_title_queue(lms, add_member, add_book):
+    first, second, waiting = add_member('first'), add_member('second'), add_member('waiting')
+    queued_id, other_id = add_book("Dune"), add_book("Dune")
+    lms.checkout_book(first, "Dune", "Card")
+    lms.checkout_book(second, "Dune", "Card")
+    hold_id, _ = lms.place_hold(waiting, "Dune")
+    lms.checkin_book(second, other_id)
+    assert query(lms, "SELECT status FROM holds WHERE hold_id=%s", (hold_id,)) == [('Ready',)]
+    assert available(lms, other_id) == (0, 'Borrowed')
+    assert lms.checkout_book(waiting, "Dune", "Card")[0] == other_id
+    assert available(lms, queued_id) == (0, 'Borrowed')
+    lms.checkin_book(waiting, other_id)
+    assert available(lms, other_id) == (1, 'Available')
+    assert available(lms, queued_id) == (0, 'Borrowed')
+
+
+def test_uncollected_ready_holds_expire(lms, add_member, add_book):
+    reader, slow, next_in_line = add_member('reader'), add_member('slow'), add_member('next')
+    book_id = add_book("Dune")
+    lms.checkout_book(reader, "Dune", "Card")
+    first_hold, _ = lms.place_hold(slow, "Dune")
+    second_hold, _ = lms.place_hold(next_in_line, "Dune")
+    lms.checkin_book(reader, book_id)
+    assert lms.expire_ready_holds() == {'expired': 0, 'passed_on': 0}
+    later = datetime.now() + timedelta(days=lms.HOLD_PICKUP_DAYS, hours=1)
+    assert lms.expire_ready_holds(now=later) == {'expired': 1, 'passed_on': 1}
+    assert query(lms, "SELECT hold_id, status FROM holds ORDER BY hold_id") == [(first_hold, 'Expired'), (second_hold, 'Ready')]
+    assert lms.expire_ready_holds(now=later + timedelta(days=lms.HOLD_PICKUP_DAYS, hours=1)) == {'expired': 1, 'passed_on': 0}
+    assert available(lms, book_id) == (1, 'Available')
+
+
+def test_view_holds_asks_again_for_a_number(lms, add_member, add_book, typed, capsys):
+    reader, waiting = add_member('reader'), add_member('waiting')
+    add_book("Dune")
+    lms.checkout_book(reader, "Dune", "Card")
+    lms.place_hold(waiting, "Dune")
+    typed('abc')
+    lms.view_holds(lms.Session('token', waiting, 'waiting', 'waiting@example.com', 'member'))
+    assert "Please enter a number." in capsys.readouterr().out
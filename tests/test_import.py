@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from conftest import query
+
+
+def test_csv_import_creates_books_authors_and_copies(lms, tmp_path):
+    source = tmp_path / 'catalog.csv'
+    source.write_text("title,author,genre,description,copies\n"
+                      "Dune,Frank Herbert,Science Fiction,Desert planet,3\n"
+                      "Children of Dune,Frank Herbert,Science Fiction,,\n"
+                      ",Nobody,Poetry,,1\n"
+                      "Emma,Jane Austen,Romance,,zero\n", encoding='utf-8')
+    report = lms.import_catalog(str(source), batch_size=2)
+    assert report['imported'] == 2
+    assert report['skipped'] == [4, 5]
+    assert report['authors_created'] == 1
+    assert query(lms, "SELECT title, total_copies, available_copies FROM books ORDER BY title") == [
+        ("Children of Dune", 1, 1), ("Dune", 3, 3)]
+    assert query(lms, "SELECT COUNT(*) FROM book_copies") == [(4,)]
+
+
+def test_jsonl_import_reuses_existing_authors_and_skips_bad_lines(lms, tmp_path):
+    with lms.storage.transaction() as cursor:
+        cursor.execute("INSERT INTO authors (name) VALUES ('Jane Austen')")
+    source = tmp_path / 'catalog.jsonl'
+    source.write_text(json.dumps({'title': 'Emma', 'author': 'Jane Austen'}) + "\n"
+                      "{not json\n"
+                      + json.dumps({'title': 'Persuasion', 'author': 'Jane Austen', 'copies': 2}) + "\n", encoding='utf-8')
+    report = lms.import_catalog(str(source))
+    assert report['imported'] == 2
+    assert report['skipped'] == [2]
+    assert report['authors_created'] == 0
+    assert query(lms, "SELECT COUNT(DISTINCT author_id) FROM books") == [(1,)]
+
+
+def test_authors_differing_only_in_case_each_get_an_id(lms, tmp_path):
+    source = tmp_path / 'catalog.csv'
+    source.write_text("title,author\nFirst,Smith\nSecond,SMITH\n", encoding='utf-8')
+    report = lms.import_catalog(str(source))
+    assert report['authors_created'] == 2
+    assert query(lms, "SELECT COUNT(*) FROM books WHERE author_id IS NULL") == [(0,)]
+    assert query(lms, "SELECT b.title, a.name FROM books b JOIN authors a ON a.author_id = b.author_id ORDER BY b.title") == [
+        ("First", "Smith"), ("Second", "SMITH")]
+
+
+def test_batch_size_must_be_at_least_one(lms, tmp_path, typed, capsys):
+    source = tmp_path / 'catalog.csv'
+    source.write_text("title\nDune\n", encoding='utf-8')
+    with pytest.raises(lms.LibraryError, match="at least 1"):
+        lms.import_catalog(str(source), batch_size=0)
+    typed(str(source), 'abc', '0', '-3', '1')
+    lms.import_catalog_file()
+    assert capsys.readouterr().out.count("Please enter a whole number of at least 1.") == 3
+    assert query(lms, "SELECT title FROM books") == [("Dune",)]
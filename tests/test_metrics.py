@@ -0,0 +1,36 @@
+import json
+
+
+def test_statements_are_charged_to_the_outermost_operation(lms, add_book, tmp_path):
+    lms.query_metrics = lms.QueryMetrics(slow_query_ms=10 ** 9, slow_query_log=str(tmp_path / 'slow.log'))
+    add_book("Dune", genre="Science Fiction")
+    lms.fetch_genres()
+    report = json.loads(json.dumps(lms.query_metrics.to_json(top_statements=lms.MAX_TRACKED_STATEMENTS)))  # Not just the 20 slowest
+    genres = report['operations']['fetch_genres']
+    assert genres['count'] == 1 and genres['rows'] == 1
+    assert genres['buckets_ms']['+Inf'] == 1
+    assert any(statement['sql'].startswith("SELECT DISTINCT genre FROM books") for statement in report['statements'])
+    assert {'cache', 'write_buffer', 'sessions', 'recommendations'} <= set(report)
+    assert not (tmp_path / 'slow.log').exists()
+
+
+def test_prometheus_export_has_cumulative_buckets_per_operation(lms, add_book):
+    lms.query_metrics = lms.QueryMetrics(slow_query_ms=10 ** 9)
+    add_book("Dune")
+    for _ in range(3):
+        lms.fetch_genres()
+    lines = lms.query_metrics.to_prometheus().splitlines()
+    buckets = [int(line.rsplit(' ', 1)[1]) for line in lines if line.startswith('library_query_duration_seconds_bucket{operation="fetch_genres"')]
+    assert len(buckets) == len(lms.QUERY_LATENCY_BUCKETS) + 1
+    assert buckets == sorted(buckets) and buckets[-1] == 3
+    assert 'library_query_duration_seconds_count{operation="fetch_genres"} 3' in lines
+    assert 'library_query_rows_total{operation="fetch_genres"} 3' in lines
+    assert "# TYPE library_cache_hits_total counter" in lines
+
+
+def test_slow_query_log_keeps_the_sql_once_statements_overflow(lms, tmp_path):
+    metrics = lms.QueryMetrics(slow_query_ms=0, slow_query_log=str(tmp_path / 'slow.log'))
+    for number in range(lms.MAX_TRACKED_STATEMENTS + 1):
+        metrics.record(f"SELECT {number}", 0.01, 1)
+    assert metrics.statements['other'][0] == 1
+    assert (tmp_path / 'slow.log').read_text().splitlines()[-1].endswith(f"sql=SELECT {lms.MAX_TRACKED_STATEMENTS}")
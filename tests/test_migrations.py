@@ -0,0 +1,46 @@
+import sqlite3
+
+import pytest
+
+from conftest import query
+
+
+def test_new_database_is_migrated_to_the_latest_version(lms):
+    with lms.storage.transaction() as cursor:
+        assert lms.current_schema_version(cursor) == lms.LATEST_SCHEMA_VERSION
+    assert lms.migrate_schema() == 0
+    assert query(lms, "SELECT COUNT(*) FROM schema_version") == [(lms.LATEST_SCHEMA_VERSION,)]
+
+
+def test_failed_migration_leaves_the_sqlite_schema_untouched(lms, monkeypatch):
+    lms.fetch_genres()  # Migrate to the current version first
+    broken = (lms.LATEST_SCHEMA_VERSION + 1, "Broken", ["CREATE TABLE half_done (a INT)", "SELECT missing FROM nowhere"])
+    monkeypatch.setattr(lms, 'MIGRATIONS', lms.MIGRATIONS + [broken])
+    monkeypatch.setattr(lms, 'LATEST_SCHEMA_VERSION', broken[0])
+    with pytest.raises(sqlite3.Error):
+        lms.migrate_schema()
+    assert not query(lms, "SELECT name FROM sqlite_master WHERE name = 'half_done'")
+    assert query(lms, "SELECT MAX(version) FROM schema_version") == [(broken[0] - 1,)]
+
+
+def test_migration_resumes_after_the_last_completed_statement(lms, monkeypatch):
+    lms.fetch_genres()
+    number = lms.LATEST_SCHEMA_VERSION + 1
+    monkeypatch.setattr(lms.storage.backend, 'transactional_ddl', False)  # Behave like MySQL
+    monkeypatch.setattr(lms, 'LATEST_SCHEMA_VERSION', number)
+    monkeypatch.setattr(lms, 'MIGRATIONS', lms.MIGRATIONS + [(number, "Resumable", [
+        "CREATE TABLE resumable (a INT)", "ALTER TABLE resumable ADD COLUMN b INT", "SELECT missing FROM nowhere"])])
+    with pytest.raises(sqlite3.Error):
+        lms.migrate_schema()
+    assert query(lms, "SELECT version, step FROM schema_migration_steps ORDER BY step") == [(number, 0), (number, 1)]
+
+    lms.MIGRATIONS[-1] = (number, "Resumable", ["CREATE TABLE resumable (a INT)", "ALTER TABLE resumable ADD COLUMN b INT", "SELECT 1"])
+    assert lms.migrate_schema() == 1
+    assert query(lms, "SELECT MAX(version) FROM schema_version") == [(number,)]
+    assert query(lms, "SELECT COUNT(*) FROM schema_migration_steps") == [(0,)]
+
+
+def test_hot_lookups_are_indexed(lms):
+    lms.fetch_genres()
+    indexes = {row[0] for row in query(lms, "SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {'idx_books_title', 'idx_transactions_open', 'idx_users_login'} <= indexes
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+
+def walk(fetch, **filters):
+    pages, after = [], None
+    while True:
+        page = fetch(after=after, **filters)
+        pages.append(page)
+        if page.next_cursor is None:
+            return pages
+        after = page.next_cursor
+
+
+def test_book_pages_walk_forwards_and_back_without_gaps(lms, add_book):
+    titles = [f"Title {i:02d}" for i in range(23)] + ["Title 05"]  # A duplicate title is ordered by book_id
+    for title in titles:
+        add_book(title)
+    pages = walk(lms.fetch_books_page, page_size=5)
+    seen = [(row[1], row[0]) for page in pages for row in page.rows]
+    assert seen == sorted(seen)
+    assert len(seen) == len(titles) == len(set(seen))
+    assert pages[0].prev_cursor is None
+    assert lms.fetch_books_page(page_size=5, before=pages[2].prev_cursor).rows == pages[1].rows
+
+
+def test_book_pages_filter_by_genre_and_author(lms, add_book):
+    add_book("Dune", genre="Science Fiction", author="Frank Herbert")
+    emma = add_book("Emma", genre="Romance", author="Jane Austen")
+    assert [row[1] for row in lms.fetch_books_page(genre="Romance").rows] == ["Emma"]
+    author_id = lms.fetch_books_page(genre="Romance").rows[0][2]
+    assert [row[0] for row in lms.fetch_books_page(author_id=author_id).rows] == [emma]
+
+
+def test_author_pages_are_ordered_by_name(lms):
+    with lms.storage.transaction() as cursor:
+        cursor.executemany("INSERT INTO authors (name) VALUES (%s)", [(f"Author {i:02d}",) for i in range(11)])
+    pages = walk(lms.fetch_authors_page, page_size=4)
+    assert [len(page.rows) for page in pages] == [4, 4, 3]
+    assert [row[1] for page in pages for row in page.rows] == [f"Author {i:02d}" for i in range(11)]
+    assert lms.fetch_authors_page(page_size=4, before=pages[1].prev_cursor).rows == pages[0].rows
+
+
+def test_feedback_pages_are_newest_first(lms, add_member):
+    member = add_member('reader')
+    start = datetime(2024, 1, 1)
+    with lms.storage.transaction() as cursor:
+        cursor.executemany("INSERT INTO feedback (user_id, content, date_submitted) VALUES (%s, %s, %s)",
+                           [(member, f"note {i}", start + timedelta(hours=i // 2)) for i in range(7)])  # Pairs share a timestamp
+    pages = walk(lms.fetch_feedback_page, page_size=3)
+    assert [row[2] for page in pages for row in page.rows] == [f"note {i}" for i in (6, 5, 4, 3, 2, 1, 0)]
+    assert lms.fetch_feedback_page(page_size=3, before=pages[1].prev_cursor).rows == pages[0].rows
+
+
+def test_list_books_asks_again_for_a_bad_author_id(lms, add_book, typed, capsys):
+    add_book("Dune")
+    typed('f', '', '', 'x', '')
+    lms.list_books()
+    output = capsys.readouterr().out
+    assert "Please enter a number." in output
+    assert "Dune" in output
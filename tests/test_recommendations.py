@@ -0,0 +1,22 @@
+from datetime import datetime, timedelta
+
+from conftest import query
+
+
+def test_incremental_recommendations_match_a_full_build(lms, add_member, add_book):
+    members = [add_member(f'reader{number}') for number in range(4)]
+    books = [add_book(f"Book {number}", copies=4) for number in range(5)]
+    for member, borrowed in zip(members, [books[:3], books[1:4], books[::2], books[2:]]):
+        for book_id in borrowed:
+            lms.checkout_book(member, f"Book {books.index(book_id)}", "Card")
+        lms.checkin_batch([(member, book_id) for book_id in borrowed])
+    lms.archive_closed_loans(older_than_days=0, now=datetime.now() + timedelta(days=1))
+    lms.checkout_book(members[0], "Book 4", "Card")  # Pairs with archived loans
+    lms.checkout_book(members[1], "Book 1", "Card")  # Borrowed before: counts nothing new
+    lms.recommendation_updater.flush()
+
+    recommendations = "SELECT book_id, similar_book_id, score FROM book_recommendations ORDER BY book_id, similar_book_id"
+    incremental = query(lms, recommendations)
+    lms.build_recommendations()
+    assert query(lms, recommendations) == incremental
+    assert [row[0] for row in lms.recommend_books(books[2])][:1] == [books[4]]  # Three members, one through an archived loan
@@ -0,0 +1,54 @@
+import time
+
+from conftest import query
+
+
+def test_repeated_reads_are_served_from_the_cache(lms, add_book):
+    add_book("Dune", genre="Science Fiction")
+    assert lms.reference_cache.get(('genres',), lms.fetch_genres) == [("Science Fiction",)]
+    with lms.storage.transaction() as cursor:
+        cursor.execute("UPDATE books SET genre = 'Changed behind the cache'")
+    assert lms.reference_cache.get(('genres',), lms.fetch_genres) == [("Science Fiction",)]
+    assert lms.reference_cache.stats()['hits'] == 1
+
+
+def test_invalidation_drops_only_its_namespace(lms, add_book):
+    add_book("Dune", genre="Science Fiction")
+    lms.reference_cache.get(('genres',), lms.fetch_genres)
+    lms.cached_authors_page()
+    add_book("Emma", genre="Romance")
+    lms.reference_cache.invalidate('genres')
+    assert lms.reference_cache.get(('genres',), lms.fetch_genres) == [("Romance",), ("Science Fiction",)]
+    assert lms.reference_cache.stats()['entries'] == 2  # The author page survived
+
+
+def test_entries_expire_and_the_oldest_is_evicted(lms):
+    cache = lms.ReferenceCache(max_entries=2, ttl=0.05)
+    loads = []
+    for key in ('a', 'b', 'c'):
+        cache.get((key,), lambda key=key: loads.append(key) or key)
+    assert cache.stats()['evictions'] == 1
+    assert cache.get(('b',), lambda: 'reloaded') == 'b'
+    time.sleep(0.1)
+    assert cache.get(('b',), lambda: 'reloaded') == 'reloaded'
+
+
+def test_value_loaded_across_an_invalidation_is_not_stored(lms):
+    cache = lms.ReferenceCache()
+
+    def loader():
+        cache.invalidate('plans')  # A writer commits while the read is in flight
+        return 'stale'
+    assert cache.get(('plans',), loader) == 'stale'
+    assert cache.get(('plans',), lambda: 'fresh') == 'fresh'
+
+
+def test_new_plans_show_up_for_members(lms, typed, add_member):
+    assert [name for _, name, _ in lms.reference_cache.get(('plans',), lms.fetch_membership_plans)] == ['Basic Plan', 'Premium Plan', 'VIP Plan']
+    typed('Student Plan', '4.5')
+    lms.add_plan()
+    plans = lms.reference_cache.get(('plans',), lms.fetch_membership_plans)
+    assert plans[-1][1:] == ('Student Plan', '4.50')
+    member = add_member('reader')
+    assert lms.subscribe_membership(member, str(plans[-1][0]))[0] == 'Student Plan'
+    assert query(lms, "SELECT plan_name, price FROM memberships") == [('Student Plan', 4.5)]
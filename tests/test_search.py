@@ -0,0 +1,101 @@
+import heapq
+import math
+
+
+def titles(lms, query, limit=10):
+    return [row[1] for row in lms.search_books(query, limit)]
+
+
+def test_search_matches_title_author_prefix_and_typo(lms, add_book):
+    add_book("The Silent River", genre="Mystery", author="Ada Lovelace")
+    add_book("Glass Empire", genre="Fantasy", description="A machine built of glass")
+    assert titles(lms, "silent") == ["The Silent River"]
+    assert titles(lms, "lovelace") == ["The Silent River"]
+    assert titles(lms, "emp") == ["Glass Empire"]
+    assert titles(lms, "machnie") == ["Glass Empire"]
+    assert titles(lms, "nothing like it") == []
+
+
+def test_books_matching_only_common_terms_are_still_ranked(lms, add_book):
+    add_book("Zebra River")
+    for number in range(30):
+        add_book(f"River {number}")
+    results = titles(lms, "zebra river", limit=10)
+    assert results[0] == "Zebra River"
+    assert len(results) == 10
+
+
+def test_pruned_ranking_matches_an_exhaustive_bm25(lms, add_book):
+    words = ['silent', 'river', 'empire', 'garden', 'shadow', 'glass', 'winter', 'ocean']
+    for number in range(120):
+        add_book(" ".join(words[(number * step) % len(words)] for step in (1, 3, 5)[:1 + number % 3]) + f" {number}",
+                 genre=words[number % 4])
+    index = lms.search_index
+    index.ensure_loaded()
+
+    def exhaustive(query, limit):
+        count = len(index.doc_lengths)
+        average = index.total_length / count
+        scores = {}
+        for term in set(lms.tokenize(query)):
+            for token, boost in index.expand(term):
+                postings = index.postings[token]
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for book_id, frequency in postings.items():
+                    norm = index.BM25_K1 * (1 - index.BM25_B + index.BM25_B * index.doc_lengths[book_id] / average)
+                    scores[book_id] = scores.get(book_id, 0.0) + boost * idf * frequency * (index.BM25_K1 + 1) / (frequency + norm)
+        return heapq.nlargest(limit, scores.values())
+
+    for query in ["silent river", "glass winter ocean", "garden", "empire shadow silent", "riv"]:
+        assert [round(score, 9) for _, score in index.search(query, 5)] == [round(score, 9) for score in exhaustive(query, 5)]
+
+
+def test_index_is_saved_as_json_and_reloaded(lms, add_book):
+    add_book("Winter Garden", author="Jane Doe")
+    lms.search_index.ensure_loaded()
+    lms.search_index.save()
+    reloaded = lms.SearchIndex(lms.search_index.path)
+    reloaded.load()
+    assert reloaded.postings == lms.search_index.postings
+    assert reloaded.authors == lms.search_index.authors
+    assert reloaded.synced_book_id == lms.search_index.synced_book_id
+
+
+def test_unreadable_index_is_rebuilt(lms, add_book, capsys):
+    add_book("Ocean Clock")
+    with open(lms.search_index.path, 'wb') as index_file:
+        index_file.write(b'\x80\x04not json')
+    assert titles(lms, "ocean") == ["Ocean Clock"]
+    assert "rebuilding it" in capsys.readouterr().out
+
+
+def test_books_added_later_are_indexed(lms, add_book):
+    add_book("Crown")
+    assert titles(lms, "crown") == ["Crown"]
+    add_book("Crown of Storms")
+    lms.search_index.sync()
+    assert sorted(titles(lms, "crown")) == ["Crown", "Crown of Storms"]
+
+
+def test_books_inserted_by_another_process_are_not_skipped(lms, add_book, monkeypatch):
+    monkeypatch.setattr(lms, 'SEARCH_SYNC_INTERVAL', 0)
+    add_book("Crown")
+    assert titles(lms, "crown") == ["Crown"]
+    zebra = add_book("Zebra Crossing")  # Inserted behind this process's back
+    lms.search_index.add_book(zebra + 1, "Zebra Nights", None, None, None)  # Then one added here, with a higher id
+    add_book("Zebra Nights")
+    assert sorted(titles(lms, "zebra")) == ["Zebra Crossing", "Zebra Nights"]
+
+    reloaded = lms.SearchIndex(lms.search_index.path)
+    reloaded.ensure_loaded()
+    assert sorted(reloaded.postings['zebra']) == [zebra, zebra + 1]
+
+
+def test_rebuild_indexes_the_whole_catalog(lms, add_book):
+    add_book("Winter Garden")
+    lms.search_index.ensure_loaded()
+    lms.search_index.postings['winter'] = {}  # Damaged in memory
+    report = lms.search_index.rebuild()
+    assert report['books'] == 1
+    assert titles(lms, "winter") == ["Winter Garden"]
+    assert lms.build_parser().parse_args(['rebuild-search-index']).command == 'rebuild-search-index'
@@ -0,0 +1,84 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+
+@pytest.fixture
+def call(lms):
+    import asyncio
+    executor = ThreadPoolExecutor(max_workers=2)
+    service = lms.LibraryService(executor)
+
+    def request(operation, **params):
+        status, payload = asyncio.run(service.dispatch('POST', '/' + operation, json.dumps(params, default=str).encode('utf-8')))
+        return status, json.loads(json.dumps(payload, default=str))  # As the client sees it
+    yield request
+    executor.shutdown()
+
+
+def login(call, username):
+    status, payload = call('login', username=username, password='Secret123!')
+    assert status == 200
+    return payload['token']
+
+
+def test_member_routes_need_a_session(lms, call, add_member, add_book):
+    add_member('reader')
+    add_book("Dune")
+    assert call('borrow', token='nope', title="Dune", payment_method='Card') == (400, {'error': "Your session has expired. Please log in again."})
+    token = login(call, 'reader')
+    status, payload = call('borrow', token=token, title="Dune", payment_method='Card')
+    assert status == 200 and payload['fee'] == lms.BORROW_FEE
+    call('logout', token=token)
+    assert call('return', token=token, book_id=payload['book_id'])[0] == 400
+
+
+def test_bad_requests_are_answered_not_raised(lms, call, add_member):
+    add_member('reader')
+    token = login(call, 'reader')
+    assert call('feedback', token=token, content="Hi", wait="no") == (400, {'error': "wait must be true or false."})
+    assert call('feedback', token=token, content=123) == (400, {'error': "content must be a string."})
+    assert call('feedback', token=token)[0] == 400
+    assert call('feedback', token=token, content="Thanks", wait=True) == (200, {'submitted': True, 'committed': True})
+    assert call('nowhere')[0] == 404
+
+
+def test_unexpected_errors_are_answered_with_a_500(lms, call, monkeypatch):
+    def broken(params):
+        raise AttributeError("a bug")
+    monkeypatch.setitem(lms.SERVICE_ROUTES, 'genres', broken)
+    assert call('genres') == (500, {'error': "Internal server error."})
+
+
+def test_wrongly_typed_fields_get_a_400(lms, call, add_book):
+    for title in ("Dune", "Emma", "Kindred"):
+        add_book(title)
+    assert call('register', username=['x'], password='Secret123!', email='x@example.com') == (400, {'error': "username must be a string."})
+    assert call('login', username='reader', password=7) == (400, {'error': "password must be a string."})
+    assert call('search', query={'text': 'dune'}) == (400, {'error': "query must be a string."})
+    assert call('books', page_size=0)[0] == 400
+    assert call('books', genre=['Fantasy'])[0] == 400
+    for cursor in (["t"], "abc", ["Dune", "1"], ["Dune", 1, 2], {"title": "Dune"}):
+        assert call('books', after=cursor) == (400, {'error': "after must be the [title, book_id] pair from a previous page."})
+
+
+def test_book_cursors_round_trip_through_json(lms, call, add_book):
+    for title in ("Dune", "Emma", "Kindred"):
+        add_book(title)
+    status, first = call('books', page_size=2)
+    assert status == 200 and first['next'] == ["Emma", 2]
+    status, second = call('books', page_size=2, after=first['next'])
+    assert [book['title'] for book in second['books']] == ["Kindred"]
+    assert [book['title'] for book in call('books', page_size=2, before=second['prev'])[1]['books']] == ["Dune", "Emma"]
+
+
+def test_batch_routes_need_an_admin(lms, call, add_member, add_book):
+    member = add_member('reader')
+    add_member('desk', role='admin')
+    book_id = add_book("Dune")
+    items = [[member, book_id]]
+    assert call('borrow_batch', token=login(call, 'reader'), items=items, payment_method='Card') == (
+        400, {'error': "Only admins can use the circulation desk."})
+    status, payload = call('borrow_batch', token=login(call, 'admindesk'), items=items, payment_method='Card')
+    assert status == 200 and payload['results'][0]['ok']
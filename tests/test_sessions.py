@@ -0,0 +1,56 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+
+def test_login_reads_users_through_the_cache(lms, add_member):
+    add_member('reader')
+    user = lms.authenticate('reader', 'Secret123!')
+    assert lms.session_store.cached_user('reader') == user
+    with lms.storage.transaction() as cursor:
+        cursor.execute("DELETE FROM users")
+    assert lms.authenticate('reader', 'Secret123!') == user
+    with pytest.raises(lms.LibraryError, match="Invalid username or password"):
+        lms.authenticate('reader', 'wrong')
+
+
+def test_membership_end_is_cached(lms, add_member):
+    member = add_member('reader')
+    store = lms.session_store
+    assert store.membership_end(member) is None
+    assert store.stats()['misses'] == 1
+    _, end_date = lms.subscribe_membership(member, '1')
+    assert store.membership_end(member) == end_date
+    assert store.stats()['hits'] == 1
+
+
+def test_cached_membership_reads_as_ended_once_past(lms, add_member):
+    member = add_member('reader')
+    now = datetime.now()
+    lms.session_store.store_membership(member, now - timedelta(seconds=1), now - timedelta(days=30))
+    lms.session_store.memberships[member] = (now + timedelta(minutes=5), now - timedelta(seconds=1))
+    assert lms.session_store.membership_end(member) is None
+
+
+def test_idle_sessions_expire(lms, add_member):
+    add_member('reader')
+    lms.session_store = lms.SessionStore(idle_timeout=0.05, refresh_interval=3600)
+    session = lms.session_store.open(lms.authenticate('reader', 'Secret123!'))
+    assert lms.session_store.get(session.token) is session
+    time.sleep(0.1)
+    with pytest.raises(lms.LibraryError, match="session has expired"):
+        lms.session_store.get(session.token)
+
+
+def test_refresh_loads_memberships_about_to_expire(lms, add_member):
+    soon, later = add_member('soon'), add_member('later')
+    now = datetime.now()
+    with lms.storage.transaction() as cursor:
+        cursor.executemany("INSERT INTO memberships (user_id, plan_name, start_date, end_date, price) VALUES (%s, 'Basic Plan', %s, %s, 10)",
+                           [(soon, now - timedelta(days=29), now + timedelta(hours=2)), (later, now, now + timedelta(days=30))])
+    store = lms.SessionStore(refresh_interval=3600)
+    assert store.refresh() == 1
+    assert list(store.memberships) == [soon]
+    assert store.membership_end(soon) == now + timedelta(hours=2)
+    assert store.stats()['hits'] == 1
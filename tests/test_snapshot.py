@@ -0,0 +1,40 @@
+from conftest import query
+
+
+def test_snapshot_pages_match_the_database(lms, add_book, tmp_path):
+    for number in range(12):
+        add_book(f"Title {number % 7}", genre=(None, 'Fantasy', 'Poetry')[number % 3], author=f"Author {number}")
+    path = str(tmp_path / 'catalog.snapshot')
+    report = lms.build_snapshot(path)
+    assert (report['books'], report['authors'], report['genres']) == (12, 12, 3)
+    snapshot = lms.CatalogSnapshot(path)
+
+    columns = ', '.join(lms.BOOK_FIELDS)
+    expected = query(lms, f"SELECT {columns} FROM books ORDER BY title, book_id")
+    rows, after = [], None
+    while True:
+        page = snapshot.books_page(page_size=5, after=after)
+        rows.extend(page.rows)
+        if page.next_cursor is None:
+            break
+        after = page.next_cursor
+    assert [row[:8] for row in rows] == [tuple(row[:8]) for row in expected]
+    assert snapshot.books_page(page_size=5, before=page.prev_cursor).rows == rows[5:10]
+
+    fantasy = snapshot.books_page(genre='Fantasy').rows
+    assert [row[0] for row in fantasy] == [row[0] for row in expected if row[3] == 'Fantasy']
+    assert [row[1] for row in snapshot.authors_page(page_size=3).rows] == ["Author 0", "Author 1", "Author 10"]
+    assert snapshot.genres() == [(None,), ('Fantasy',), ('Poetry',)]
+
+
+def test_reader_picks_up_a_rebuilt_snapshot(lms, add_book, tmp_path):
+    path = str(tmp_path / 'catalog.snapshot')
+    add_book("Dune")
+    lms.build_snapshot(path)
+    reader = lms.SnapshotReader(path)
+    first = reader.current()
+    add_book("Emma")
+    lms.build_snapshot(path)
+    assert reader.current() is not first
+    assert [row[1] for row in reader.current().books_page().rows] == ["Dune", "Emma"]
+    assert [row[1] for row in first.books_page().rows] == ["Dune"]
@@ -0,0 +1,37 @@
+import json
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+
+SCRIPT = str(ROOT / 'library management system.py')
+DEFERRED = ['argparse', 'csv', 'decimal', 'mmap', 'numpy', 'secrets', 'sqlite3', 'tabulate']
+
+
+def run(tmp_path, *args, code=None, stdin=''):
+    env = dict(os.environ, LIBRARY_DB_BACKEND='sqlite', LIBRARY_DB_PATH=str(tmp_path / 'library.db'), LIBRARY_STARTUP_TIMING='1')
+    command = [sys.executable, '-c', code] if code else [sys.executable, SCRIPT, *args]
+    return subprocess.run(command, input=stdin, capture_output=True, text=True, env=env, cwd=tmp_path, timeout=60, check=True).stdout
+
+
+def test_import_neither_connects_nor_loads_deferred_modules(tmp_path):
+    output = run(tmp_path, code=(
+        "import importlib.util, json, sys\n"
+        f"spec = importlib.util.spec_from_file_location('library', {SCRIPT!r})\n"
+        "library = importlib.util.module_from_spec(spec)\n"
+        "spec.loader.exec_module(library)\n"
+        f"print(json.dumps([name for name in {DEFERRED!r} if name in sys.modules]))"))
+    assert json.loads(output) == []
+    assert not (tmp_path / 'library.db').exists()
+
+
+def test_menus_start_without_touching_the_database(tmp_path):
+    output = run(tmp_path, stdin='3\n')
+    assert "Time to first menu:" in output and "Python's own start-up is not included" in output
+    assert not (tmp_path / 'library.db').exists()
+
+
+def test_subcommands_still_parse_their_arguments(tmp_path):
+    assert "Schema is at version" in run(tmp_path, 'migrate')
+    assert (tmp_path / 'library.db').exists()
@@ -0,0 +1,31 @@
+import pytest
+
+from conftest import query
+
+
+def test_transaction_commits_on_success(lms):
+    with lms.storage.transaction(write=True) as cursor:
+        cursor.execute("INSERT INTO authors (name) VALUES (%s)", ("Kept",))
+    assert query(lms, "SELECT name FROM authors") == [("Kept",)]
+
+
+def test_transaction_rolls_back_on_error(lms):
+    with pytest.raises(RuntimeError):
+        with lms.storage.transaction(write=True) as cursor:
+            cursor.execute("INSERT INTO authors (name) VALUES (%s)", ("Rolled Back",))
+            raise RuntimeError("boom")
+    assert query(lms, "SELECT COUNT(*) FROM authors") == [(0,)]
+
+
+def test_pool_times_out_when_every_connection_is_taken(lms):
+    pool = lms.ConnectionPool(lms.storage.backend, size=1, timeout=0.05)
+    connection = pool.acquire()
+    with pytest.raises(lms.PoolTimeoutError):
+        pool.acquire()
+    pool.release(connection)
+    pool.release(pool.acquire())
+    pool.close()
+
+
+def test_mysql_statements_are_translated_for_sqlite(lms):
+    assert lms.mysql_to_sqlite("SELECT * FROM books WHERE title=%s") == "SELECT * FROM books WHERE title=?"
@@ -0,0 +1,46 @@
+from datetime import datetime
+
+from conftest import query
+
+FEEDBACK = "INSERT INTO feedback (user_id, content, date_submitted) VALUES (%s, %s, %s)"
+
+
+def test_flush_commits_everything_appended(lms, add_member):
+    member = add_member('reader')
+    lms.write_buffer.flush()  # The registration's audit row
+    committed = lms.write_buffer.stats()['committed']
+    acks = [lms.write_buffer.append(FEEDBACK, (member, f"note {number}", datetime.now())) for number in range(50)]
+    lms.write_buffer.flush()
+    assert all(ack.done.is_set() for ack in acks)
+    assert query(lms, "SELECT COUNT(*) FROM feedback") == [(50,)]
+    assert lms.write_buffer.stats()['committed'] - committed == 50
+
+
+def test_close_writes_out_the_queue(lms, add_member):
+    member = add_member('reader')
+    for number in range(20):
+        lms.write_buffer.append(FEEDBACK, (member, f"note {number}", datetime.now()))
+    lms.write_buffer.close()
+    assert query(lms, "SELECT COUNT(*) FROM feedback") == [(20,)]
+    lms.write_buffer.append(FEEDBACK, (member, "after close", datetime.now())).result()  # Written directly
+    assert query(lms, "SELECT COUNT(*) FROM feedback") == [(21,)]
+
+
+def test_disabled_buffer_writes_synchronously(lms, add_member):
+    member = add_member('reader')
+    lms.write_buffer = lms.WriteBuffer(enabled=False)
+    lms.submit_feedback(member, "Great library", wait=False)
+    assert query(lms, "SELECT content FROM feedback") == [("Great library",)]
+    assert lms.write_buffer.thread is None
+
+
+def test_full_buffer_drops_non_blocking_rows(lms, add_member):
+    member = add_member('reader')
+    lms.write_buffer = lms.WriteBuffer(capacity=1)
+    lms.write_buffer.thread = object()  # Nothing drains the queue
+    lms.write_buffer.append(FEEDBACK, (member, "queued", datetime.now()))
+    ack = lms.write_buffer.append(FEEDBACK, (member, "dropped", datetime.now()), block=False)
+    assert isinstance(ack.error, lms.StorageError)
+    lms.audit(member, 'login')  # Never raises, even with the buffer full
+    assert lms.write_buffer.stats()['dropped'] == 2
+    lms.write_buffer.thread = None